@@ -0,0 +1,102 @@
+import argparse
+import re
+import time
+
+from dbt_config_block import find_config_blocks
+from dbt_column_converter import update_existing_config
+
+# ---------- CONFIG ----------
+MODEL_COUNTS = [1000, 5000, 20000]
+REPEATS = 3
+PARTITION_COL = "event_date"
+CLUSTER_COLS = ["customer_id", "country"]
+# -----------------------------------
+
+# The non-greedy pattern update_existing_config used before dbt_config_block, kept as the baseline.
+LEGACY_CONFIG_RE = re.compile(r"(\{\{\s*config\s*\((.*?)\)\s*\}\})", re.DOTALL | re.IGNORECASE)
+
+def legacy_update(sql_text: str, partition_col, cluster_cols):
+    """Old update_existing_config, reduced to its status and the block span it worked on."""
+    m = LEGACY_CONFIG_RE.search(sql_text)
+    if not m:
+        return "no-config", None
+    inner = m.group(2)
+    if re.search(r"materialized\s*=\s*['\"]view['\"]", inner, flags=re.IGNORECASE):
+        return "is-view", m.span(1)
+    for key, wanted in (("partition_by", partition_col), ("clustered_by", cluster_cols)):
+        if wanted and re.search(rf"\b{key}\s*=", inner) is None:
+            return "updated", m.span(1)
+    return "no-op", m.span(1)
+
+# Model bodies: the shapes seen in real projects, including the ones the old regex cut short
+# (a `) }}` inside a string) or misread (a commented-out block, a second config call).
+SHAPES = [
+    "{{{{ config(materialized='table') }}}}\n",
+    "{{{{\n    config(\n        materialized = 'incremental',\n        unique_key = 'id_{i}',\n"
+    "        on_schema_change = 'append_new_columns'\n    )\n}}}}\n",
+    "{{{{ config(\n    materialized='table',\n    tags=['daily', 'uk'],\n) }}}}\n",
+    "{{{{ config(materialized=var('mat_{i}', 'table'), schema=var('schema', 'core')) }}}}\n",
+    "{{{{ config(\n    materialized='incremental',\n    post_hook=\"{{{{ grant_select('reporter') }}}}\",\n"
+    "    meta={{'owner': 'data-platform', 'tier': {i}}}\n) }}}}\n",
+    "{{# {{{{ config(materialized='view') }}}} #}}\n{{{{ config(materialized='table') }}}}\n",
+    "{{{{ config(materialized='view') }}}}\n",
+    "{{{{ config(materialized='table') }}}}\n{{% if target.name == 'prod' %}}\n"
+    "{{{{ config(partition_by={{'field': 'event_date', 'data_type': 'DATE'}}) }}}}\n{{% endif %}}\n",
+]
+
+BODY = """
+with src as (
+    select * from {{{{ ref('stg_orders_{i}') }}}}
+    where event_date >= '{{{{ var("start_date") }}}}'
+)
+select customer_id, country, event_date, sum(amount) as amount_{i}
+from src
+group by 1, 2, 3
+"""
+
+def synthetic_models(n: int):
+    return [SHAPES[i % len(SHAPES)].format(i=i) + BODY.format(i=i) for i in range(n)]
+
+def run_scanner(models):
+    return [update_existing_config(sql, PARTITION_COL, CLUSTER_COLS)[1] for sql in models]
+
+def run_legacy(models):
+    return [legacy_update(sql, PARTITION_COL, CLUSTER_COLS) for sql in models]
+
+def disagreements(models, new_statuses, old_results):
+    """Models where the old regex saw a different block (or status) than the scanner."""
+    count = 0
+    for sql, status, (old_status, span) in zip(models, new_statuses, old_results):
+        blocks = find_config_blocks(sql)
+        first = (blocks[0].start, blocks[0].end) if blocks else None
+        if status != old_status or span != first:
+            count += 1
+    return count
+
+def best_of(fn, arg, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the config() scanner/rewriter against the legacy regex.")
+    parser.add_argument("--models", type=int, nargs="+", default=MODEL_COUNTS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    print(f"{'models':>8} {'SQL MB':>7} {'scanner s':>10} {'models/s':>10} {'MB/s':>7} "
+          f"{'regex s':>9} {'models/s':>10} {'regex differs':>14}")
+    for n in args.models:
+        models = synthetic_models(n)
+        mb = sum(len(m) for m in models) / 1e6
+        new_t, statuses = best_of(run_scanner, models, args.repeats)
+        old_t, old_results = best_of(run_legacy, models, args.repeats)
+        print(f"{n:>8} {mb:>7.2f} {new_t:>10.3f} {n / new_t:>10.0f} {mb / new_t:>7.1f} "
+              f"{old_t:>9.3f} {n / old_t:>10.0f} {disagreements(models, statuses, old_results):>14}")
+
+if __name__ == "__main__":
+    main()
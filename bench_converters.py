@@ -0,0 +1,213 @@
+import argparse
+import contextlib
+import datetime
+import functools
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from bench_synthetic import FakeSnowflake, install_fake_connector, make_catalog, write_inventories, write_project
+
+# ---------- CONFIG ----------
+MODELS = 200
+COLUMNS = 40
+MODELS_PER_YML = 5
+LATENCY_SECONDS = 0.02  # per fake warehouse query
+REPEATS = 3
+RESULTS_FILE = "bench_results.json"
+ENTRY_POINTS = ["partition_cluster", "merge_columns_cold", "merge_columns_warm", "v0_generate"]
+# -----------------------------------
+
+# ---------- Timing ----------
+PEAKS = None  # with --memory: tracemalloc peak bytes of each timed run (main process only)
+
+def timed_runs(run, setup, repeats):
+    """Wall-clock seconds of run() per repeat; setup() runs untimed before each one. Output is swallowed."""
+    seconds = []
+    for _ in range(repeats):
+        setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if PEAKS is not None:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                run()
+            finally:
+                seconds.append(time.perf_counter() - start)
+                if PEAKS is not None:
+                    PEAKS.append(tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+    return seconds
+
+def fresh_copy(src, dst):
+    shutil.rmtree(dst, ignore_errors=True)
+    shutil.copytree(src, dst)
+
+# ---------- Entry points ----------
+def bench_partition_cluster(ctx):
+    import dbt_column_converter as cc
+    project = os.path.join(ctx["work"], "run_models")
+    cc.STATE_FILE = os.path.join(ctx["work"], "partition_cluster_state.json")
+    ctx["report"] = os.path.join(ctx["work"], "partition_cluster_report.json")
+
+    def setup():
+        fresh_copy(ctx["models"], project)
+        cc.LOOKUPS = cc.ColumnLookups()  # no carry-over between repeats
+
+    return timed_runs(lambda: cc.main(jobs=ctx["jobs"], report=ctx["report"],
+                                      inventory=ctx["bq_inventory"], project_dir=project), setup, ctx["repeats"])
+
+def _bench_merge_columns(ctx, warm):
+    import dbt_converter_pr3 as pr3
+    from dbt_metadata_cache import MetadataCache
+    project = os.path.join(ctx["work"], "run_models")
+    cache_path = os.path.join(ctx["work"], "metadata_cache.sqlite")
+    pr3.STATE_FILE = os.path.join(ctx["work"], "merge_columns_state.json")
+    pr3.MetadataCache = functools.partial(MetadataCache, path=cache_path)
+    ctx["report"] = os.path.join(ctx["work"], "merge_columns_report.json")
+    argv = ["--inventory", ctx["sf_inventory"], "--project-dir", project,
+            "--jobs", str(ctx["jobs"]), "--report", ctx["report"]]
+
+    def run():
+        pr3.main(argv)
+
+    def setup():
+        fresh_copy(ctx["models"], project)
+        if not warm and os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    if warm:
+        setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()  # fill the cache once, untimed
+    return timed_runs(run, setup, ctx["repeats"])
+
+def bench_merge_columns_cold(ctx):
+    return _bench_merge_columns(ctx, warm=False)
+
+def bench_merge_columns_warm(ctx):
+    return _bench_merge_columns(ctx, warm=True)
+
+def bench_v0_generate(ctx):
+    import dbt_converter_v0 as v0
+    out_dir = os.path.join(ctx["work"], "v0_output")
+    argv = ["--inventory", ctx["sf_inventory"], "--output-dir", out_dir]
+
+    def setup():
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    return timed_runs(lambda: v0.main(argv), setup, ctx["repeats"])
+
+BENCHMARKS = {
+    "partition_cluster": bench_partition_cluster,
+    "merge_columns_cold": bench_merge_columns_cold,
+    "merge_columns_warm": bench_merge_columns_warm,
+    "v0_generate": bench_v0_generate,
+}
+
+# ---------- Results ----------
+def summarize(seconds, queries, report_file=None, peaks=None):
+    summary = {
+        "runs": [round(s, 6) for s in seconds],
+        "best": round(min(seconds), 6),
+        "median": round(statistics.median(seconds), 6),
+        "queries_per_run": queries,
+    }
+    if peaks:
+        summary["peak_mb"] = round(max(peaks) / 1e6, 2)
+    if report_file and os.path.exists(report_file):
+        with open(report_file) as fh:
+            last = json.load(fh)  # dbt_metrics report of the last repeat
+        summary["stages"] = last["stages"]
+        summary["counters"] = last["counters"]
+    return summary
+
+def compare(results, baseline_path):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh).get("results", {})
+    print(f"\n📊 Compared with {baseline_path} (best of runs):")
+    for name, res in results.items():
+        old = baseline.get(name, {}).get("best")
+        if "best" not in res or not old:
+            continue
+        change = (res["best"] - old) / old * 100
+        print(f"   {name:<22} {old:>9.3f}s -> {res['best']:>9.3f}s  ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the converters on a synthetic dbt project.")
+    parser.add_argument("--models", type=int, default=MODELS)
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="columns per model")
+    parser.add_argument("--models-per-yml", type=int, default=MODELS_PER_YML)
+    parser.add_argument("--latency", type=float, default=LATENCY_SECONDS,
+                        help="seconds the fake Snowflake sleeps per query")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=ENTRY_POINTS, default=ENTRY_POINTS)
+    parser.add_argument("--output", default=RESULTS_FILE, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--workdir", help="keep the synthetic project here instead of a temp dir")
+    parser.add_argument("--memory", action="store_true",
+                        help="record tracemalloc peak memory per run (slower; worker processes not traced)")
+    args = parser.parse_args()
+    global PEAKS
+    PEAKS = [] if args.memory else None
+
+    work = args.workdir or tempfile.mkdtemp(prefix="dbt_bench_")
+    os.makedirs(work, exist_ok=True)
+    catalog = make_catalog(args.models, args.columns, args.models_per_yml)
+    models = os.path.join(work, "models")
+    shutil.rmtree(models, ignore_errors=True)
+    n_yml = write_project(models, catalog)
+    bq_inventory, sf_inventory = write_inventories(work, catalog)
+    print(f"🧪 Synthetic project: {len(catalog)} models x {args.columns} columns in {n_yml} schema.yml files ({work})")
+
+    server = FakeSnowflake(catalog, latency=args.latency)
+    install_fake_connector(server)
+    ctx = {
+        "work": work, "models": models, "bq_inventory": bq_inventory, "sf_inventory": sf_inventory,
+        "jobs": args.jobs, "repeats": args.repeats,
+    }
+
+    results = {}
+    try:
+        for name in args.only:
+            server.reset_counts()
+            ctx.pop("report", None)
+            if PEAKS is not None:
+                del PEAKS[:]
+            try:
+                seconds = BENCHMARKS[name](ctx)
+            except ImportError as e:
+                print(f"⚠️ {name}: skipped ({e})")
+                results[name] = {"skipped": str(e)}
+                continue
+            queries = server.queries // max(1, args.repeats if name != "merge_columns_warm" else args.repeats + 1)
+            results[name] = summarize(seconds, queries, ctx.get("report"), PEAKS)
+            peak = f", peak {results[name]['peak_mb']:.1f} MB" if PEAKS else ""
+            print(f"⏱️ {name:<22} best {results[name]['best']:.3f}s  median {results[name]['median']:.3f}s  "
+                  f"({queries} queries/run{peak})")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: getattr(args, k) for k in ("models", "columns", "models_per_yml", "latency", "repeats", "jobs",
+                                                 "memory")},
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"💾 Results written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import re
+import time
+
+from dbt_ddl_parser import parse_create_table
+
+# ---------- CONFIG ----------
+COLUMN_COUNTS = [125, 250, 500, 1000, 2000]
+REPEATS = 3
+# -----------------------------------
+
+# The multiline regex the merge scripts used before dbt_ddl_parser, kept here as the baseline.
+LEGACY_DDL_PATTERN = re.compile(
+    r"""^\s*
+    (?P<col_name>"?[\w\s]+"?)\s+
+    [\w\(\),]+
+    (?:\s+WITH\s+TAG\s+\((?P<tag_content>.+?)\))?
+    (?:\s+COMMENT\s+'(?P<comment>.*?)')?
+    ,?$""",
+    re.IGNORECASE | re.VERBOSE | re.MULTILINE
+)
+
+def legacy_parse(ddl: str):
+    return [m.group("col_name").strip('"') for m in LEGACY_DDL_PATTERN.finditer(ddl)]
+
+def synthetic_ddl(n_cols: int) -> str:
+    """GET_DDL-shaped text: spaced types, quoted names and tag lists split over lines."""
+    types = ["NUMBER(38, 0)", "VARCHAR(16777216)", "TIMESTAMP_NTZ(9)", "NUMBER(18, 2)", "BOOLEAN"]
+    lines = []
+    for i in range(n_cols):
+        name = f'"Col {i}"' if i % 7 == 0 else f"COL_{i}"
+        line = f"\t{name} {types[i % len(types)]}"
+        if i % 3 == 0:
+            line += " NOT NULL"
+        if i % 4 == 0:
+            line += (" WITH TAG (CORE_PROD.TAGS.SENSITIVITY='amber',\n"
+                     "\t\tCORE_PROD.TAGS.OWNER='data-platform')")
+        if i % 2 == 0:
+            line += f" COMMENT 'column {i} description'"
+        lines.append(line)
+    return "create or replace TABLE CORE_PROD.TIDE.WIDE_TABLE (\n" + ",\n".join(lines) + "\n);"
+
+def best_of(fn, arg, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the DDL tokenizer against the legacy regex.")
+    parser.add_argument("--columns", type=int, nargs="+", default=COLUMN_COUNTS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    print(f"{'columns':>8} {'ddl KB':>8} {'tokenizer ms':>13} {'us/col':>8} {'regex ms':>10} {'us/col':>8} {'regex found':>12}")
+    for n in args.columns:
+        ddl = synthetic_ddl(n)
+        new_t, cols = best_of(parse_create_table, ddl, args.repeats)
+        old_t, old_cols = best_of(legacy_parse, ddl, args.repeats)
+        assert len(cols) == n, f"tokenizer found {len(cols)} of {n} columns"
+        print(f"{n:>8} {len(ddl) / 1024:>8.1f} {new_t * 1000:>13.2f} {new_t * 1e6 / n:>8.1f} "
+              f"{old_t * 1000:>10.2f} {old_t * 1e6 / n:>8.1f} {len(old_cols):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import datetime
+import os
+import random
+import re
+import sys
+import threading
+import time
+import types
+
+# ---------- CONFIG ----------
+DATABASE = "PAYMENT_SERVICES_PROD"
+BQ_PROJECT = "tide-payment-prj-uk"
+LAYERS = {"chunnel": "CHNL", "intermediate": "INTG", "presentation": "PRES"}
+DOMAINS = ["tidewallet", "accounts", "cards", "payments", "ledger", "onboarding", "fx", "lending"]
+SHARED_COLUMNS = ["company_id", "account_id", "transaction_loaded_at", "transaction_at", "updated_at"]
+TYPES = ["VARCHAR(16777216)", "NUMBER(38,0)", "TIMESTAMP_NTZ(9)", "BOOLEAN", "NUMBER(18,2)"]
+TAG_NAME = f"{DATABASE}.TAGS.SENSITIVITY"
+# -----------------------------------
+
+# ---------- Synthetic catalog ----------
+def make_catalog(n_models=200, n_columns=40, models_per_yml=5, seed=7):
+    """
+    One dict per table/model:
+      {"layer", "domain", "dir", "name", "database", "schema",
+       "columns": [(name, type, comment, tag_value)], "partition", "cluster", "view"}
+    Models are spread over models/uk/<layer>/<domain>/ folders, models_per_yml per folder.
+    """
+    rng = random.Random(seed)
+    layers = list(LAYERS)
+    n_dirs = max(1, -(-n_models // models_per_yml))
+    catalog = []
+    for i in range(n_models):
+        d = i % n_dirs
+        layer = layers[d % len(layers)]
+        domain = f"{DOMAINS[(d // len(layers)) % len(DOMAINS)]}{d // (len(layers) * len(DOMAINS)) or ''}"
+        name = f"{LAYERS[layer].lower()}_{domain}_model_{i}"
+
+        own = [f"{name}_id"] + [f"attr_{i}_{c}" for c in range(max(0, n_columns - len(SHARED_COLUMNS) - 1))]
+        columns = []
+        for c, col in enumerate((SHARED_COLUMNS + own)[:max(n_columns, 2)]):
+            comment = f"Description of {col}" if rng.random() < 0.5 else ""
+            roll = rng.random()
+            tag = "amber" if roll < 0.15 else "red" if roll < 0.2 else ""
+            columns.append((col, TYPES[c % len(TYPES)], comment, tag))
+
+        catalog.append({
+            "layer": layer,
+            "domain": domain,
+            "dir": os.path.join("uk", layer, domain),
+            "name": name,
+            "database": DATABASE,
+            "schema": f"{LAYERS[layer]}_{domain}".upper(),
+            "columns": columns,
+            "partition": "transaction_loaded_at" if i % 3 else "",
+            "cluster": [f"{name}_id", "company_id"][: 1 + i % 2],
+            "view": i % 10 == 9,
+        })
+    return catalog
+
+# ---------- dbt project ----------
+def _sql_text(table):
+    materialized = "view" if table["view"] else "incremental"
+    cols = "\n".join(f"      ,{col}" if n else f"       {col}" for n, (col, *_rest) in enumerate(table["columns"]))
+    return (
+        "{{\n"
+        "    config(\n"
+        f"        materialized = '{materialized}',\n"
+        f"        unique_key = '{table['name']}_id',\n"
+        "        tags = ['daily']\n"
+        "    )\n"
+        "}}\n\n"
+        "WITH base AS (\n"
+        "  SELECT\n"
+        f"{cols}\n"
+        f"  FROM {{{{ ref('latest_{table['domain']}') }}}}\n"
+        "  {% if is_incremental() %}\n"
+        "     WHERE transaction_loaded_at > (SELECT MAX(transaction_loaded_at) FROM {{ this }})\n"
+        "  {% endif %}\n"
+        ")\n\n"
+        "SELECT *\nFROM base\n"
+    )
+
+def _schema_yml_text(tables):
+    """schema.yml documenting roughly half of each model's columns, as a hand-written file would."""
+    lines = ["version: 2", "", "models:"]
+    for table in tables:
+        lines += [f"  - name: {table['name']}", f"    description: Synthetic {table['layer']} model",
+                  "    columns:"]
+        for n, (col, _type, comment, _tag) in enumerate(table["columns"]):
+            if n % 2:
+                continue
+            lines.append(f"      - name: {col}")
+            if comment and n % 4 == 0:
+                lines.append(f"        description: {comment}")
+    return "\n".join(lines) + "\n"
+
+def write_project(root, catalog):
+    """models/uk/<layer>/<domain>/{schema.yml, <model>.sql} under root. Returns the schema.yml count."""
+    by_dir = {}
+    for table in catalog:
+        by_dir.setdefault(table["dir"], []).append(table)
+    for rel, tables in by_dir.items():
+        folder = os.path.join(root, rel)
+        os.makedirs(folder, exist_ok=True)
+        for table in tables:
+            with open(os.path.join(folder, f"{table['name']}.sql"), "w") as fh:
+                fh.write(_sql_text(table))
+        with open(os.path.join(folder, "schema.yml"), "w") as fh:
+            fh.write(_schema_yml_text(tables))
+    return len(by_dir)
+
+# ---------- Inventories ----------
+def _write_xlsx(path, header, rows):
+    from openpyxl import Workbook  # same dependency the inventory reader uses
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+def write_inventories(folder, catalog):
+    """bq_partition_cluster.xlsx and sf_table_inventory.xlsx matching the catalog. Returns their paths."""
+    os.makedirs(folder, exist_ok=True)
+    bq_path = os.path.join(folder, "bq_partition_cluster.xlsx")
+    sf_path = os.path.join(folder, "sf_table_inventory.xlsx")
+    _write_xlsx(
+        bq_path,
+        ["database_name", "schema_name", "table_name", "clustered_by_column", "partition_by_column"],
+        [[BQ_PROJECT, t["schema"].lower(), t["name"], ", ".join(t["cluster"]), t["partition"] or None]
+         for t in catalog],
+    )
+    _write_xlsx(
+        sf_path,
+        ["database", "schema", "table_name"],
+        [[t["database"], t["schema"], t["name"].upper()] for t in catalog],
+    )
+    return bq_path, sf_path
+
+# ---------- Fake Snowflake connector ----------
+class FakeSnowflake:
+    """
+    Serves the queries the converters send (GET_DDL, the bulk and v0
+    information_schema joins, last_altered) from a synthetic catalog, sleeping
+    `latency` seconds per execute() to stand in for the warehouse round trip.
+    """
+
+    def __init__(self, catalog, latency=0.0):
+        self.latency = latency
+        self.tables = {(t["schema"].upper(), t["name"].upper()): t for t in catalog}
+        self.altered = datetime.datetime(2024, 1, 1)
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.connections = 0
+
+    def reset_counts(self):
+        with self.lock:
+            self.queries = 0
+            self.connections = 0
+
+    def connect(self, **_kwargs):
+        with self.lock:
+            self.connections += 1
+        return _FakeConnection(self)
+
+    def run(self, query, params):
+        with self.lock:
+            self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = [str(p).upper() for p in (params or [])]
+
+        m = re.search(r"GET_DDL\('TABLE',\s*'([^']+)'\)", query, re.IGNORECASE)
+        if m:
+            _db, schema, table = m.group(1).upper().split(".")
+            found = self.tables.get((schema, table))
+            if not found:
+                raise RuntimeError(f"Object '{m.group(1)}' does not exist or not authorized.")
+            return [(self._ddl(found),)]
+
+        if re.search(r"from\s+\S+\.tables\b", query, re.IGNORECASE):
+            schema, names = params[0], params[1:]
+            return [(n, self.altered) for n in names if (schema, n) in self.tables]
+
+        if "tag_references" in query.lower():
+            schema, names = params[0], params[1:]
+            if " in (" in query.lower():
+                return [row for n in names for row in self._column_rows(schema, n, with_table=True)]
+            return list(self._column_rows(schema, names[0], with_table=False))
+
+        raise RuntimeError(f"FakeSnowflake does not understand query: {query.strip()[:80]}")
+
+    def _column_rows(self, schema, name, with_table):
+        table = self.tables.get((schema, name))
+        if not table:
+            return
+        for col, _type, comment, tag in table["columns"]:
+            tag_name, tag_value = (TAG_NAME, tag) if tag else (None, None)
+            if with_table:
+                yield (table["name"].upper(), col.upper(), comment or None, tag_name, tag_value)
+            else:
+                yield (col.upper(), tag_name, tag_value)
+
+    def _ddl(self, table):
+        lines = []
+        for col, col_type, comment, tag in table["columns"]:
+            line = f"\t{col.upper()} {col_type}"
+            if tag:
+                line += f" WITH TAG ({TAG_NAME}='{tag}')"
+            if comment:
+                line += f" COMMENT '{comment}'"
+            lines.append(line)
+        return f"create or replace TABLE {table['name'].upper()} (\n" + ",\n".join(lines) + "\n);"
+
+class _FakeConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return _FakeCursor(self.server)
+
+    def close(self):
+        pass
+
+class _FakeCursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+
+    def execute(self, query, params=None, timeout=None):
+        self.rows = self.server.run(query, params)
+        return self
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+def install_fake_connector(server):
+    """Make `import snowflake.connector` resolve to `server` for the rest of this process."""
+    connector = types.ModuleType("snowflake.connector")
+    connector.connect = server.connect
+    package = types.ModuleType("snowflake")
+    package.connector = connector
+    sys.modules["snowflake"] = package
+    sys.modules["snowflake.connector"] = connector
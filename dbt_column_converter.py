@@ -1,38 +1,47 @@
+import argparse
+import collections
+import functools
+import hashlib
+import json
 import os
 import re
-import pandas as pd
-from ruamel.yaml import YAML
+import time
+from dbt_config_block import config_arg, find_config_blocks, literal_value, rewrite_config
+from dbt_incremental import LOOKBACK_DAYS, IncrementalOptions, incremental_updates, partition_dict, scan_estimate
+from dbt_inventory import load_inventory_rows, load_table_map
+from dbt_lineage import MAX_CLUSTER_COLUMNS, LineageGraph, NodeKeys, config_keys, propagate
+from dbt_metadata import ConnectionPool, is_blank, snowflake_connect, table_key
+from dbt_partition import (
+    ColumnStats, fetch_partition_stats, load_column_stats, partition_spec, write_column_stats,
+)
+from dbt_query_history import column_usage, iter_history, rank_columns, recommend_clusters
+from dbt_io import PatchSet, text_diff, write_if_changed, yaml_handler
+from dbt_metrics import METRICS, profiled, report_path
+from dbt_state import StateManifest, digest, file_hash, state_path
+from dbt_watch import FileWatcher
 
 # ---------- CONFIG ----------
 EXCEL_FILE = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/bq_partition_cluster.xlsx"
 DBT_PROJECT_DIR = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/models"
+STATE_FILE = state_path("partition_cluster")  # used by --incremental
+REPORT_FILE = report_path("partition_cluster")  # JSON stage timings/counters, rewritten every run
+PATCH_FILE = "partition_cluster.patch"  # default --dry-run output (summary goes to the .json next to it)
+LINEAGE_FILE = "partition_cluster_lineage.json"  # default --propagate report
+COLUMN_STATS_FILE = "partition_column_stats.csv"  # default --fetch-column-stats snapshot
+# Snowflake database/schema per table, for --fetch-column-stats (the inventory above names BigQuery ones)
+SOURCE_INVENTORY_FILE = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/sf_table_inventory.xlsx"
+CLUSTER_REPORT_FILE = "cluster_proposals.json"  # column rankings behind --cluster-history
+INCREMENTAL_REPORT_FILE = "incremental_strategy.json"  # per-model scan estimates of --incremental-strategy
+LOOKUP_CACHE_SIZE = 20_000  # distinct SQL texts whose tokens stay cached (oldest dropped first)
 # -----------------------------------
 
 # ---------- Excel helpers ----------
-def _csv_list(val):
-    if val is None:
-        return []
-    return [c.strip() for c in str(val).split(",") if str(c).strip()]
-
-def load_excel_rows(path: str):
-    df = pd.read_excel(path)
-    print(f"📘 Loaded Excel with {len(df)} records.")
-    rows = []
-    for _, row in df.iterrows():
-        rows.append({
-            "database_name": str(row.get("database_name", "")).strip(),
-            "schema_name":   str(row.get("schema_name", "")).strip(),
-            "table_name":    str(row.get("table_name", "")).strip(),  # not used for matching
-            "cluster":       _csv_list(row.get("clustered_by_column", "")),
-            "partition":     _csv_list(row.get("partition_by_column", "")),
-        })
+def load_excel_rows(path: str, backend: str = None):
+    rows = load_inventory_rows(path, backend)
+    print(f"📘 Loaded Excel with {len(rows)} records.")
     return rows
 
 # ---------- YAML helpers ----------
-yaml = YAML()
-yaml.preserve_quotes = True
-yaml.indent(mapping=2, sequence=4, offset=2)
-
 def list_schema_ymls(root_dir: str):
     paths = []
     for dirpath, _, filenames in os.walk(root_dir):
@@ -45,72 +54,169 @@ def list_schema_ymls(root_dir: str):
     paths.sort(key=lambda p: p.lower())
     return paths
 
-# ---------- Find <model>.sql from PROJECT ROOT (filename match only) ----------
-def find_sql_by_filename(project_root: str, model_name_lc: str):
-    target = f"{model_name_lc}.sql"
-    for dirpath, _, filenames in os.walk(project_root):
-        if "target" in dirpath or ".dbt" in dirpath:
+# ---------- Index <model>.sql files from PROJECT ROOT (filename match only) ----------
+def _is_pruned_dir(path: str) -> bool:
+    return "target" in path or ".dbt" in path
+
+def build_sql_index(project_root: str):
+    """
+    Walk the project ONCE and map lowercase model name -> list of .sql paths.
+    Returns: (index, duplicates) where duplicates only holds names with >1 path.
+    """
+    index = {}
+    stack = [project_root]
+    while stack:
+        current = stack.pop()
+        if _is_pruned_dir(current):
             continue
-        for f in filenames:
-            if f.lower() == target:
-                return os.path.join(dirpath, f)
-    return None
+        try:
+            with os.scandir(current) as it:
+                entries = sorted(it, key=lambda e: e.name.lower())
+        except OSError as e:
+            print(f"   ⚠️ Cannot scan {current}: {e}")
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith(".sql"):
+                index.setdefault(entry.name[:-4].lower(), []).append(entry.path)
+        # reversed so the stack pops directories in sorted order
+        stack.extend(reversed(subdirs))
+    duplicates = {name: paths for name, paths in index.items() if len(paths) > 1}
+    return index, duplicates
 
-# ---------- SQL scanning + config injection ----------
-CONFIG_RE = re.compile(r"(\{\{\s*config\s*\((.*?)\)\s*\}\})", re.DOTALL | re.IGNORECASE)
+def resolve_sql_path(sql_index, model_name_lc: str, yml_dir: str):
+    """
+    Pick the .sql for a model. A unique filename wins outright; for duplicates,
+    prefer the copy living next to the schema.yml that declares the model.
+    Returns: (path, status) where status in {'ok','missing','duplicate'}
+    """
+    paths = sql_index.get(model_name_lc)
+    if not paths:
+        return None, "missing"
+    if len(paths) == 1:
+        return paths[0], "ok"
+    local = [p for p in paths if os.path.dirname(p) == yml_dir]
+    if len(local) == 1:
+        return local[0], "ok"
+    return None, "duplicate"
 
-def infer_partition_type(col: str) -> str:
-    c = col.lower()
-    if "date" in c and not any(s in c for s in ["time", "ts", "stamp"]):
-        return "DATE"
-    return "TIMESTAMP"
+# ---------- Partition column metadata ----------
+def partition_targets(excel_rows, source_map):
+    """
+    {(database, schema, table, column) in Snowflake: inventory row} for every row
+    with a partition column. The inventory names BigQuery projects and datasets,
+    so the Snowflake database/schema come from source_map ({table_lc: (database,
+    schema)}, the sf_table_inventory). Also returns the rows it could not place.
+    """
+    targets, unmapped = {}, []
+    for r in excel_rows:
+        if not (r.table_name and r.partition):
+            continue
+        database, schema = source_map.get(r.table_name.lower(), ("", ""))
+        if is_blank(database) or is_blank(schema):
+            unmapped.append(r)
+            continue
+        targets[(database, schema, r.table_name, r.partition[0])] = r
+    return targets, unmapped
+
+def load_partition_metadata(path: str, excel_rows, fetch: bool = False, source_inventory: str = None):
+    """
+    Column stats for the inventory's partition columns: read from the snapshot
+    at `path`, or with fetch=True queried from Snowflake (tables located through
+    the source_inventory) and saved there first. Keyed by the inventory's own
+    database/schema either way.
+    """
+    if not fetch:
+        return load_column_stats(path)
+    source_inventory = source_inventory or SOURCE_INVENTORY_FILE
+    targets, unmapped = partition_targets(excel_rows, load_table_map(source_inventory))
+    if unmapped:
+        print(f"   ⚠️ {len(unmapped)} partitioned table(s) not in {source_inventory}, no stats for: "
+              + ", ".join(r.table_name for r in unmapped[:10]) + (" ..." if len(unmapped) > 10 else ""))
+    pool = ConnectionPool(snowflake_connect)
+    try:
+        fetched = fetch_partition_stats(pool, list(targets))
+    finally:
+        pool.close()
+    stats = {}
+    for (database, schema, table, column), row in targets.items():
+        found = fetched.get((table_key(database, schema, table), column.lower()))
+        if found is not None:
+            item = ColumnStats(row.database, row.schema, row.table_name, found.column_name, found.data_type,
+                               found.row_count, found.min_value, found.max_value)
+            stats[item.key] = item
+    write_column_stats(path, stats)
+    print(f"💾 Saved column stats snapshot to {path}")
+    return stats
 
-def has_setting(inner: str, key: str) -> bool:
-    return re.search(rf"\b{re.escape(key)}\s*=", inner) is not None
+def row_partition_spec(row, column_stats):
+    """partition_by for an inventory row's partition column; None without --column-stats."""
+    if column_stats is None or not row.partition:
+        return None
+    col = row.partition[0]
+    return partition_spec(col, column_stats.get((table_key(row.database, row.schema, row.table_name), col.lower())))
 
-def is_view_materialization(inner_config: str) -> bool:
-    return re.search(r"materialized\s*=\s*['\"]view['\"]", inner_config, flags=re.IGNORECASE) is not None
+# ---------- SQL scanning + config injection ----------
+def is_view_materialization(blocks) -> bool:
+    arg = config_arg(blocks, "materialized")
+    return arg is not None and (literal_value(arg.value) or "").lower() == "view"
 
 def format_cluster_list(cols):
     return "[" + ", ".join(f"'{c}'" for c in cols) + "]"
 
-def update_existing_config(sql_text: str, partition_col, cluster_cols):
+def update_existing_config(sql_text: str, partition_col, cluster_cols, partition_value=None,
+                           replace_cluster: bool = False, incremental=None):
     """
-    Update ONLY inside an existing {{ config(...) }} block.
+    Update ONLY inside existing {{ config(...) }} blocks. Every block in the model
+    counts (dbt merges them, last one wins); missing keys are added in place to the
+    first block without reformatting it.
+    partition_value: partition_by source text to use as-is instead of guessing its
+    data_type from partition_col's name.
+    replace_cluster: overwrite an existing clustered_by with cluster_cols instead of keeping it.
+    incremental: IncrementalOptions; a partitioned incremental model also gets its
+    incremental_strategy / incremental_predicates (and partition_expiration_days).
     Returns: (updated_sql, status) where status in {'updated','no-op','no-config','is-view'}
     """
-    m = CONFIG_RE.search(sql_text)
-    if not m:
+    blocks = find_config_blocks(sql_text)
+    if not blocks:
         return sql_text, "no-config"
-    inner = m.group(2)
 
-    if is_view_materialization(inner):
+    if is_view_materialization(blocks):
         return sql_text, "is-view"
 
-    to_add = []
-    if partition_col and not has_setting(inner, "partition_by"):
-        dtype = infer_partition_type(partition_col)
-        to_add.append(f"partition_by = {{'field': '{partition_col}', 'data_type': '{dtype}'}}")
-    if cluster_cols and not has_setting(inner, "clustered_by"):
-        to_add.append(f"clustered_by = {format_cluster_list(cluster_cols)}")
-
-    if not to_add:
-        return sql_text, "no-op"
+    updates = {}
+    if partition_value:
+        updates["partition_by"] = partition_value
+    elif partition_col:
+        updates["partition_by"] = partition_spec(partition_col).config()
+    if cluster_cols:
+        updates["clustered_by"] = format_cluster_list(cluster_cols)
 
-    inner_clean = inner.strip()
-    if inner_clean and not inner_clean.rstrip().endswith(","):
-        inner_clean = inner_clean.rstrip() + ","
-
-    replacement = "{{ config(\n"
-    if inner_clean.strip():
-        replacement += "    " + inner_clean.strip() + "\n    " + ",\n    ".join(to_add) + "\n) }}"
-    else:
-        replacement += "    " + ",\n    ".join(to_add) + "\n) }}"
+    if incremental is not None:
+        # an existing partition_by is kept, so it is the one the strategy must follow
+        pending = None if config_arg(blocks, "partition_by") is not None else updates.get("partition_by")
+        updates.update(incremental_updates(blocks, pending, incremental)[0])
 
-    updated = sql_text[:m.start(1)] + replacement + sql_text[m.end(1):]
+    updated, changed = rewrite_config(sql_text, updates, blocks=blocks,
+                                      overwrite={"clustered_by"} if replace_cluster else False)
+    if not changed:
+        return sql_text, "no-op"
     return updated, "updated"
 
 # ---------- Column presence in SQL ----------
+@functools.lru_cache(maxsize=None)
+def column_pattern(col: str):
+    """The three col_in_sql() forms as one pattern, compiled once per column."""
+    c = re.escape(col)
+    return re.compile(
+        rf"(?<!\w){c}(?!\w)"          # bare col
+        rf"|\.\s*{c}(?!\w)"           # .col
+        rf"|[`\"]\s*{c}\s*[`\"]",     # `col` or "col"
+        re.IGNORECASE,
+    )
+
 def col_in_sql(sql_text: str, col: str) -> bool:
     """
     Check if a column name appears in SQL in common identifier forms:
@@ -119,120 +225,856 @@ def col_in_sql(sql_text: str, col: str) -> bool:
     - quoted: `col` or "col"
     Case-insensitive, word-boundary-ish (avoid matching substrings).
     """
-    c = re.escape(col)
-    patterns = [
-        rf"(?<!\w){c}(?!\w)",           # bare col
-        rf"\.\s*{c}(?!\w)",             # .col
-        rf"[`\"]\s*{c}\s*[`\"]",        # `col` or "col"
-    ]
-    for pat in patterns:
-        if re.search(pat, sql_text, flags=re.IGNORECASE):
-            return True
-    return False
+    return column_pattern(col).search(sql_text) is not None
+
+# ---------- Column index: tokenize SQL once, match Excel rows by set lookup ----------
+_WORD_RE = re.compile(r"\w+")
+
+def sql_identifiers(sql_text: str):
+    """
+    Every maximal word run in the SQL, lowercased. One pass covers bare, dotted
+    (a.col) and quoted (`col` / "col") identifiers; for plain-word columns
+    `col.lower() in ids` gives exactly the same answer as col_in_sql().
+    """
+    return {tok.lower() for tok in _WORD_RE.findall(sql_text)}
+
+def build_column_index(excel_rows):
+    """
+    Invert the Excel rows by column so candidates come from set intersection.
+    Returns a dict:
+      by_col   -> lowercase column -> positions of rows requiring it
+      odd_cols -> columns that are not plain words (still checked via col_in_sql)
+      needed   -> row position -> number of distinct required columns
+      score    -> row position -> specificity score (same as before)
+    """
+    by_col, odd_cols, needed, score = {}, set(), {}, {}
+    for pos, r in enumerate(excel_rows):
+        required = [c for c in (r.partition + r.cluster) if c]
+        if not required:
+            continue
+        distinct = {c.lower() for c in required}
+        for c in distinct:
+            by_col.setdefault(c, []).append(pos)
+            if not _WORD_RE.fullmatch(c):
+                odd_cols.add(c)
+        needed[pos] = len(distinct)
+        score[pos] = len(required)
+    return {"by_col": by_col, "odd_cols": odd_cols, "needed": needed, "score": score}
+
+# ---------- Memoized lookups per SQL file ----------
+class SqlMatcher:
+    """One SQL text with its identifier set computed once; key is its sha256."""
 
-def excel_row_matches_sql(row, sql_text: str) -> bool:
-    required = [c for c in (row["partition"] + row["cluster"]) if c]
-    if not required:
-        return False
-    return all(col_in_sql(sql_text, c) for c in required)
+    __slots__ = ("key", "sql_text", "ids", "answers")
+
+    def __init__(self, key: str, sql_text: str):
+        self.key = key
+        self.sql_text = sql_text
+        self.ids = sql_identifiers(sql_text)
+        self.answers = {}  # column_lc -> bool
+
+    def has(self, col: str) -> bool:
+        c = col.lower()
+        if _WORD_RE.fullmatch(c):
+            return c in self.ids
+        return col_in_sql(self.sql_text, col)
+
+class ColumnLookups:
+    """
+    SqlMatcher per distinct SQL content, each caching its column answers, so a
+    model reached from several schema.yml files, or a copy of the same SQL in
+    another folder, is tokenized and matched once. Keeps the max_texts most
+    recently used SQL texts (--watch sees a new one on every save).
+    Counts how often a SQL text was tokenized vs. reused; column answers are
+    mostly plain set membership on the matcher's ids and are not counted.
+    """
+
+    def __init__(self, max_texts=LOOKUP_CACHE_SIZE):
+        self.max_texts = max_texts
+        self.matchers = collections.OrderedDict()  # sha256 -> SqlMatcher, least recently used first
+        self.stats = {"matcher_hits": 0, "matcher_misses": 0}
+
+    def matcher(self, sql_text: str) -> SqlMatcher:
+        key = hashlib.sha256(sql_text.encode("utf-8")).hexdigest()
+        found = self.matchers.get(key)
+        if found is not None:
+            self.stats["matcher_hits"] += 1
+            self.matchers.move_to_end(key)
+            return found
+        self.stats["matcher_misses"] += 1
+        found = self.matchers[key] = SqlMatcher(key, sql_text)
+        if len(self.matchers) > self.max_texts:
+            self.matchers.popitem(last=False)
+        return found
+
+    def has(self, matcher: SqlMatcher, col: str) -> bool:
+        c = col.lower()
+        answer = matcher.answers.get(c)
+        if answer is None:
+            answer = matcher.answers[c] = matcher.has(col)
+        return answer
+
+    def snapshot(self):
+        return dict(self.stats)
+
+def stats_delta(after, before):
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+def format_lookup_stats(stats) -> str:
+    return f"SQL tokenized {stats['matcher_misses']}x, reused {stats['matcher_hits']}x"
+
+LOOKUPS = ColumnLookups()  # per process; workers get their own
 
 # ---------- Choose best Excel row for a model by scanning the SQL ----------
-def choose_row_for_model_sql(excel_rows, sql_text: str):
-    candidates = []
-    for r in excel_rows:
-        if excel_row_matches_sql(r, sql_text):
-            # score = number of specified columns (more specific is better)
-            score = len([c for c in (r["partition"] + r["cluster"]) if c])
-            candidates.append((score, r))
+def choose_row_for_model_sql(excel_rows, sql_text: str, column_index=None, lookups=None):
+    if column_index is None:
+        column_index = build_column_index(excel_rows)
+    if lookups is None:
+        lookups = LOOKUPS
+    by_col = column_index["by_col"]
+    matcher = lookups.matcher(sql_text)
+    ids = matcher.ids
+
+    small, large = (ids, by_col) if len(ids) < len(by_col) else (by_col, ids)
+    present = [c for c in small if c in large]
+    present += [c for c in column_index["odd_cols"] if lookups.has(matcher, c)]
+
+    hits = {}
+    for c in present:
+        for pos in by_col[c]:
+            hits[pos] = hits.get(pos, 0) + 1
+    # score = number of specified columns (more specific is better)
+    candidates = [
+        (column_index["score"][pos], pos)
+        for pos, n in hits.items() if n == column_index["needed"][pos]
+    ]
     if not candidates:
         return None, "no-match"
-    candidates.sort(key=lambda x: (-x[0],))
-    top_score = candidates[0][0]
-    best = [r for s, r in candidates if s == top_score]
+    top_score = max(s for s, _ in candidates)
+    best = [pos for s, pos in candidates if s == top_score]
     if len(best) > 1:
         return None, "ambiguous"
-    return best[0], "ok"
+    return excel_rows[best[0]], "ok"
+
+# ---------- Incremental state ----------
+def model_inputs(sql_index, model_keys, yml_dir: str, excel_digest: str):
+    """Digest per model of what decides its edit: the resolved .sql, its bytes and the Excel rows."""
+    inputs = {}
+    for key in model_keys:
+        sql_path, _ = resolve_sql_path(sql_index, key, yml_dir)
+        inputs[key] = digest([sql_path, file_hash(sql_path) if sql_path else None, excel_digest])
+    return inputs
+
+# ---------- Per schema.yml planning (runs in worker processes with --jobs) ----------
+def plan_schema_file(yml_path: str, excel_rows, column_index, sql_index, dry_run: bool = False,
+                     column_stats=None):
+    """
+    Work out the config edit for every model declared in one schema.yml.
+    column_stats: {(table_key, column_lc): ColumnStats}; partition data_type and
+    granularity come from it instead of the column name.
+    Nothing is printed or written here; the caller replays the returned events:
+      ("log", text)
+      ("edit", model_name, sql_path, updated_sql, summary, diff)
+    diff is the unified diff of the edit with dry_run, else None.
+    Returns {"path", "events", "targets", "model_keys", "lookups"}; model_keys is
+    None when the YAML could not be parsed, lookups holds this file's LOOKUPS counts.
+    """
+    before = LOOKUPS.snapshot()
+    metrics_before = METRICS.snapshot()
+    events = []
+    targets = 0
+    yml_dir = os.path.dirname(yml_path)
+    METRICS.count("schema_files_parsed")
+    try:
+        with METRICS.stage("yaml_parse"), open(yml_path, "r") as f:
+            data = yaml_handler().load(f) or {}
+    except Exception as e:
+        events.append(("log", f"   ❌ Failed to parse YAML: {e}"))
+        return {"path": yml_path, "events": events, "targets": 0, "model_keys": None,
+                "lookups": stats_delta(LOOKUPS.snapshot(), before),
+                "metrics": METRICS.delta(metrics_before)}
+
+    models = data.get("models", [])
+    if not isinstance(models, list) or not models:
+        events.append(("log", "   ℹ️ No models key or empty — skipping."))
+        models = []
+
+    for m in models:
+        model_name = str(m.get("name", "")).strip()
+        if not model_name:
+            continue
+        key = model_name.lower()
+        METRICS.count("models")
+
+        # Locate <model>.sql strictly by filename via the project index
+        sql_path, sql_status = resolve_sql_path(sql_index, key, yml_dir)
+        if sql_status == "duplicate":
+            events.append(("log", f"   ⚠️ [{model_name}] {key}.sql exists in several folders — skipping to avoid wrong edit."))
+            continue
+        if not sql_path:
+            events.append(("log", f"   ⚠️ [{model_name}] could not find {key}.sql from root — skipping."))
+            continue
+
+        with METRICS.stage("sql_read"), open(sql_path, "r") as fh:
+            sql_text = fh.read()
+        METRICS.count("sql_files_read")
+
+        # Pick best Excel row by checking column presence inside the SQL text
+        with METRICS.stage("column_matching"):
+            chosen, status = choose_row_for_model_sql(excel_rows, sql_text, column_index)
+        if status == "no-match":
+            # No Excel row’s columns all appear in this SQL → nothing to do
+            continue
+        if status == "ambiguous":
+            events.append(("log", f"   ⚠️ [{model_name}] multiple Excel rows match by columns — skipping to avoid wrong edit."))
+            continue
+
+        target_partition = chosen.partition[0] if chosen.partition else None  # single field
+        target_clusters  = chosen.cluster
+        spec = row_partition_spec(chosen, column_stats)
+        if spec is not None:
+            METRICS.count("partition_type_guessed" if spec.guessed else "partition_type_from_metadata")
+            if spec.data_type is None:
+                events.append(("log", f"   ⚠️ [{model_name}] {target_partition} is {spec.source_type}, "
+                                      "not a date/time column — leaving partition_by out."))
+                target_partition = None
+
+        if not target_partition and not target_clusters:
+            continue
+
+        targets += 1
+        with METRICS.stage("config_injection"):
+            updated_sql, ustatus = update_existing_config(sql_text, target_partition, target_clusters,
+                                                          spec.config() if spec and target_partition else None)
+        METRICS.count(f"config_{ustatus.replace('-', '_')}")
+
+        if ustatus == "no-config":
+            events.append(("log", f"   ⏭️ [{model_name}] has no {{ config(...) }} block — not creating one."))
+            continue
+        if ustatus == "is-view":
+            events.append(("log", f"   ⏭️ [{model_name}] materialized='view' — cannot partition/cluster views."))
+            continue
+        if ustatus == "no-op":
+            events.append(("log", f"   ℹ️ [{model_name}] already configured — no change."))
+            continue
+
+        bits = []
+        if target_partition: bits.append(f"partition_by.field={target_partition}"
+                                         + (f" ({spec.describe()})" if spec else ""))
+        if target_clusters:  bits.append(f"clustered_by={target_clusters}")
+        diff = None
+        if dry_run:
+            with METRICS.stage("diff"):
+                diff = text_diff(sql_path, sql_text, updated_sql)
+        events.append(("edit", model_name, sql_path, updated_sql, "; ".join(bits), diff))
+
+    model_keys = [str(m.get("name", "")).strip().lower() for m in models]
+    return {
+        "path": yml_path,
+        "events": events,
+        "targets": targets,
+        "model_keys": [k for k in model_keys if k],
+        "lookups": stats_delta(LOOKUPS.snapshot(), before),
+        "metrics": METRICS.delta(metrics_before),
+    }
+
+# ---------- Follow-up passes over the whole project ----------
+def read_model_text(path: str, final_texts):
+    """The model as this run left it: its edited text, else what is on disk."""
+    text = final_texts.get(path)
+    if text is None:
+        with open(path, "r") as fh:
+            text = fh.read()
+        METRICS.count("sql_files_read")
+    return text
+
+def apply_model_edit(path: str, updated_sql: str, final_texts, patches=None, **info):
+    """Write the edit (or add its diff against the file on disk to the dry-run patch)."""
+    if patches is not None:
+        with open(path, "r") as fh:
+            original = fh.read()
+        patches.add(path, text_diff(path, original, updated_sql), **info)
+    else:
+        with METRICS.stage("sql_write"):
+            METRICS.count("bytes_written", write_if_changed(path, updated_sql))
+    final_texts[path] = updated_sql
+
+# ---------- clustered_by from query history (--cluster-history) ----------
+def apply_cluster_history(history_path: str, sql_index, final_texts, patches=None,
+                          report: str = CLUSTER_REPORT_FILE):
+    """
+    Rank the columns every table in an exported query log is filtered and joined
+    on, and set clustered_by on the models named like those tables to the top
+    columns, replacing what is there. A model's own partition column is left out.
+    Writes the rankings to `report`; returns the number of models updated.
+    """
+    with METRICS.stage("query_history"):
+        usage = column_usage(iter_history(history_path))
+    models, exclude = {}, {}
+    for table in usage:
+        paths = sql_index.get(table)
+        if not paths or len(paths) != 1:
+            continue
+        text = read_model_text(paths[0], final_texts)
+        own = config_keys(text, table)
+        if own is not None and own.partition_field:
+            exclude[table] = [own.partition_field]
+        models[table] = (paths[0], text)
+    proposals = recommend_clusters(usage, exclude)
+    METRICS.count("history_tables", len(usage))
+    METRICS.count("cluster_proposals", len(proposals))
+    print(f"\n🧭 Query history: {len(usage)} table(s) filtered, clustered_by proposed for {len(proposals)}, "
+          f"{sum(t in models for t in proposals)} of them dbt model(s).")
+
+    updates = 0
+    for table in sorted(proposals):
+        if table not in models:
+            continue
+        path, text = models[table]
+        cols = proposals[table]
+        with METRICS.stage("config_injection"):
+            updated_sql, status = update_existing_config(text, None, cols, replace_cluster=True)
+        METRICS.count(f"history_{status.replace('-', '_')}")
+        if status == "no-config":
+            print(f"   ⏭️ [{table}] clustered_by={cols} proposed but it has no {{ config(...) }} block — not creating one.")
+        elif status == "is-view":
+            print(f"   ⏭️ [{table}] clustered_by={cols} proposed but it is materialized='view'.")
+        elif status == "no-op":
+            print(f"   ℹ️ [{table}] already clustered by {cols}.")
+        else:
+            apply_model_edit(path, updated_sql, final_texts, patches, model=table, clustered_by=cols)
+            updates += 1
+            verb = "Would cluster" if patches is not None else "Clustered"
+            print(f"   🧭 [{table}] {verb} by {cols}")
+
+    if report:
+        with open(report, "w") as fh:
+            json.dump({
+                "history": history_path,
+                "tables": {
+                    table: {
+                        "model": models[table][0] if table in models else None,
+                        "clustered_by": proposals.get(table, []),
+                        "columns": [u.as_dict() for u in rank_columns(usage[table])],
+                    }
+                    for table in sorted(usage)
+                },
+            }, fh, indent=2)
+        print(f"🧭 Column rankings: {report}")
+    return updates
+
+# ---------- Incremental strategy (--incremental-strategy) ----------
+def apply_incremental_strategy(sql_index, final_texts, options, patches=None, column_stats=None,
+                               report: str = INCREMENTAL_REPORT_FILE):
+    """
+    Give every partitioned incremental model without a strategy of its own an
+    insert_overwrite / incremental_predicates config (auto: only models with a
+    unique_key) and estimate how much less of the target a run scans. Estimates need the partition column's stats
+    (--column-stats), looked up by model name as table name. Returns models updated.
+    """
+    stats_by_name = {}
+    for item in (column_stats or {}).values():
+        stats_by_name.setdefault((item.table_name.lower(), item.column_name.lower()), item)
+
+    entries, appends, updates = [], [], 0
+    before_rows = after_rows = 0
+    for name in sorted(sql_index):
+        paths = sql_index[name]
+        if len(paths) != 1:
+            continue
+        path = paths[0]
+        text = read_model_text(path, final_texts)
+        blocks = find_config_blocks(text)
+        added, strategy = incremental_updates(blocks, None, options)
+        if strategy == "append":
+            appends.append(name)
+            print(f"   ℹ️ [{name}] appends (no unique_key) — left as is; "
+                  "--incremental-strategy insert_overwrite opts it in.")
+            continue
+        if not added:
+            continue
+        with METRICS.stage("config_injection"):
+            updated_sql, status = update_existing_config(text, None, None, incremental=options)
+        METRICS.count(f"incremental_{status.replace('-', '_')}")
+        if status != "updated":
+            continue
+        apply_model_edit(path, updated_sql, final_texts, patches, model=name, incremental_strategy=strategy)
+        updates += 1
+
+        partition = partition_dict(config_arg(blocks, "partition_by").value)
+        estimate = scan_estimate(stats_by_name.get((name, str(partition["field"]).lower())),
+                                 partition.get("granularity"), options.lookback_days)
+        entries.append({"model": name, "path": path, "strategy": strategy,
+                        "partition_field": partition["field"], "added": added, "estimate": estimate})
+        if estimate is None:
+            note = "no column stats for a scan estimate"
+        else:
+            note = (f"est. scan -{estimate['scan_reduction_pct']}% "
+                    f"({estimate['partitions_scanned']}/{estimate['partitions_total']} {estimate['granularity']} partitions)")
+            before_rows += estimate.get("rows_scanned_before", 0)
+            after_rows += estimate.get("rows_scanned_after", 0)
+        verb = "Would use" if patches is not None else "Using"
+        print(f"   ⚡ [{name}] {verb} {strategy.replace('_', ' ')} "
+              f"(last {options.lookback_days} day(s)) — {note}")
+
+    if before_rows:
+        print(f"⚡ Estimated target rows scanned per run: {before_rows:,} -> {after_rows:,} "
+              f"(-{100.0 * (1 - after_rows / before_rows):.1f}%).")
+    if report:
+        with open(report, "w") as fh:
+            json.dump({
+                "strategy": options.strategy,
+                "lookback_days": options.lookback_days,
+                "partition_expiration_days": options.expiration_days,
+                "models": entries,
+                "append_models_left_alone": appends,
+            }, fh, indent=2)
+    return updates
+
+# ---------- Key propagation through ref()/source() (--propagate) ----------
+def source_seeds(graph, excel_rows, column_stats=None):
+    """
+    Keys of the source() nodes whose table has partition/cluster columns in the
+    inventory, matched on table name (the first such row wins).
+    """
+    by_table = {}
+    for r in excel_rows:
+        if r.table_name and (r.partition or r.cluster):
+            by_table.setdefault(r.table_name.lower(), r)
+    seeds = {}
+    for node in graph.parents:
+        if not node.startswith("source:"):
+            continue
+        row = by_table.get(node.rpartition(".")[2])
+        if row is None:
+            continue
+        keys = NodeKeys()
+        spec = row_partition_spec(row, column_stats) or (partition_spec(row.partition[0]) if row.partition else None)
+        if spec is not None and spec.data_type:
+            keys.partition_field = spec.field
+            keys.partition_value = spec.config()
+            keys.partition_from = node
+        if row.cluster:
+            keys.cluster = tuple(row.cluster[:MAX_CLUSTER_COLUMNS])
+            keys.cluster_from = node
+        seeds[node] = keys
+    return seeds
+
+def propagate_keys(sql_index, excel_rows, final_texts, patches=None, column_stats=None):
+    """
+    Build the ref()/source() DAG over every uniquely named model (taking this
+    run's edits from final_texts), seed it with each model's own config keys and
+    the inventory's source tables, and add the keys a model inherits to its
+    existing config block. Returns (report dict, number of models updated).
+    """
+    graph = LineageGraph()
+    texts, seeds = {}, {}
+    with METRICS.stage("lineage_graph"):
+        for name, paths in sql_index.items():
+            if len(paths) != 1:
+                continue  # ref() to a duplicated name is ambiguous
+            path = paths[0]
+            text = read_model_text(path, final_texts)
+            graph.add_model(name, path, text)
+            texts[name] = text
+            own = config_keys(text, name)
+            if own is not None:
+                seeds[name] = own
+        seeds.update(source_seeds(graph, excel_rows, column_stats))
+    with METRICS.stage("lineage_propagate"):
+        resolved, cyclic, blocked = propagate(graph, seeds)
+
+    edges = sum(len(p) for p in graph.parents.values())
+    METRICS.count("lineage_nodes", len(graph.parents))
+    METRICS.count("lineage_edges", edges)
+    print(f"\n🧬 Lineage: {len(graph.parents)} node(s), {edges} ref()/source() edge(s), {len(seeds)} with their own keys.")
+    for node in cyclic:
+        print(f"   ⚠️ [{node}] is part of a ref() cycle — not propagating through it.")
+    for node in blocked:
+        print(f"   ⚠️ [{node}] is downstream of a ref() cycle — not propagating to it.")
+
+    entries, updates = [], 0
+    for node in sorted(resolved):
+        keys = resolved[node]
+        if node not in graph.paths or not keys.inherited(node):
+            continue
+        path = graph.paths[node]
+        entry = {"model": node, "path": path}
+        bits = []
+        partition_value = None
+        if keys.partition_field and keys.partition_from != node:
+            partition_value = keys.partition_value
+            entry["partition_by"] = {"field": keys.partition_field, "from": keys.partition_from,
+                                     "hops": keys.partition_depth}
+            bits.append(f"partition_by.field={keys.partition_field} from {keys.partition_from}")
+        cluster = None
+        if keys.cluster and keys.cluster_from != node:
+            cluster = list(keys.cluster)
+            entry["clustered_by"] = {"columns": cluster, "from": keys.cluster_from, "hops": keys.cluster_depth}
+            bits.append(f"clustered_by={cluster} from {keys.cluster_from}")
+        summary = "; ".join(bits)
+
+        with METRICS.stage("config_injection"):
+            updated_sql, status = update_existing_config(texts[node], None, cluster, partition_value)
+        METRICS.count(f"lineage_{status.replace('-', '_')}")
+        entry["status"] = status
+        entries.append(entry)
+
+        if status == "no-config":
+            print(f"   ⏭️ [{node}] inherits {summary} but has no {{ config(...) }} block — not creating one.")
+        elif status == "is-view":
+            print(f"   ⏭️ [{node}] inherits {summary} but is materialized='view'.")
+        elif status == "no-op":
+            print(f"   ℹ️ [{node}] inherits {summary} — already configured.")
+        else:
+            apply_model_edit(path, updated_sql, final_texts, patches, model=node, inherited=summary)
+            updates += 1
+            print(f"   {'📝' if patches is not None else '🧬'} [{node}] "
+                  f"{'Would inherit' if patches is not None else 'Inherited'} {summary}")
+
+    report = {
+        "nodes": len(graph.parents),
+        "edges": edges,
+        "seeded": sorted(seeds),
+        "cyclic": cyclic,
+        "blocked_by_cycle": blocked,
+        "models": entries,
+    }
+    return report, updates
+
+_worker_ctx = {}
+
+def replay_plan(plan, edited, final_texts, patches=None, planned_ahead=False) -> int:
+    """
+    Print a plan's logs and apply its edits in order (or add them to the dry-run
+    patch); returns the number of models updated. planned_ahead: the plan was made
+    before this run's earlier edits were applied (worker processes, dry run), so a
+    model another schema.yml already edited is left as it is.
+    """
+    updates = 0
+    for event in plan["events"]:
+        if event[0] == "log":
+            print(event[1])
+            continue
+        _, model_name, sql_path, updated_sql, summary, diff = event
+        if planned_ahead and sql_path in edited:
+            # planned against the pre-run text; an earlier schema.yml already edited it
+            print(f"   ℹ️ [{model_name}] already updated earlier in this run — no change.")
+            continue
+        if patches is not None:
+            patches.add(sql_path, diff, model=model_name, change=summary)
+            edited.add(sql_path)
+            final_texts[sql_path] = updated_sql
+            updates += 1
+            print(f"   📝 [{model_name}] Would update {sql_path}: " + summary)
+            continue
+        with METRICS.stage("sql_write"):
+            METRICS.count("bytes_written", write_if_changed(sql_path, updated_sql))
+        edited.add(sql_path)
+        final_texts[sql_path] = updated_sql
+        updates += 1
+        print(f"   ✅ [{model_name}] Updated {sql_path}: " + summary)
+    return updates
+
+def _init_worker(excel_rows, column_index, sql_index, dry_run, column_stats):
+    _worker_ctx["args"] = (excel_rows, column_index, sql_index, dry_run, column_stats)
+
+def _plan_in_worker(yml_path: str):
+    return plan_schema_file(yml_path, *_worker_ctx["args"])
+
+# ---------- Watch mode (--watch) ----------
+class WatchSession:
+    """
+    What the first run loaded, kept in memory between edits: inventory rows and
+    their column index, column stats, the .sql index and the models each
+    schema.yml declares. on_change() re-plans only the schema.yml files a batch
+    of changed paths touches and returns the .sql files it wrote.
+    """
+
+    def __init__(self, inventory, inventory_backend, column_stats, excel_rows, column_index, stats,
+                 sql_index, declared):
+        self.inventory = inventory
+        self.inventory_backend = inventory_backend
+        self.column_stats = column_stats
+        self.excel_rows = excel_rows
+        self.column_index = column_index
+        self.stats = stats
+        self.sql_index = sql_index
+        self.declared = declared  # yml_path -> model keys
+
+    def reload_inventory(self):
+        rows = load_excel_rows(self.inventory, self.inventory_backend)
+        if not rows:
+            print("   ⚠️ No usable rows in the new inventory — keeping the previous one.")
+            return False
+        self.excel_rows, self.column_index = rows, build_column_index(rows)
+        if self.column_stats and os.path.exists(self.column_stats):
+            self.stats = load_column_stats(self.column_stats)
+        return True
+
+    def index_sql(self, path: str, exists: bool):
+        key = os.path.basename(path)[:-4].lower()
+        paths = self.sql_index.setdefault(key, [])
+        if exists and path not in paths:
+            paths.append(path)
+        elif not exists and path in paths:
+            paths.remove(path)
+        if not paths:
+            del self.sql_index[key]
+        return key
+
+    def on_change(self, paths):
+        start = time.perf_counter()
+        print(f"\n🔄 {len(paths)} change(s): " + ", ".join(paths))
+        todo = set()
+        if self.inventory in paths or (self.column_stats and self.column_stats in paths):
+            if self.reload_inventory():
+                todo.update(self.declared)
+        for path in paths:
+            name = os.path.basename(path).lower()
+            exists = os.path.exists(path)
+            if name.endswith(".sql"):
+                key = self.index_sql(path, exists)
+                todo.update(yml for yml, keys in self.declared.items() if key in keys)
+            elif name in ("schema.yml", "schema.yaml"):
+                if exists:
+                    todo.add(path)
+                else:
+                    self.declared.pop(path, None)
+
+        edited, updates = set(), 0
+        for yml_path in sorted(todo, key=str.lower):
+            plan = plan_schema_file(yml_path, self.excel_rows, self.column_index, self.sql_index,
+                                    column_stats=self.stats)
+            print(f"\n📂 Schema file: {yml_path}")
+            updates += replay_plan(plan, edited, {})
+            self.declared[yml_path] = plan["model_keys"] or []
+        print(f"⏱️ Re-planned {len(todo)} schema.yml file(s), {updates} model(s) updated "
+              f"in {time.perf_counter() - start:.3f}s.")
+        return edited
 
 # ---------- Main: file-by-file over schema.yml, then models ----------
-def main():
-    excel_rows = load_excel_rows(EXCEL_FILE)
+def main(incremental: bool = False, jobs: int = 1, report: str = REPORT_FILE,
+         inventory: str = None, project_dir: str = None, dry_run: str = None,
+         inventory_backend: str = None, lineage: str = None, column_stats: str = None,
+         fetch_column_stats: bool = False, cluster_history: str = None,
+         incremental_strategy: str = None, lookback_days: int = LOOKBACK_DAYS,
+         partition_expiration_days: int = None, watch: bool = False, source_inventory: str = None):
+    """
+    dry_run: patch file path; when set no .sql file or state manifest is written.
+    inventory_backend: "stream", "pandas" or "auto" (default dbt_inventory.INVENTORY_BACKEND).
+    lineage: report path; when set, keys are also propagated downstream through ref()/source().
+    column_stats: partition column stats snapshot; fetch_column_stats=True refreshes it from Snowflake first,
+    finding each table's Snowflake database/schema in source_inventory (default SOURCE_INVENTORY_FILE).
+    cluster_history: exported query log; clustered_by is then set from the columns queries filter on.
+    incremental_strategy: "auto", "insert_overwrite" or "merge_predicates" for partitioned
+    incremental models (see dbt_incremental.IncrementalOptions); None leaves them alone.
+    watch: after the run, keep everything loaded and re-plan the schema.yml files that
+    edited .sql/schema.yml files touch (the project-wide passes above run once only).
+    """
+    METRICS.reset()
+    inventory = inventory or EXCEL_FILE
+    project_dir = project_dir or DBT_PROJECT_DIR
+    with METRICS.stage("inventory_load"):
+        excel_rows = load_excel_rows(inventory, inventory_backend)
+        column_index = build_column_index(excel_rows)
+    METRICS.count("inventory_rows", len(excel_rows))
     if not excel_rows:
         print("⚠️ No usable rows in Excel. Exiting.")
         return
+    stats = None
+    if column_stats:
+        with METRICS.stage("column_stats"):
+            stats = load_partition_metadata(column_stats, excel_rows, fetch_column_stats, source_inventory)
+        METRICS.count("column_stats", len(stats))
+
+    with METRICS.stage("tree_scan"):
+        schema_files = list_schema_ymls(project_dir)
+        sql_index, duplicates = build_sql_index(project_dir)
+    METRICS.count("schema_files", len(schema_files))
+    METRICS.count("sql_files_indexed", sum(len(paths) for paths in sql_index.values()))
+    mode = f"in {jobs} worker processes" if jobs > 1 else "sequentially"
+    print(f"🔍 Found {len(schema_files)} schema.yml files. Processing {mode}...")
+
+    print(f"🗂️ Indexed {len(sql_index)} model .sql file name(s).")
+    for name in sorted(duplicates):
+        print(f"   ⚠️ Duplicate model name '{name}': " + ", ".join(duplicates[name]))
 
-    schema_files = list_schema_ymls(DBT_PROJECT_DIR)
-    print(f"🔍 Found {len(schema_files)} schema.yml files. Processing sequentially...")
+    manifest = StateManifest(STATE_FILE) if incremental else None
+    excel_digest = digest([r.as_tuple() for r in excel_rows])
+    if stats is not None:
+        excel_digest = digest([excel_digest, sorted(s.as_tuple() for s in stats.values())])
 
     total_targets = 0
     total_updates = 0
+    total_skipped = 0
+    lookup_stats = {}
 
+    todo = []
+    declared = {}  # yml_path -> model keys it declares, for --watch
     for yml_path in schema_files:
-        print(f"\n📂 Schema file: {yml_path}")
-        try:
-            with open(yml_path, "r") as f:
-                data = yaml.load(f) or {}
-        except Exception as e:
-            print(f"   ❌ Failed to parse YAML: {e}")
-            continue
-
-        models = data.get("models", [])
-        if not isinstance(models, list) or not models:
-            print("   ℹ️ No models key or empty — skipping.")
-            continue
-
-        for m in models:
-            model_name = str(m.get("name", "")).strip()
-            if not model_name:
-                continue
-            key = model_name.lower()
-
-            # Locate <model>.sql strictly by filename from ROOT
-            sql_path = find_sql_by_filename(DBT_PROJECT_DIR, key)
-            if not sql_path or not os.path.exists(sql_path):
-                print(f"   ⚠️ [{model_name}] could not find {key}.sql from root — skipping.")
+        if manifest is not None:
+            inputs = model_inputs(sql_index, manifest.models(yml_path), os.path.dirname(yml_path), excel_digest)
+            if manifest.unchanged(yml_path, file_hash(yml_path), inputs):
+                declared[yml_path] = manifest.models(yml_path)
+                total_skipped += 1
                 continue
+        todo.append(yml_path)
 
-            with open(sql_path, "r") as fh:
-                sql_text = fh.read()
+    # Workers only read and plan (and diff, for --dry-run); edits are applied here
+    # in schema_files order, so logs and results are identical for any --jobs value.
+    if jobs > 1 and len(todo) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker,
+            initargs=(excel_rows, column_index, sql_index, bool(dry_run), stats)
+        )
+        plans = executor.map(_plan_in_worker, todo, chunksize=max(1, len(todo) // (jobs * 4)))
+    else:
+        executor = None
+        plans = (plan_schema_file(p, excel_rows, column_index, sql_index, bool(dry_run), stats) for p in todo)
 
-            # Pick best Excel row by checking column presence inside the SQL text
-            chosen, status = choose_row_for_model_sql(excel_rows, sql_text)
-            if status == "no-match":
-                # No Excel row’s columns all appear in this SQL → nothing to do
-                continue
-            if status == "ambiguous":
-                print(f"   ⚠️ [{model_name}] multiple Excel rows match by columns — skipping to avoid wrong edit.")
-                continue
+    patches = PatchSet("partition_cluster") if dry_run else None
+    edited = set()
+    final_texts = {}  # sql_path -> text after this run's edits, for --propagate
+    try:
+        for plan in plans:
+            yml_path = plan["path"]
+            print(f"\n📂 Schema file: {yml_path}")
+            total_targets += plan["targets"]
+            lookup_stats = {k: lookup_stats.get(k, 0) + v for k, v in plan["lookups"].items()}
+            if executor is not None:
+                METRICS.merge(plan["metrics"])  # sequential plans already counted here
+            total_updates += replay_plan(plan, edited, final_texts, patches,
+                                         planned_ahead=executor is not None or patches is not None)
+            declared[yml_path] = plan["model_keys"] or []
 
-            target_partition = chosen["partition"][0] if chosen["partition"] else None  # single field
-            target_clusters  = chosen["cluster"]
+            if manifest is not None and patches is None and plan["model_keys"] is not None:
+                manifest.record(yml_path, file_hash(yml_path),
+                                model_inputs(sql_index, plan["model_keys"], os.path.dirname(yml_path), excel_digest))
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
-            if not target_partition and not target_clusters:
-                continue
+    clustered = 0
+    if cluster_history:
+        clustered = apply_cluster_history(cluster_history, sql_index, final_texts, patches)
 
-            total_targets += 1
-            updated_sql, ustatus = update_existing_config(sql_text, target_partition, target_clusters)
+    inherited = 0
+    if lineage:
+        lineage_report, inherited = propagate_keys(sql_index, excel_rows, final_texts, patches, stats)
+        with open(lineage, "w") as fh:
+            json.dump(lineage_report, fh, indent=2)
+        print(f"🧬 {inherited} model(s) {'would inherit' if patches is not None else 'inherited'} "
+              f"partition/cluster keys. Report: {lineage}")
 
-            if ustatus == "no-config":
-                print(f"   ⏭️ [{model_name}] has no {{ config(...) }} block — not creating one.")
-                continue
-            if ustatus == "is-view":
-                print(f"   ⏭️ [{model_name}] materialized='view' — cannot partition/cluster views.")
-                continue
-            if ustatus == "no-op":
-                print(f"   ℹ️ [{model_name}] already configured — no change.")
-                continue
+    strategies = 0
+    if incremental_strategy:
+        print("\n⚡ Incremental strategy for partitioned incremental models:")
+        options = IncrementalOptions(incremental_strategy, lookback_days, partition_expiration_days)
+        strategies = apply_incremental_strategy(sql_index, final_texts, options, patches, stats)
+        print(f"⚡ {strategies} incremental model(s) {'would be updated' if patches is not None else 'updated'}. "
+              f"Report: {INCREMENTAL_REPORT_FILE}")
 
-            with open(sql_path, "w") as fh:
-                fh.write(updated_sql)
-            total_updates += 1
+    if manifest is not None:
+        if patches is None:
+            for path in set(manifest.entries) - set(schema_files):
+                manifest.forget(path)
+            manifest.save()
+        print(f"\n⏩ Skipped {total_skipped} unchanged schema.yml file(s).")
+    METRICS.count("schema_files_skipped", total_skipped)
+    METRICS.count("sql_files_updated", total_updates)
+    METRICS.count("sql_files_inherited", inherited)
+    METRICS.count("sql_files_clustered_from_history", clustered)
+    METRICS.count("sql_files_incremental_strategy", strategies)
+    for name, n in lookup_stats.items():
+        METRICS.count(f"lookup_{name}", n)
 
-            bits = []
-            if target_partition: bits.append(f"partition_by.field={target_partition}")
-            if target_clusters:  bits.append(f"clustered_by={target_clusters}")
-            print(f"   ✅ [{model_name}] Updated {sql_path}: " + "; ".join(bits))
+    if lookup_stats:
+        print(f"\n🔍 Column matching: {format_lookup_stats(lookup_stats)}.")
+    if patches is not None:
+        with METRICS.stage("patch_write"):
+            patches.write(dry_run)
+        print(f"\n🎉 Completed (dry run). {total_updates}/{max(total_targets,1)} SQL model(s) would be updated.")
+    else:
+        print(f"\n🎉 Completed. {total_updates}/{max(total_targets,1)} SQL model(s) updated.")
+    if report:
+        METRICS.write_report(report, "partition_cluster",
+                             {"jobs": jobs, "incremental": incremental, "dry_run": bool(dry_run),
+                              "propagate": bool(lineage), "column_stats": bool(stats),
+                              "cluster_history": bool(cluster_history),
+                              "incremental_strategy": incremental_strategy})
+    if watch:
+        session = WatchSession(inventory, inventory_backend, column_stats, excel_rows, column_index, stats,
+                               sql_index, declared)
+        watcher = FileWatcher(project_dir, (".sql", "schema.yml", "schema.yaml"),
+                              extra_files=(inventory, column_stats), prune=_is_pruned_dir)
+        watcher.run(session.on_change)
 
-    print(f"\n🎉 Completed. {total_updates}/{max(total_targets,1)} SQL model(s) updated.")
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Add partition_by/clustered_by to dbt model configs.")
+    parser.add_argument("--inventory", default=EXCEL_FILE,
+                        help="bq_partition_cluster inventory (.xlsx, .csv or .parquet)")
+    parser.add_argument("--inventory-backend", choices=["auto", "stream", "pandas"],
+                        help="clean the inventory row by row or column-wise with pandas "
+                             "(auto: pandas for large files when installed)")
+    parser.add_argument("--project-dir", default=DBT_PROJECT_DIR, help="dbt models folder to scan")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip schema.yml files whose YAML, SQL and Excel inputs are unchanged")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="plan schema.yml files in N worker processes")
+    parser.add_argument("--report", default=REPORT_FILE,
+                        help="JSON file for per-stage timings and counters (empty string to disable)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile the run: cProfile stats, or pyinstrument HTML for a .html path")
+    parser.add_argument("--dry-run", nargs="?", const=PATCH_FILE, metavar="PATCH",
+                        help=f"write no .sql files; save a unified diff (default {PATCH_FILE}) "
+                             "and a JSON summary next to it")
+    parser.add_argument("--propagate", nargs="?", const=LINEAGE_FILE, metavar="REPORT",
+                        help="also pass partition/cluster keys down the ref()/source() DAG to models "
+                             f"that keep the key columns; report which model inherits what (default {LINEAGE_FILE})")
+    parser.add_argument("--column-stats", metavar="PATH",
+                        help="snapshot of partition column types, row counts and date ranges (.csv, .xlsx "
+                             "or .parquet); partition data_type and granularity come from it instead of "
+                             "the column name")
+    parser.add_argument("--fetch-column-stats", action="store_true",
+                        help="query Snowflake for the inventory's partition columns first and save the "
+                             f"snapshot to --column-stats (default {COLUMN_STATS_FILE})")
+    parser.add_argument("--source-inventory", default=SOURCE_INVENTORY_FILE,
+                        help="sf_table_inventory (.xlsx, .csv or .parquet) giving each table's Snowflake "
+                             "database and schema for --fetch-column-stats")
+    parser.add_argument("--cluster-history", metavar="LOG",
+                        help="BigQuery JOBS or Snowflake QUERY_HISTORY export (.csv, .xlsx or .parquet); "
+                             "set clustered_by to the columns queries filter on most "
+                             f"(rankings in {CLUSTER_REPORT_FILE})")
+    parser.add_argument("--incremental-strategy", nargs="?", const="auto",
+                        choices=["auto", "insert_overwrite", "merge_predicates"],
+                        help="give partitioned incremental models insert_overwrite or merge "
+                             "incremental_predicates over recent partitions (auto: predicates for models "
+                             "with a unique_key, append models untouched; insert_overwrite replaces whole "
+                             "partitions, so only use it when the is_incremental() filter selects them); "
+                             f"scan estimates go to {INCREMENTAL_REPORT_FILE}")
+    parser.add_argument("--lookback-days", type=int, default=LOOKBACK_DAYS,
+                        help="days of target partitions an incremental run may touch")
+    parser.add_argument("--partition-expiration-days", type=int,
+                        help="also set partition_expiration_days on those models")
+    parser.add_argument("--watch", action="store_true",
+                        help="after the run, keep the inventory and project index in memory and "
+                             "re-plan only the schema.yml files that edited files touch "
+                             "(watchdog events when installed, else polling)")
+    args = parser.parse_args(argv)
+    if args.watch and args.dry_run:
+        parser.error("--watch writes as you edit; it cannot be combined with --dry-run")
+    if args.fetch_column_stats and not args.column_stats:
+        args.column_stats = COLUMN_STATS_FILE
+    with profiled(args.profile):
+        main(incremental=args.incremental, jobs=args.jobs, report=args.report,
+             inventory=args.inventory, project_dir=args.project_dir, dry_run=args.dry_run,
+             inventory_backend=args.inventory_backend, lineage=args.propagate,
+             column_stats=args.column_stats, fetch_column_stats=args.fetch_column_stats,
+             cluster_history=args.cluster_history, incremental_strategy=args.incremental_strategy,
+             lookback_days=args.lookback_days, partition_expiration_days=args.partition_expiration_days,
+             watch=args.watch, source_inventory=args.source_inventory)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    cli()
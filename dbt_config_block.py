@@ -0,0 +1,214 @@
+import re
+
+# ---------- Scanner ----------
+# Jinja openers outside any expression; `{#` comments are skipped whole, so a
+# commented-out config() is never picked up.
+_OPEN_RE = re.compile(r"\{\{|\{#")
+# Inside an expression: string literals are consumed as one token so brackets
+# and `}}` inside them never count; everything else that matters is one char.
+_EXPR_TOKEN_RE = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[()\[\]{},]|\}\}""", re.DOTALL)
+# Expressions with no braces inside ({{ ref('x') }}, {{ var("d") }}) are skipped
+# by this one match; anything else falls back to _scan_to_close.
+_PLAIN_EXPR_RE = re.compile(r"""(?:[^'"{}]|'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")*\}\}""", re.DOTALL)
+_CONFIG_CALL_RE = re.compile(r"\{\{-?\s*config\s*\(", re.IGNORECASE)
+_CLOSE_RE = re.compile(r"\s*-?\}\}")
+_KWARG_RE = re.compile(r"\s*([A-Za-z_]\w*)\s*=(?!=)\s*")
+_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+class ConfigArg:
+    """One argument of a config() call; spans index into the scanned SQL text."""
+
+    __slots__ = ("key", "value", "start", "end", "value_start")
+
+    def __init__(self, key, value, start, end, value_start):
+        self.key = key                  # None for a positional argument
+        self.value = value              # source text of the value
+        self.start = start              # first non-blank char of the argument
+        self.end = end                  # one past its last non-blank char
+        self.value_start = value_start  # value spans value_start:end
+
+    def __repr__(self):
+        return f"ConfigArg({self.key!r}, {self.value!r})"
+
+class ConfigBlock:
+    """A `{{ config(...) }}` expression: outer span, the parentheses and its arguments."""
+
+    __slots__ = ("start", "end", "open_paren", "close_paren", "args")
+
+    def __init__(self, start, end, open_paren, close_paren, args):
+        self.start = start
+        self.end = end
+        self.open_paren = open_paren
+        self.close_paren = close_paren
+        self.args = args
+
+    def get(self, key: str):
+        for arg in self.args:
+            if arg.key == key:
+                return arg
+        return None
+
+    def __repr__(self):
+        return f"ConfigBlock({self.start}:{self.end}, {self.args!r})"
+
+def _scan_to_close(text: str, pos: int, stop_at_paren: bool):
+    """
+    Walk an expression from `pos`, skipping strings and balanced brackets.
+    stop_at_paren: return (index of the unmatched ')', top-level comma positions).
+    Otherwise return (index just past the closing '}}', None). Returns (None, None)
+    when the text ends first.
+    """
+    stack, commas = [], []
+    for m in _EXPR_TOKEN_RE.finditer(text, pos):
+        tok = m.group()
+        if tok in ("(", "[", "{"):
+            stack.append(tok)
+        elif tok in _PAIRS:
+            if stack and stack[-1] == _PAIRS[tok]:
+                stack.pop()
+            elif stop_at_paren and tok == ")" and not stack:
+                return m.start(), commas
+        elif tok == "," and stop_at_paren and not stack:
+            commas.append(m.start())
+        elif tok == "}}" and not stack:
+            if not stop_at_paren:
+                return m.end(), None
+            return None, None  # `}}` before config( was closed: not a usable block
+    return None, None
+
+def _parse_args(text: str, open_paren: int, close_paren: int, commas):
+    args = []
+    bounds = [open_paren] + commas + [close_paren]
+    for left, right in zip(bounds, bounds[1:]):
+        piece = text[left + 1:right]
+        if not piece.strip():
+            continue  # trailing comma or empty call
+        start = left + 1 + (len(piece) - len(piece.lstrip()))
+        end = right - (len(piece) - len(piece.rstrip()))
+        m = _KWARG_RE.match(text, left + 1, right)
+        if m:
+            args.append(ConfigArg(m.group(1), text[m.end():end], start, end, m.end()))
+        else:
+            args.append(ConfigArg(None, text[start:end], start, end, start))
+    return args
+
+def find_config_blocks(sql_text: str):
+    """Every `{{ config(...) }}` in the model, in order, found in one left-to-right pass."""
+    blocks = []
+    pos = 0
+    while True:
+        m = _OPEN_RE.search(sql_text, pos)
+        if not m:
+            return blocks
+        if m.group() == "{#":
+            close = sql_text.find("#}", m.end())
+            if close < 0:
+                return blocks
+            pos = close + 2
+            continue
+
+        call = _CONFIG_CALL_RE.match(sql_text, m.start())
+        if call:
+            open_paren = call.end() - 1
+            close_paren, commas = _scan_to_close(sql_text, call.end(), stop_at_paren=True)
+            if close_paren is not None:
+                tail = _CLOSE_RE.match(sql_text, close_paren + 1)
+                if tail:
+                    args = _parse_args(sql_text, open_paren, close_paren, commas)
+                    blocks.append(ConfigBlock(m.start(), tail.end(), open_paren, close_paren, args))
+                    pos = tail.end()
+                    continue
+        # any other expression: jump past its `}}`
+        plain = _PLAIN_EXPR_RE.match(sql_text, m.end())
+        if plain:
+            pos = plain.end()
+            continue
+        end, _ = _scan_to_close(sql_text, m.end(), stop_at_paren=False)
+        if end is None:
+            return blocks
+        pos = end
+
+# ---------- Reading values ----------
+def config_arg(blocks, key: str):
+    """The argument that wins for `key`: dbt applies config() calls in order, so the last one."""
+    found = None
+    for block in blocks:
+        arg = block.get(key)
+        if arg is not None:
+            found = arg
+    return found
+
+def literal_value(value_text: str):
+    """The string behind a plain quoted literal ('view' -> view), else None."""
+    v = value_text.strip()
+    if len(v) >= 2 and v[0] == v[-1] and v[0] in "'\"" and v[0] not in v[1:-1]:
+        return v[1:-1]
+    return None
+
+# ---------- Rewriting ----------
+def _line_indent(text: str, pos: int):
+    """Leading whitespace of the line holding `pos` when only whitespace precedes it, else None."""
+    line_start = text.rfind("\n", 0, pos) + 1
+    prefix = text[line_start:pos]
+    return prefix if not prefix.strip() else None
+
+def _insertion(text: str, block: ConfigBlock, new_args):
+    """(position, text) that appends `new_args` ("key = value" strings) to the block's call."""
+    if not block.args:
+        return block.open_paren + 1, ", ".join(new_args)
+
+    last = block.args[-1]
+    between = text[last.end:block.close_paren]
+    trailing_comma = between.lstrip().startswith(",")
+    anchor = last.end + between.index(",") + 1 if trailing_comma else last.end
+    multiline = "\n" in text[block.open_paren:block.close_paren]
+
+    if multiline:
+        indent = _line_indent(text, last.start)
+        if indent is None:
+            indent = (_line_indent(text, block.start) or "") + "    "
+        sep = "\n" + indent
+        if trailing_comma:
+            return anchor, "".join(f"{sep}{a}," for a in new_args)
+        return anchor, "".join(f",{sep}{a}" for a in new_args)
+    if trailing_comma:
+        return anchor, "".join(f" {a}," for a in new_args)
+    return anchor, "".join(f", {a}" for a in new_args)
+
+def rewrite_config(sql_text: str, updates, overwrite=False, blocks=None):
+    """
+    Set config keys in place. updates: {key: value source text}, in insertion order.
+    Keys already set in any config() call are left alone unless overwrite is True
+    (or a collection naming them), in which case the winning (last) argument's
+    value is replaced where it stands.
+    Missing keys are appended to the first config() call, keeping its layout.
+    Returns (new_sql, changed_keys); changed_keys is empty when nothing changed
+    or the model has no config() block.
+    """
+    if blocks is None:
+        blocks = find_config_blocks(sql_text)
+    if not blocks:
+        return sql_text, []
+
+    replace = set(updates) if overwrite is True else set(overwrite or ())
+    edits = []  # (start, end, replacement)
+    changed, to_add = [], []
+    for key, value in updates.items():
+        current = config_arg(blocks, key)
+        if current is None:
+            to_add.append(f"{key} = {value}")
+            changed.append(key)
+        elif key in replace and current.value.strip() != value.strip():
+            edits.append((current.value_start, current.end, value))
+            changed.append(key)
+
+    if to_add:
+        pos, text = _insertion(sql_text, blocks[0], to_add)
+        edits.append((pos, pos, text))
+    if not edits:
+        return sql_text, []
+
+    out = sql_text
+    for start, end, replacement in sorted(edits, key=lambda e: e[0], reverse=True):
+        out = out[:start] + replacement + out[end:]
+    return out, changed
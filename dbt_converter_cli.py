@@ -0,0 +1,39 @@
+import argparse
+import importlib
+import sys
+
+# ---------- Subcommands ----------
+# name -> (module, entry function, one-line help). Nothing below imports the
+# converters up front: the chosen module is imported only when its command runs,
+# so `--help` never loads ruamel, openpyxl or snowflake.connector, and a warehouse
+# connection is opened only by commands that query Snowflake.
+COMMANDS = {
+    "generate": ("dbt_converter_v0", "main",
+                 "one schema.yml per Snowflake schema from column tags (v0)"),
+    "merge-columns": ("dbt_converter_pr3", "main",
+                      "merge Snowflake columns/comments/policy tags into existing schema.yml files"),
+    "partition-cluster": ("dbt_column_converter", "cli",
+                          "add partition_by/clustered_by to model config blocks (offline unless "
+                          "--fetch-column-stats)"),
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="dbt-converter",
+        description="dbt conversion helpers. Run `<command> --help` for the options of each command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {name:<18} {doc}" for name, (_, _, doc) in COMMANDS.items()),
+    )
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    module_name, func_name, _ = COMMANDS[args.command]
+    entry = getattr(importlib.import_module(module_name), func_name)
+    sys.argv[0] = f"dbt-converter {args.command}"  # usage lines of the subcommand's own parser
+    return entry(args.args)
+
+if __name__ == "__main__":
+    sys.exit(main())
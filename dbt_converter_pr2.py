@@ -1,76 +1,48 @@
 
-import io 
+import argparse
 import os
-import pandas as pd
-import snowflake.connector
 import re
 from ruamel.yaml import YAML
+from dbt_metadata import (
+    FETCH_POOL_SIZE, ConnectionPool, build_column, fetch_inventory_metadata,
+    is_blank, snowflake_connect, table_key
+)
+from dbt_ddl_parser import parse_create_table
+from dbt_inventory import load_table_map
+from dbt_io import dump_yaml_text, write_if_changed
+from dbt_state import StateManifest, digest, file_hash, state_path
 
 # ---------- CONFIGURATION ----------
 EXCEL_FILE = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/sf_table_inventory.xlsx"
 DBT_PROJECT_DIR = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/models"
+METADATA_SOURCE = "get_ddl"  # or "information_schema" for bulk column + TAG_REFERENCES queries
+STATE_FILE = state_path("merge_columns_pr2")  # used by --incremental
 # -----------------------------------
 
+parser = argparse.ArgumentParser(description="Merge Snowflake column metadata into dbt schema.yml files.")
+parser.add_argument("--incremental", action="store_true",
+                    help="skip schema.yml files whose YAML, Excel row and table metadata are unchanged")
+args = parser.parse_args()
+
 # --- YAML setup ---
 yaml_handler = YAML()
 yaml_handler.preserve_quotes = True
 yaml_handler.indent(mapping=2, sequence=4, offset=2)
 
-# --- Snowflake connection ---
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-    role=os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN")
-)
-print("✅ Connected to Snowflake successfully.")
+# --- Snowflake connections (opened lazily, up to FETCH_POOL_SIZE at once) ---
+pool = ConnectionPool(snowflake_connect, size=FETCH_POOL_SIZE)
+print(f"✅ Snowflake connection pool ready (max {pool.size} connections).")
 
 # --- Load Excel ---
-df = pd.read_excel(EXCEL_FILE)
-excel_map = {
-    str(row["table_name"]).strip().lower(): (row["database"], row["schema"])
-    for _, row in df.iterrows()
-}
+excel_map = load_table_map(EXCEL_FILE)
 print(f"📘 Loaded Excel with {len(excel_map)} table mappings.")
 
-# --- Regex to parse DDL ---
-ddl_pattern = re.compile(
-    r"""^\s*
-    (?P<col_name>"?[\w\s]+"?)\s+
-    [\w\(\),]+
-    (?:\s+WITH\s+TAG\s+\((?P<tag_content>.+?)\))?
-    (?:\s+COMMENT\s+'(?P<comment>.*?)')?
-    ,?$""",
-    re.IGNORECASE | re.VERBOSE | re.MULTILINE
-)
-
+# --- DDL parsing ---
 def parse_ddl_to_dbt(ddl_string):
     columns = []
-    for match in ddl_pattern.finditer(ddl_string):
-        col_name = match.group("col_name").strip('"')
-        tag_content = match.group("tag_content")
-        desc_content = match.group("comment") or ""
-        dbt_tags = []
-        policy_tag = ""
-
-        amber_tag = "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/taxonomies/3457114866031680/policyTags/1513664955126269388"
-        red_tag = "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/taxonomies/1160578347745627110/policyTags/4489624887166714321"
-
-        if tag_content:
-            tag_pairs = re.findall(r"([\w\.]+)\s*=\s*'([^']+)'", tag_content)
-            dbt_tags = [tag_value.lower() for _, tag_value in tag_pairs]
-            if 'amber' in dbt_tags:
-                policy_tag = amber_tag
-            elif 'red' in dbt_tags:
-                policy_tag = red_tag
-
-        tag_final = {"policy_tags": policy_tag} if policy_tag else {}
-        columns.append({
-            "name": col_name,
-            "description": desc_content,
-            "meta": tag_final
-        })
+    for col in parse_create_table(ddl_string):
+        tag_values = [value for _, value in col["tags"]]
+        columns.append(build_column(col["name"], col["comment"], tag_values))
     return columns
 
 def upsert_columns(existing_columns, new_columns, model_name):
@@ -78,21 +50,21 @@ def upsert_columns(existing_columns, new_columns, model_name):
     existing_by_name = {col["name"].lower(): col for col in existing_columns}
     logs = []
     for new_col in new_columns:
-        name = new_col["name"]
+        name = new_col.name
         key = name.lower()
         if key in existing_by_name:
             existing_col = existing_by_name[key]
             changed = []
-            if not existing_col.get("description") and new_col.get("description"):
-                existing_col["description"] = new_col["description"]
+            if not existing_col.get("description") and new_col.description:
+                existing_col["description"] = new_col.description
                 changed.append("description")
-            if not existing_col.get("meta") and new_col.get("meta"):
-                existing_col["meta"] = new_col["meta"]
+            if not existing_col.get("meta") and new_col.tags.policy is not None:
+                existing_col["meta"] = new_col.meta
                 changed.append("meta")
             if changed:
                 logs.append(f"🔁 [{model_name}] updated {', '.join(changed)} for {name}")
         else:
-            existing_columns.append(new_col)
+            existing_columns.append(new_col.as_dict())
             logs.append(f"➕ [{model_name}] added new column: {name}")
     return logs
 
@@ -106,11 +78,42 @@ def find_all_schema_yml(root_dir):
                 schema_files.append(os.path.join(dirpath, f))
     return schema_files
 
+def model_inputs(model_keys, excel_map, prefetched):
+    """Digest per model of what decides its merge: the Excel row and the fetched columns."""
+    inputs = {}
+    for key in model_keys:
+        row = excel_map.get(key)
+        columns = None
+        if row and not is_blank(row[0]) and not is_blank(row[1]):
+            table = prefetched.get(table_key(row[0], row[1], key))
+            columns = table.column_dicts() if table is not None else None
+        inputs[key] = digest([row, columns])
+    return inputs
+
+
 # --- Main process ---
 schema_files = find_all_schema_yml(DBT_PROJECT_DIR)
 print(f"🔍 Found {len(schema_files)} schema.yml files to process.")
 
+# --- Fetch column metadata up front, spread over the connection pool ---
+inventory = [(db, sch, table) for table, (db, sch) in excel_map.items()]
+prefetched = fetch_inventory_metadata(
+    pool, inventory, source=METADATA_SOURCE, parse_ddl=parse_ddl_to_dbt
+)
+pool.close()
+
+manifest = StateManifest(STATE_FILE) if args.incremental else None
+skipped = 0
+bytes_written = 0
+files_unchanged = 0
+
 for yaml_path in schema_files:
+    if manifest is not None and manifest.unchanged(
+        yaml_path, file_hash(yaml_path), model_inputs(manifest.models(yaml_path), excel_map, prefetched)
+    ):
+        skipped += 1
+        continue
+
     print(f"\n📂 Processing: {yaml_path}")
     with open(yaml_path, "r") as f:
         yaml_data = yaml_handler.load(f) or {}
@@ -131,32 +134,24 @@ for yaml_path in schema_files:
         database, schema = excel_map[table_lc]
 
         # --- Skip if database/schema missing ---
-        if not database or not schema or str(database).strip() in ("", "nan") or str(schema).strip() in ("", "nan"):
+        if is_blank(database) or is_blank(schema):
             print(f"⚠️ Skipping {table} — missing database or schema info in Excel.")
             continue
 
-        # --- Fetch DDL ---
-        cur = conn.cursor()
-        try:
-            cur.execute(f"SELECT GET_DDL('TABLE', '{database}.{schema}.{table}')")
-            ddl_string = cur.fetchone()[0]
-        except Exception as e:
-            print(f"❌ Failed to fetch DDL for {table}: {e}")
+        # --- Look up prefetched columns ---
+        new_columns = prefetched.get(table_key(database, schema, table_lc))
+        if new_columns is None:
+            print(f"❌ No metadata found for {table} in {database}.{schema}")
             continue
-        finally:
-            cur.close()
 
-        # --- Parse & merge ---
-        new_columns = parse_ddl_to_dbt(ddl_string)
+        # --- Merge ---
         if "columns" not in model:
             model["columns"] = []
         logs = upsert_columns(model["columns"], new_columns, table)
         file_logs.extend(logs)
 
     # --- Write YAML (preserving formatting) ---
-    stream = io.StringIO()
-    yaml_handler.dump(yaml_data, stream)
-    content = stream.getvalue()
+    content = dump_yaml_text(yaml_handler, yaml_data)
 
     content = re.sub(
         r'(\n\s+description:[\s\S]*?(?=\n\s{4,}meta:))\n+(\s{4,}meta:)',
@@ -170,11 +165,27 @@ for yaml_path in schema_files:
         content
     )
 
-    with open(yaml_path, "w") as f:
-        f.write(content)
-    print(f"✅ Updated {yaml_path} ({len(file_logs)} changes)")
+    # --- Write YAML only if the bytes changed ---
+    written = write_if_changed(yaml_path, content)
+    bytes_written += written
+    if not written:
+        files_unchanged += 1
+        print(f"⏭️ Unchanged {yaml_path} — not rewritten.")
+    else:
+        print(f"✅ Updated {yaml_path} ({len(file_logs)} changes, {written} bytes)")
     for log in file_logs:
         print("   ", log)
 
+    if manifest is not None:
+        keys = [str(m.get("name")).lower() for m in models if m.get("name")]
+        manifest.record(yaml_path, file_hash(yaml_path), model_inputs(keys, excel_map, prefetched))
+
+if manifest is not None:
+    for path in set(manifest.entries) - set(schema_files):
+        manifest.forget(path)
+    manifest.save()
+    print(f"\n⏩ Skipped {skipped} unchanged schema.yml file(s).")
+
 
+print(f"\n💾 Wrote {bytes_written} bytes; {files_unchanged} schema.yml file(s) already up to date.")
 print("\n🎉 All schema.yml files processed successfully.")
\ No newline at end of file
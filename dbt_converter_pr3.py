@@ -1,81 +1,34 @@
+import argparse
 import os
-import pandas as pd
-import snowflake.connector
-import re
-from ruamel.yaml import YAML
+import time
+from dbt_metadata import (
+    FETCH_POOL_SIZE, ConnectionPool, build_column, fetch_inventory_metadata,
+    is_blank, snowflake_connect, table_key
+)
+from dbt_ddl_parser import parse_create_table
+from dbt_inventory import load_table_map
+from dbt_io import PatchSet, dump_yaml_text, text_diff, write_if_changed, yaml_handler
+from dbt_metrics import METRICS, profiled, report_path
+from dbt_state import StateManifest, digest, file_hash, state_path
+from dbt_metadata_cache import MetadataCache
+from dbt_watch import FileWatcher
 
 # ---------- CONFIGURATION ----------
 EXCEL_FILE = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/sf_table_inventory.xlsx"
 DBT_PROJECT_DIR = r"/Users/takvishal/Documents/dbt_conversion/dbt_converter/models"
+METADATA_SOURCE = "get_ddl"  # or "information_schema" for bulk column + TAG_REFERENCES queries
+CHECK_LAST_ALTERED = False  # one extra query per schema to refetch tables altered since caching
+STATE_FILE = state_path("merge_columns")  # used by --incremental
+REPORT_FILE = report_path("merge_columns")  # JSON stage timings/counters, rewritten every run
+PATCH_FILE = "merge_columns.patch"  # default --dry-run output (summary goes to the .json next to it)
 # -----------------------------------
 
-# --- YAML setup ---
-yaml_handler = YAML()
-yaml_handler.preserve_quotes = True
-yaml_handler.indent(mapping=2, sequence=4, offset=2)
-
-# --- Snowflake connection ---
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-    role=os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN")
-)
-print("✅ Connected to Snowflake successfully.")
-
-# --- Load Excel ---
-df = pd.read_excel(EXCEL_FILE)
-excel_map = {
-    str(row["table_name"]).strip().lower(): (row["database"], row["schema"])
-    for _, row in df.iterrows()
-}
-print(f"📘 Loaded Excel with {len(excel_map)} table mappings.")
-
-# --- Regex to parse DDL ---
-ddl_pattern = re.compile(
-    r"""^\s*
-    (?P<col_name>"?[\w\s]+"?)\s+
-    [\w\(\),]+
-    (?:\s+WITH\s+TAG\s+\((?P<tag_content>.+?)\))?
-    (?:\s+COMMENT\s+'(?P<comment>.*?)')?
-    ,?$""",
-    re.IGNORECASE | re.VERBOSE | re.MULTILINE
-)
-
-
+# --- DDL parsing ---
 def parse_ddl_to_dbt(ddl_string):
     columns = []
-    for match in ddl_pattern.finditer(ddl_string):
-        col_name = match.group("col_name").strip('"')
-        tag_content = match.group("tag_content")
-        desc_content = match.group("comment") or ""
-        dbt_tags = []
-        policy_tag = ""
-
-        amber_tag = (
-            "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/"
-            "taxonomies/3457114866031680/policyTags/1513664955126269388"
-        )
-        red_tag = (
-            "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/"
-            "taxonomies/1160578347745627110/policyTags/4489624887166714321"
-        )
-
-        if tag_content:
-            tag_pairs = re.findall(r"([\w\.]+)\s*=\s*'([^']+)'", tag_content)
-            dbt_tags = [tag_value.lower() for _, tag_value in tag_pairs]
-            if "amber" in dbt_tags:
-                policy_tag = amber_tag
-            elif "red" in dbt_tags:
-                policy_tag = red_tag
-
-        tag_final = {"policy_tags": policy_tag} if policy_tag else {}
-        columns.append({
-            "name": col_name,
-            "description": desc_content,
-            "meta": tag_final
-        })
+    for col in parse_create_table(ddl_string):
+        tag_values = [value for _, value in col["tags"]]
+        columns.append(build_column(col["name"], col["comment"], tag_values))
     return columns
 
 
@@ -85,26 +38,26 @@ def upsert_columns(existing_columns, new_columns, model_name):
     logs = []
 
     for new_col in new_columns:
-        name = new_col["name"]
+        name = new_col.name
         key = name.lower()
 
         if key in existing_by_name:
             existing_col = existing_by_name[key]
             changed = []
 
-            if not existing_col.get("description") and new_col.get("description"):
-                existing_col["description"] = new_col["description"]
+            if not existing_col.get("description") and new_col.description:
+                existing_col["description"] = new_col.description
                 changed.append("description")
 
-            if not existing_col.get("meta") and new_col.get("meta"):
-                existing_col["meta"] = new_col["meta"]
+            if not existing_col.get("meta") and new_col.tags.policy is not None:
+                existing_col["meta"] = new_col.meta
                 changed.append("meta")
 
             if changed:
                 logs.append(f"🔁 [{model_name}] updated {', '.join(changed)} for {name}")
 
         else:
-            existing_columns.append(new_col)
+            existing_columns.append(new_col.as_dict())
             logs.append(f"➕ [{model_name}] added new column: {name}")
 
     return logs
@@ -118,18 +71,37 @@ def find_all_schema_yml(root_dir):
         for f in filenames:
             if f.lower() == "schema.yml":
                 schema_files.append(os.path.join(dirpath, f))
+    # stable order for deterministic runs
+    schema_files.sort(key=lambda p: p.lower())
     return schema_files
 
 
-# --- Main process ---
-schema_files = find_all_schema_yml(DBT_PROJECT_DIR)
-print(f"🔍 Found {len(schema_files)} schema.yml files to process.")
-
-for yaml_path in schema_files:
-    print(f"\n📂 Processing: {yaml_path}")
-
-    with open(yaml_path, "r") as f:
-        yaml_data = yaml_handler.load(f) or {}
+def model_inputs(model_keys, excel_map, prefetched):
+    """Digest per model of what decides its merge: the Excel row and the fetched columns."""
+    inputs = {}
+    for key in model_keys:
+        row = excel_map.get(key)
+        columns = None
+        if row and not is_blank(row[0]) and not is_blank(row[1]):
+            table = prefetched.get(table_key(row[0], row[1], key))
+            columns = table.column_dicts() if table is not None else None
+        inputs[key] = digest([row, columns])
+    return inputs
+
+
+def merge_schema_file(yaml_path, excel_map, prefetched, dry_run=False):
+    """
+    Parse one schema.yml, merge fetched columns into its models and serialize it.
+    Nothing is printed or written here, so it can run in a worker process.
+    Returns {"path", "lines", "logs", "text", "diff", "model_keys", "metrics"};
+    diff is the unified diff against the file on disk with dry_run, else None.
+    """
+    metrics_before = METRICS.snapshot()
+    lines = []
+    with METRICS.stage("yaml_parse"):
+        with open(yaml_path, "r") as f:
+            original = f.read()
+        yaml_data = yaml_handler().load(original) or {}
 
     models = yaml_data.get("models", [])
     file_logs = []
@@ -140,43 +112,291 @@ for yaml_path in schema_files:
             continue
 
         table_lc = table.lower()
+        METRICS.count("models")
 
         if table_lc not in excel_map:
-            print(f"⚠️ Skipping {table} — not found in Excel map.")
+            lines.append(f"⚠️ Skipping {table} — not found in Excel map.")
             continue
 
         database, schema = excel_map[table_lc]
 
         # --- Skip if database/schema missing ---
-        if not database or not schema or str(database).strip() in ("", "nan") or str(schema).strip() in ("", "nan"):
-            print(f"⚠️ Skipping {table} — missing database or schema info in Excel.")
+        if is_blank(database) or is_blank(schema):
+            lines.append(f"⚠️ Skipping {table} — missing database or schema info in Excel.")
             continue
 
-        # --- Fetch DDL ---
-        cur = conn.cursor()
-        try:
-            cur.execute(f"SELECT GET_DDL('TABLE', '{database}.{schema}.{table}')")
-            ddl_string = cur.fetchone()[0]
-        except Exception as e:
-            print(f"❌ Failed to fetch DDL for {table}: {e}")
+        # --- Look up prefetched columns ---
+        new_columns = prefetched.get(table_key(database, schema, table_lc))
+        if new_columns is None:
+            lines.append(f"❌ No metadata found for {table} in {database}.{schema}")
             continue
-        finally:
-            cur.close()
 
-        # --- Parse & merge ---
-        new_columns = parse_ddl_to_dbt(ddl_string)
+        # --- Merge ---
         if "columns" not in model:
             model["columns"] = []
 
-        logs = upsert_columns(model["columns"], new_columns, table)
+        with METRICS.stage("column_merge"):
+            logs = upsert_columns(model["columns"], new_columns, table)
+        METRICS.count("columns_merged", len(new_columns))
+        METRICS.count("column_changes", len(logs))
         file_logs.extend(logs)
 
-    # --- Write YAML (preserving formatting) ---
-    with open(yaml_path, "w") as f:
-        yaml_handler.dump(yaml_data, f)
-
-    print(f"✅ Updated {yaml_path} ({len(file_logs)} changes)")
-    for log in file_logs:
+    with METRICS.stage("yaml_dump"):
+        text = dump_yaml_text(yaml_handler(), yaml_data)
+
+    diff = None
+    if dry_run:
+        with METRICS.stage("diff"):
+            diff = text_diff(yaml_path, original, text)
+
+    return {
+        "path": yaml_path,
+        "lines": lines,
+        "logs": file_logs,
+        "text": text,
+        "diff": diff,
+        "model_keys": [str(m.get("name")).lower() for m in models if m.get("name")],
+        "metrics": METRICS.delta(metrics_before),
+    }
+
+
+def write_merge_result(result):
+    """Write one merge_schema_file() result if its bytes changed and print what happened; returns bytes written."""
+    yaml_path = result["path"]
+    with METRICS.stage("yaml_write"):
+        written = write_if_changed(yaml_path, result["text"])
+    if not written:
+        print(f"⏭️ Unchanged {yaml_path} — not rewritten.")
+    else:
+        print(f"✅ Updated {yaml_path} ({len(result['logs'])} changes, {written} bytes)")
+    for log in result["logs"]:
         print("   ", log)
+    return written
+
+
+# --- Worker processes (--jobs) ---
+_worker_ctx = {}
+
+def _init_worker(excel_map, prefetched, dry_run):
+    _worker_ctx["excel_map"] = excel_map
+    _worker_ctx["prefetched"] = prefetched
+    _worker_ctx["dry_run"] = dry_run
+
+def _merge_in_worker(yaml_path):
+    return merge_schema_file(yaml_path, _worker_ctx["excel_map"], _worker_ctx["prefetched"],
+                             _worker_ctx["dry_run"])
 
-print("\n🎉 All schema.yml files processed successfully.")
\ No newline at end of file
+
+# --- Main process ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge Snowflake column metadata into dbt schema.yml files.")
+    parser.add_argument("--inventory", default=EXCEL_FILE,
+                        help="sf_table_inventory (.xlsx, .csv or .parquet)")
+    parser.add_argument("--inventory-backend", choices=["auto", "stream", "pandas"],
+                        help="clean the inventory row by row or column-wise with pandas "
+                             "(auto: pandas for large files when installed)")
+    parser.add_argument("--project-dir", default=DBT_PROJECT_DIR, help="dbt models folder to scan")
+    parser.add_argument("--refresh", action="store_true",
+                        help="ignore the local metadata cache and refetch every table")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip schema.yml files whose YAML, Excel row and table metadata are unchanged")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="parse/merge/dump schema.yml files in N worker processes")
+    parser.add_argument("--report", default=REPORT_FILE,
+                        help="JSON file for per-stage timings and counters (empty string to disable)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile the run: cProfile stats, or pyinstrument HTML for a .html path")
+    parser.add_argument("--dry-run", nargs="?", const=PATCH_FILE, metavar="PATCH",
+                        help=f"write no schema.yml files; save a unified diff (default {PATCH_FILE}) "
+                             "and a JSON summary next to it")
+    parser.add_argument("--watch", action="store_true",
+                        help="after the run, keep the inventory and fetched metadata in memory and "
+                             "re-merge each schema.yml as it is saved (watchdog events when installed, "
+                             "else polling)")
+    args = parser.parse_args(argv)
+    if args.watch and args.dry_run:
+        parser.error("--watch writes as you edit; it cannot be combined with --dry-run")
+    with profiled(args.profile):
+        excel_map, prefetched, declared = run(args)
+    if args.watch:
+        watch(args, excel_map, prefetched, declared)
+
+
+def run(args):
+    METRICS.reset()
+
+    # --- Snowflake connections (opened lazily, up to FETCH_POOL_SIZE at once) ---
+    pool = ConnectionPool(snowflake_connect, size=FETCH_POOL_SIZE)
+    print(f"✅ Snowflake connection pool ready (max {pool.size} connections).")
+
+    # --- Load Excel ---
+    with METRICS.stage("inventory_load"):
+        excel_map = load_table_map(args.inventory, args.inventory_backend)
+    METRICS.count("inventory_tables", len(excel_map))
+    print(f"📘 Loaded Excel with {len(excel_map)} table mappings.")
+
+    with METRICS.stage("tree_scan"):
+        schema_files = find_all_schema_yml(args.project_dir)
+    METRICS.count("schema_files", len(schema_files))
+    print(f"🔍 Found {len(schema_files)} schema.yml files to process.")
+
+    # --- Fetch column metadata up front, spread over the connection pool ---
+    inventory = [(db, sch, table) for table, (db, sch) in excel_map.items()]
+    cache = MetadataCache()
+    with METRICS.stage("metadata_fetch"):
+        prefetched = fetch_inventory_metadata(
+            pool, inventory, source=METADATA_SOURCE, parse_ddl=parse_ddl_to_dbt,
+            cache=cache, refresh=args.refresh, check_last_altered=CHECK_LAST_ALTERED
+        )
+    cache.close()
+    pool.close()
+
+    manifest = StateManifest(STATE_FILE) if args.incremental else None
+    skipped = 0
+    bytes_written = 0
+    files_unchanged = 0
+
+    todo = []
+    declared = {}  # yaml_path -> model keys it declares, for --watch
+    for yaml_path in schema_files:
+        if manifest is not None and manifest.unchanged(
+            yaml_path, file_hash(yaml_path), model_inputs(manifest.models(yaml_path), excel_map, prefetched)
+        ):
+            declared[yaml_path] = manifest.models(yaml_path)
+            skipped += 1
+            continue
+        todo.append(yaml_path)
+
+    # Workers only parse/merge/dump (and diff, for --dry-run); results come back in
+    # schema_files order and are printed and written here, so output is identical
+    # for any --jobs value.
+    dry_run = bool(args.dry_run)
+    patches = PatchSet("merge_columns") if dry_run else None
+    if args.jobs > 1 and len(todo) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(
+            max_workers=args.jobs, initializer=_init_worker, initargs=(excel_map, prefetched, dry_run)
+        )
+        results = executor.map(_merge_in_worker, todo, chunksize=max(1, len(todo) // (args.jobs * 4)))
+    else:
+        executor = None
+        results = (merge_schema_file(path, excel_map, prefetched, dry_run) for path in todo)
+
+    try:
+        for result in results:
+            yaml_path = result["path"]
+            if executor is not None:
+                METRICS.merge(result["metrics"])  # sequential results already counted here
+            print(f"\n📂 Processing: {yaml_path}")
+            for line in result["lines"]:
+                print(line)
+            declared[yaml_path] = result["model_keys"]
+
+            if patches is not None:
+                if result["diff"]:
+                    patches.add(yaml_path, result["diff"], changes=len(result["logs"]))
+                    print(f"📝 Would update {yaml_path} ({len(result['logs'])} changes)")
+                else:
+                    files_unchanged += 1
+                    print(f"⏭️ Unchanged {yaml_path} — nothing to write.")
+                for log in result["logs"]:
+                    print("   ", log)
+                continue
+
+            # --- Write YAML (preserving formatting) only if the bytes changed ---
+            written = write_merge_result(result)
+            bytes_written += written
+            if not written:
+                files_unchanged += 1
+
+            if manifest is not None:
+                manifest.record(yaml_path, file_hash(yaml_path),
+                                model_inputs(result["model_keys"], excel_map, prefetched))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if manifest is not None:
+        if patches is None:
+            for path in set(manifest.entries) - set(schema_files):
+                manifest.forget(path)
+            manifest.save()
+        print(f"\n⏩ Skipped {skipped} unchanged schema.yml file(s).")
+
+    if patches is not None:
+        with METRICS.stage("patch_write"):
+            patches.write(args.dry_run)
+        print(f"\n🎉 Dry run finished; {files_unchanged} schema.yml file(s) already up to date.")
+    else:
+        print(f"\n💾 Wrote {bytes_written} bytes; {files_unchanged} schema.yml file(s) already up to date.")
+        print("\n🎉 All schema.yml files processed successfully.")
+    METRICS.count("schema_files_skipped", skipped)
+    METRICS.count("schema_files_unchanged", files_unchanged)
+    METRICS.count("bytes_written", bytes_written)
+    if args.report:
+        METRICS.write_report(args.report, "merge_columns", {"jobs": args.jobs, "incremental": args.incremental,
+                                                            "refresh": args.refresh, "source": METADATA_SOURCE,
+                                                            "dry_run": dry_run})
+    return excel_map, prefetched, declared
+
+
+# --- Watch mode (--watch) ---
+def watch(args, excel_map, prefetched, declared):
+    """
+    Keep the inventory map, the fetched metadata and the models each schema.yml
+    declares in memory, and re-merge each schema.yml as it is saved. An edited
+    inventory re-merges the files whose model_inputs() changed, fetching only
+    tables that were not fetched before (the metadata cache usually has them).
+    """
+    state = {"excel_map": excel_map}
+
+    def on_change(paths):
+        start = time.perf_counter()
+        print(f"\n🔄 {len(paths)} change(s): " + ", ".join(paths))
+        todo = []
+        for path in paths:
+            if os.path.basename(path).lower() != "schema.yml":
+                continue
+            if os.path.exists(path):
+                todo.append(path)
+            else:
+                declared.pop(path, None)
+        if args.inventory in paths:
+            before = {path: model_inputs(keys, state["excel_map"], prefetched) for path, keys in declared.items()}
+            state["excel_map"] = load_table_map(args.inventory, args.inventory_backend)
+            print(f"📘 Reloaded Excel with {len(state['excel_map'])} table mappings.")
+            missing = [(db, sch, table) for table, (db, sch) in state["excel_map"].items()
+                       if not is_blank(db) and not is_blank(sch) and table_key(db, sch, table) not in prefetched]
+            if missing:
+                pool, cache = ConnectionPool(snowflake_connect, size=FETCH_POOL_SIZE), MetadataCache()
+                try:
+                    prefetched.update(fetch_inventory_metadata(
+                        pool, missing, source=METADATA_SOURCE, parse_ddl=parse_ddl_to_dbt, cache=cache,
+                        check_last_altered=CHECK_LAST_ALTERED
+                    ))
+                finally:
+                    cache.close()
+                    pool.close()
+            todo += [path for path, keys in declared.items() if path not in todo
+                     and model_inputs(keys, state["excel_map"], prefetched) != before[path]]
+
+        written = []
+        for yaml_path in sorted(todo, key=str.lower):
+            result = merge_schema_file(yaml_path, state["excel_map"], prefetched)
+            print(f"\n📂 Processing: {yaml_path}")
+            for line in result["lines"]:
+                print(line)
+            declared[yaml_path] = result["model_keys"]
+            if write_merge_result(result):
+                written.append(yaml_path)
+        print(f"⏱️ Merged {len(todo)} schema.yml file(s) in {time.perf_counter() - start:.3f}s.")
+        return written
+
+    # prune: the folders find_all_schema_yml() skips
+    watcher = FileWatcher(args.project_dir, ("schema.yml",), extra_files=(args.inventory,),
+                          prune=lambda path: "target" in path or ".dbt" in path)
+    watcher.run(on_change)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,14 @@
-import snowflake.connector
-import pandas as pd
+import argparse
 import os
 from collections import defaultdict
-import yaml
+
+from dbt_inventory import iter_inventory
 
 
 EXCEL_FILE = "/Users/takvishal/Documents/dbt_conversion/sf_table_inventory.xlsx"  # your excel input
 OUTPUT_DIR = "/Users/takvishal/Documents/dbt_conversion/dbt_yaml_output/"  # where schema.yml files will be saved
 # ----------------------------------
 
-# ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# connect to Snowflake
-#conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
-
-# ---------- CONFIGURATION ----------
-conn = snowflake.connector.connect(
-    user=os.getenv("SNOWFLAKE_USER"),
-    password=os.getenv("SNOWFLAKE_PASSWORD"),
-    account=os.getenv("SNOWFLAKE_ACCOUNT"),
-    warehouse=os.getenv("SNOWFLAKE_WAREHOUSE")
-)
-
-# read Excel
-df = pd.read_excel(EXCEL_FILE)
-
-# group tables by (database, schema)
-grouped = defaultdict(list)
-for _, row in df.iterrows():
-    grouped[(row["database"], row["schema"])].append(row["table_name"])
-
 # query template to get column tags
 TAG_QUERY = """
 select c.column_name, t.tag_name, t.tag_value
@@ -44,10 +22,25 @@ where c.table_schema = %s and c.table_name = %s
 order by c.ordinal_position
 """
 
-# loop through each schema group
-for (database, schema), tables in grouped.items():
-    tables_list = []
+# connect to Snowflake
+def connect():
+    import snowflake.connector  # imported here so --help never pays for it
+    return snowflake.connector.connect(
+        user=os.getenv("SNOWFLAKE_USER"),
+        password=os.getenv("SNOWFLAKE_PASSWORD"),
+        account=os.getenv("SNOWFLAKE_ACCOUNT"),
+        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE")
+    )
 
+def group_tables(excel_file):
+    # group tables by (database, schema)
+    grouped = defaultdict(list)
+    for row in iter_inventory(excel_file):
+        grouped[(row.database, row.schema)].append(row.table_name)
+    return grouped
+
+def fetch_models(conn, database, schema, tables):
+    """Yield one dbt model dict per table, each built right after its columns are fetched."""
     for table in tables:
         cur = conn.cursor()
         cur.execute(TAG_QUERY.format(db=database), (schema, table))
@@ -63,23 +56,57 @@ for (database, schema), tables in grouped.items():
                 columns[col_name]["tags"].append(f"{tag_name}: {tag_value}")
 
         # build dbt table structure
-        tables_list.append({
+        yield {
             "name": table,
             "columns": [
                 {"name": col, "description": "", "meta": {"tags": tags["tags"]}}
                 for col, tags in columns.items()
             ]
-        })
-
-    # build final schema.yml content
-    schema_dict = {
-        "version": 2,
-        "models": tables_list
-    }
+        }
 
-    # write to schema.yml (one per schema)
-    out_path = os.path.join(OUTPUT_DIR, f"{schema}_schema.yml")
+def write_schema_yml(out_path, models):
+    """
+    Write {"version": 2, "models": [...]} one model at a time, so only the model
+    being written is held in memory. A block sequence under a mapping key is not
+    indented, so each `- name: ...` fragment dumped on its own lines up under
+    `models:` the way yaml.safe_dump(schema_dict, f, sort_keys=False) lays it out.
+    """
+    import yaml
+    written = 0
     with open(out_path, "w") as f:
-        yaml.safe_dump(schema_dict, f, sort_keys=False)
+        f.write("version: 2\n")
+        for model in models:
+            if not written:
+                f.write("models:\n")
+            yaml.dump([model], f, Dumper=yaml.SafeDumper, sort_keys=False)
+            written += 1
+        if not written:
+            f.write("models: []\n")
+    return written
+
+def generate(excel_file, output_dir, conn):
+    # ensure output directory exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    # one schema.yml per (database, schema) group, streamed model by model
+    for (database, schema), tables in group_tables(excel_file).items():
+        out_path = os.path.join(output_dir, f"{schema}_schema.yml")
+        write_schema_yml(out_path, fetch_models(conn, database, schema, tables))
+
+    print("✅ schema.yml files created successfully!")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate one schema.yml per Snowflake schema from column tags.")
+    parser.add_argument("--inventory", default=EXCEL_FILE,
+                        help="sf_table_inventory (.xlsx, .csv or .parquet)")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="where the <schema>_schema.yml files go")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        generate(args.inventory, args.output_dir, conn)
+    finally:
+        conn.close()
 
-print("✅ schema.yml files created successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
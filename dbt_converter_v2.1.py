@@ -4,6 +4,7 @@ import snowflake.connector
 import re
 from collections import defaultdict
 from ruamel.yaml import YAML
+from dbt_yaml_registry import SchemaRegistry
 
 # ---------- CONFIGURATION ----------
 EXCEL_FILE = "/Users/takvishal/Documents/dbt_conversion/dbt_converter/sf_table_inventory.xlsx"
@@ -66,19 +67,11 @@ def find_all_schema_yml(root_dir):
                 schema_files.append(os.path.join(dirpath, f))
     return schema_files
 
-def find_table_in_yamls(table_name, schema_files):
-    for path in schema_files:
-        with open(path) as f:
-            data = yaml_handler.load(f) or {}
-        models = data.get("models", [])
-        for model in models:
-            if model.get("name") == table_name:
-                return path, data, model
-    return None, None, None
-
 # ------------------- Main Loop -------------------
 
 schema_files = find_all_schema_yml(DBT_PROJECT_DIR)
+# Each schema.yml is parsed once; all edits land on these in-memory documents
+registry = SchemaRegistry(yaml_handler, schema_files)
 
 for _, row in df.iterrows():
     database = row["database"]
@@ -96,8 +89,8 @@ for _, row in df.iterrows():
     # Convert DDL to dbt columns
     new_columns = parse_ddl_to_dbt(ddl_string)
 
-    # Search table in existing YAML files
-    yaml_path, yaml_data, existing_model = find_table_in_yamls(table, schema_files)
+    # Search table in existing YAML files (case-insensitive)
+    yaml_path, yaml_data, existing_model = registry.find(table)
 
     if yaml_path:
         # Merge missing columns while preserving order
@@ -105,29 +98,21 @@ for _, row in df.iterrows():
         for col in new_columns:
             if col["name"] not in existing_col_names:
                 existing_model.setdefault("columns", []).append(col)
-        # Save updated YAML preserving formatting
-        yaml_data["version"] = 2
-        with open(yaml_path, "w") as f:
-            yaml_handler.dump(yaml_data, f)
+        registry.mark_dirty(yaml_path)
     else:
-        # Table not found: create new model
+        # Table not found: add a new model next to the first schema.yml
         if schema_files:
             folder = os.path.dirname(schema_files[0])
         else:
             folder = DBT_PROJECT_DIR
 
-        yaml_path = os.path.join(folder, "schema.yml")
-        new_yaml_data = {
-            "version": 2,
-            "models": [
-                {
-                    "name": table,
-                    "description": "",
-                    "columns": new_columns
-                }
-            ]
-        }
-        with open(yaml_path, "w") as f:
-            yaml_handler.dump(new_yaml_data, f)
+        registry.add_model(os.path.join(folder, "schema.yml"), {
+            "name": table,
+            "description": "",
+            "columns": new_columns
+        })
+
+# Save every touched YAML once, preserving formatting
+registry.write_all()
 
 print("✅ schema.yml files updated/created recursively in dbt project with formatting preserved!")
\ No newline at end of file
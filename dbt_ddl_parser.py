@@ -0,0 +1,159 @@
+import re
+
+# ---------- Lexer ----------
+# A single compiled pattern consumed left to right by findall: whitespace and
+# SQL comments are skipped, everything else comes back as one token string.
+# The first character tells the kinds apart (" quoted name, ' string literal,
+# letter/_ word, digit number, otherwise punctuation), so every character of
+# the DDL is looked at once and run time stays linear in its length.
+_TOKEN_RE = re.compile(
+    r"""
+    (?:\s+|--[^\n]*|/\*.*?\*/)*
+    (
+        "(?:[^"]|"")*"
+      | '(?:[^'\\]|\\.|'')*'
+      | [A-Za-z_][\w$]*
+      | \d+(?:\.\d+)?
+      | \S
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_ESCAPE_RE = re.compile(r"\\(.)|''", re.DOTALL)
+
+def tokenize(ddl: str):
+    return _TOKEN_RE.findall(ddl)
+
+def _unquote(token: str) -> str:
+    """Strip identifier / string-literal quoting; bare words come back unchanged."""
+    if token[:1] == '"':
+        return token[1:-1].replace('""', '"')
+    if token[:1] == "'":
+        return _ESCAPE_RE.sub(lambda m: m.group(1) or "'", token[1:-1])
+    return token
+
+# ---------- Parser ----------
+# Words that end a column's data type and start its options.
+_OPTION_WORDS = {
+    "NOT", "NULL", "DEFAULT", "COLLATE", "COMMENT", "WITH", "TAG", "MASKING",
+    "PROJECTION", "PRIMARY", "UNIQUE", "REFERENCES", "FOREIGN", "CONSTRAINT",
+    "AUTOINCREMENT", "IDENTITY", "AS",
+}
+# Table-level entries of the column list that are not columns.
+_CONSTRAINT_WORDS = {"CONSTRAINT", "PRIMARY", "UNIQUE", "FOREIGN"}
+# A '(' after one of these words opens a table option, not the column list:
+# GET_DDL writes `create or replace TABLE T cluster by (A)(\n A NUMBER, ...)`.
+_TABLE_OPTION_WORDS = {"BY", "TAG", "ON"}
+
+def _group_end(tokens, i):
+    """Index just past the balanced (...) group opening at tokens[i]."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == "(":
+            depth += 1
+        elif tokens[j] == ")":
+            depth -= 1
+            if depth == 0:
+                return j + 1
+    return len(tokens)
+
+def _tag_pairs(tokens, i, end):
+    """Parse `(DB.SCHEMA.TAG = 'value', ...)` opening at tokens[i]. Returns (pairs, next index)."""
+    stop = min(_group_end(tokens, i), end)
+    pairs, name = [], []
+    j = i + 1
+    while j < stop - 1:
+        tok = tokens[j]
+        if tok == "=" and j + 1 < stop - 1:
+            pairs.append((".".join(name), _unquote(tokens[j + 1])))
+            name = []
+            j += 2
+            continue
+        if tok not in (",", "."):
+            name.append(_unquote(tok))
+        j += 1
+    return pairs, stop
+
+def _column(tokens, i, end):
+    """Parse the column definition in tokens[i:end]."""
+    col = {"name": _unquote(tokens[i]), "type": "", "nullable": True, "comment": "", "tags": []}
+    i += 1
+
+    type_parts = []
+    while i < end and tokens[i].upper() not in _OPTION_WORDS:
+        if tokens[i] == "(":
+            stop = _group_end(tokens, i)
+            type_parts[-1:] = [(type_parts[-1] if type_parts else "") + "(" + ", ".join(
+                t for t in tokens[i + 1:stop - 1] if t != ",") + ")"]
+            i = stop
+        else:
+            type_parts.append(tokens[i])
+            i += 1
+    col["type"] = " ".join(type_parts)
+
+    while i < end:
+        word = tokens[i].upper()
+        if word == "NOT" and i + 1 < end and tokens[i + 1].upper() == "NULL":
+            col["nullable"] = False
+            i += 2
+        elif word == "COMMENT" and i + 1 < end:
+            col["comment"] = _unquote(tokens[i + 1])
+            i += 2
+        elif word == "WITH" and i + 2 < end and tokens[i + 1].upper() == "TAG" and tokens[i + 2] == "(":
+            pairs, i = _tag_pairs(tokens, i + 2, end)
+            col["tags"].extend(pairs)
+        elif word == "TAG" and i + 1 < end and tokens[i + 1] == "(":
+            pairs, i = _tag_pairs(tokens, i + 1, end)
+            col["tags"].extend(pairs)
+        elif word == "(":
+            i = _group_end(tokens, i)  # DEFAULT f(...), USING (...), IDENTITY (1, 1), ...
+        else:
+            i += 1
+    return col
+
+def parse_create_table(ddl: str):
+    """
+    Parse Snowflake GET_DDL('TABLE', ...) output in one linear pass.
+    Returns [{"name", "type", "nullable", "comment", "tags": [(tag, value), ...]}, ...]
+    in column order, or [] when there is no CREATE ... TABLE column list.
+    """
+    tokens = tokenize(ddl)
+
+    # the column list is the first '(' after the TABLE keyword that does not
+    # belong to a table option such as CLUSTER BY (...)
+    start, seen_table, i = None, False, 0
+    while i < len(tokens):
+        tok = tokens[i]
+        if seen_table and tok == "(":
+            if tokens[i - 1].upper() in _TABLE_OPTION_WORDS:
+                i = _group_end(tokens, i)
+                continue
+            start = i
+            break
+        if tok.upper() == "TABLE":
+            seen_table = True
+        i += 1
+    if start is None:
+        return []
+
+    # top-level ',' and the closing ')' split the list into column definitions
+    bounds, depth = [], 0
+    for i in range(start, len(tokens)):
+        tok = tokens[i]
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+            if depth == 0:
+                bounds.append(i)
+                break
+        elif tok == "," and depth == 1:
+            bounds.append(i)
+
+    columns = []
+    i = start + 1
+    for end in bounds:
+        if i < end and tokens[i].upper() not in _CONSTRAINT_WORDS:
+            columns.append(_column(tokens, i, end))
+        i = end + 1
+    return columns
@@ -0,0 +1,116 @@
+import ast
+import datetime
+
+from dbt_config_block import config_arg, literal_value
+from dbt_partition import as_datetime, partition_count
+
+# ---------- CONFIG ----------
+INCREMENTAL_STRATEGY = "auto"  # "auto", "insert_overwrite" or "merge_predicates"; auto never touches append models
+LOOKBACK_DAYS = 3              # recent partitions a run may rewrite or merge into
+# -----------------------------------
+
+# ---------- Strategy ----------
+class IncrementalOptions:
+    """
+    What to add to partitioned incremental models.
+      strategy: insert_overwrite replaces the partitions a run writes;
+                merge_predicates keeps the merge on unique_key but limits it to
+                the last lookback_days of target partitions (rows older than that
+                are no longer matched); auto gives models with a unique_key
+                merge_predicates and leaves append models (no unique_key) alone:
+                insert_overwrite would drop the rows already in every partition
+                a run touches unless the model's is_incremental() filter selects
+                whole partitions, so it has to be asked for explicitly.
+      expiration_days: partition_expiration_days to set as well, or None.
+    """
+
+    __slots__ = ("strategy", "lookback_days", "expiration_days")
+
+    def __init__(self, strategy=INCREMENTAL_STRATEGY, lookback_days=LOOKBACK_DAYS, expiration_days=None):
+        self.strategy = strategy
+        self.lookback_days = lookback_days
+        self.expiration_days = expiration_days
+
+# Start of the lookback window for each partition data_type, in BigQuery SQL.
+WINDOW_START = {
+    "DATE": "date_sub(current_date(), interval {n} day)",
+    "DATETIME": "datetime_sub(current_datetime(), interval {n} day)",
+    "TIMESTAMP": "timestamp_sub(current_timestamp(), interval {n} day)",
+}
+
+def partition_dict(value_text):
+    """The partition_by value as a dict when it is a literal with a field, else None."""
+    if not value_text:
+        return None
+    try:
+        value = ast.literal_eval(value_text.strip())
+    except (ValueError, SyntaxError):
+        return None
+    return value if isinstance(value, dict) and value.get("field") else None
+
+def _partition_type(value: dict) -> str:
+    data_type = str(value.get("data_type") or "date").upper()
+    return data_type if data_type in WINDOW_START else "DATE"
+
+def incremental_updates(blocks, partition_value, options: IncrementalOptions):
+    """
+    (config updates {key: source text}, strategy) for an incremental model
+    partitioned by partition_value (the model's own partition_by source text
+    when None). Nothing for other materializations, non-literal partitions, or
+    models that already choose an incremental_strategy / incremental_predicates;
+    ({}, "append") for an append model the auto strategy leaves alone.
+    """
+    materialized = config_arg(blocks, "materialized")
+    if materialized is None or (literal_value(materialized.value) or "").lower() != "incremental":
+        return {}, None
+    if config_arg(blocks, "incremental_strategy") is not None or \
+            config_arg(blocks, "incremental_predicates") is not None:
+        return {}, None
+    if partition_value is None:
+        own = config_arg(blocks, "partition_by")
+        partition_value = own.value if own is not None else None
+    value = partition_dict(partition_value)
+    if value is None:
+        return {}, None
+
+    strategy = options.strategy
+    if strategy == "auto":
+        if config_arg(blocks, "unique_key") is None:
+            return {}, "append"
+        strategy = "merge_predicates"
+    updates = {}
+    if strategy == "insert_overwrite":
+        updates["incremental_strategy"] = "'insert_overwrite'"
+    else:
+        start = WINDOW_START[_partition_type(value)].format(n=options.lookback_days)
+        updates["incremental_predicates"] = f'["DBT_INTERNAL_DEST.{value["field"]} >= {start}"]'
+    if options.expiration_days:
+        updates["partition_expiration_days"] = str(int(options.expiration_days))
+    return updates, strategy
+
+# ---------- Scan estimate ----------
+def scan_estimate(stats, granularity, lookback_days: int):
+    """
+    What a run reads of the target table: a plain merge scans every partition,
+    the new config only the ones inside the lookback window. From the partition
+    column's ColumnStats (row count and range); None without a known range.
+    """
+    if stats is None:
+        return None
+    low, high = as_datetime(stats.min_value), as_datetime(stats.max_value)
+    if low is None or high is None:
+        return None
+    granularity = granularity or "day"
+    total = partition_count(granularity, low, high)
+    window = max(high - datetime.timedelta(days=lookback_days), low)
+    scanned = min(total, partition_count(granularity, window, high))
+    estimate = {
+        "granularity": granularity,
+        "partitions_total": total,
+        "partitions_scanned": scanned,
+        "scan_reduction_pct": round(100.0 * (1 - scanned / total), 1),
+    }
+    if stats.row_count is not None:
+        estimate["rows_scanned_before"] = stats.row_count
+        estimate["rows_scanned_after"] = int(stats.row_count * scanned / total)
+    return estimate
@@ -0,0 +1,195 @@
+import csv
+import importlib.util
+import math
+import os
+
+# ---------- CONFIG ----------
+# "stream" reads row by row (no pandas), "pandas" cleans whole columns at once,
+# "auto" uses pandas when it is installed and the file is big enough for the
+# vectorized pass to pay back importing it.
+INVENTORY_BACKEND = "auto"
+COLUMNAR_MIN_BYTES = 4 * 1024 * 1024
+# -----------------------------------
+
+# ---------- Row type ----------
+class InventoryRow:
+    """
+    One inventory line. Blank, NaN and "nan" cells come through as "" and the
+    clustered/partition cells are split into lists of column names.
+    """
+
+    __slots__ = ("database", "schema", "table_name", "cluster", "partition")
+
+    def __init__(self, database="", schema="", table_name="", cluster=None, partition=None):
+        self.database = database
+        self.schema = schema
+        self.table_name = table_name
+        self.cluster = cluster if cluster is not None else []
+        self.partition = partition if partition is not None else []
+
+    def as_tuple(self):
+        return (self.database, self.schema, self.table_name, tuple(self.cluster), tuple(self.partition))
+
+    def __repr__(self):
+        return (f"InventoryRow({self.database!r}, {self.schema!r}, {self.table_name!r}, "
+                f"cluster={self.cluster!r}, partition={self.partition!r})")
+
+# ---------- Cell cleaning ----------
+# Both inventories are accepted: sf_table_inventory (database/schema/table_name)
+# and bq_partition_cluster (database_name/schema_name/.../partition_by_column).
+HEADER_ALIASES = {
+    "database": "database",
+    "database_name": "database",
+    "schema": "schema",
+    "schema_name": "schema",
+    "table": "table_name",
+    "table_name": "table_name",
+    "clustered_by_column": "cluster",
+    "partition_by_column": "partition",
+}
+
+def clean_cell(val) -> str:
+    if val is None:
+        return ""
+    if isinstance(val, float) and math.isnan(val):
+        return ""
+    text = str(val).strip()
+    return "" if text.lower() == "nan" else text
+
+def csv_list(val):
+    return [c.strip() for c in clean_cell(val).split(",") if c.strip()]
+
+# ---------- Streaming readers ----------
+def _iter_xlsx(path):
+    from openpyxl import load_workbook  # only needed for Excel inventories
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        keys = [clean_cell(h).lower() for h in header]
+        for values in rows:
+            yield dict(zip(keys, values))
+    finally:
+        wb.close()
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        for rec in csv.DictReader(fh):
+            yield {clean_cell(k).lower(): v for k, v in rec.items()}
+
+def _iter_parquet(path):
+    import pyarrow.parquet as pq  # optional; only needed for Parquet inventories
+    for batch in pq.ParquetFile(path).iter_batches():
+        for rec in batch.to_pylist():
+            yield {clean_cell(k).lower(): v for k, v in rec.items()}
+
+READERS = {".xlsx": _iter_xlsx, ".xlsm": _iter_xlsx, ".csv": _iter_csv, ".parquet": _iter_parquet}
+
+def iter_inventory(path: str):
+    """Yield InventoryRow objects one at a time from an .xlsx, .csv or .parquet inventory."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported inventory format '{ext}' for {path}")
+    for rec in READERS[ext](path):
+        fields = {}
+        for key, val in rec.items():
+            name = HEADER_ALIASES.get(key)
+            if name:
+                fields[name] = val
+        if not any(clean_cell(v) for v in fields.values()):
+            continue  # fully blank line
+        yield InventoryRow(
+            database=clean_cell(fields.get("database")),
+            schema=clean_cell(fields.get("schema")),
+            table_name=clean_cell(fields.get("table_name")),
+            cluster=csv_list(fields.get("cluster")),
+            partition=csv_list(fields.get("partition")),
+        )
+
+# ---------- Columnar loading (pandas) ----------
+FIELDS = ["database", "schema", "table_name", "cluster", "partition"]
+
+def _read_frame(path: str):
+    """
+    (headers, frame) with the frame's columns numbered by position. Headers are
+    read as a plain first row, so pandas never renames a repeated one to `x.1`.
+    """
+    import pandas as pd  # only for the columnar backend
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        raw = pd.read_excel(path, dtype=object, header=None)
+    elif ext == ".csv":
+        raw = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8-sig", header=None)
+    elif ext == ".parquet":
+        raw = pd.read_parquet(path)
+        return list(raw.columns), raw.set_axis(range(raw.shape[1]), axis=1)
+    else:
+        raise ValueError(f"Unsupported inventory format '{ext}' for {path}")
+    if raw.empty:
+        return [], raw
+    return raw.iloc[0].tolist(), raw.iloc[1:].reset_index(drop=True)
+
+def _clean_column(col):
+    """clean_cell() over a whole column: NaN/None and "nan" become "", the rest is stripped text."""
+    text = col.astype(str).str.strip().where(col.notna(), "")
+    return text.mask(text.str.lower() == "nan", "")
+
+def _split_column(col):
+    """csv_list() over a whole column: commas and the blanks around them are normalized first."""
+    norm = col.str.replace(r"\s*,[\s,]*", ",", regex=True).str.replace(r"^[\s,]+|[\s,]+$", "", regex=True)
+    return [v.split(",") if v else [] for v in norm.tolist()]
+
+def read_inventory_frame(path: str, fields=FIELDS):
+    """
+    The inventory as a DataFrame with `fields` columns, cleaned exactly like
+    iter_inventory(): text columns stripped, cluster/partition as lists, fully
+    blank lines dropped.
+    """
+    import pandas as pd
+    headers, raw = _read_frame(path)
+    columns = {}
+    for pos, key in enumerate(headers):
+        name = HEADER_ALIASES.get(clean_cell(key).lower())
+        if name:
+            columns[name] = pos  # a later duplicate header wins, as in the row reader
+    frame = pd.DataFrame({name: _clean_column(raw[pos]) for name, pos in columns.items()}, index=raw.index)
+    frame = frame[(frame != "").any(axis=1)].reset_index(drop=True)
+    for name in fields:
+        listed = name in ("cluster", "partition")
+        if name in frame:
+            if listed:
+                frame[name] = _split_column(frame[name])
+        else:
+            frame[name] = [[] for _ in range(len(frame))] if listed else ""
+    return frame[list(fields)]
+
+def use_columnar(path: str, backend: str = None) -> bool:
+    backend = backend or INVENTORY_BACKEND
+    if backend == "stream":
+        return False
+    if backend == "pandas":
+        return True
+    return os.path.getsize(path) >= COLUMNAR_MIN_BYTES and importlib.util.find_spec("pandas") is not None
+
+def load_inventory_rows(path: str, backend: str = None):
+    """Every InventoryRow of the file; the backend only changes how the cells are cleaned."""
+    if not use_columnar(path, backend):
+        return list(iter_inventory(path))
+    frame = read_inventory_frame(path)
+    return [InventoryRow(*values) for values in zip(*(frame[name].tolist() for name in FIELDS))]
+
+def load_table_map(path: str, backend: str = None):
+    """{table_lc: (database, schema)} as the pr scripts build it, minus blank table names."""
+    if not use_columnar(path, backend):
+        return {
+            row.table_name.lower(): (row.database, row.schema)
+            for row in iter_inventory(path)
+            if row.table_name
+        }
+    frame = read_inventory_frame(path, fields=["database", "schema", "table_name"])
+    frame = frame[frame["table_name"] != ""]
+    # later rows win on a repeated table name, like the dict comprehension above
+    frame = frame.assign(table_lc=frame["table_name"].str.lower()).drop_duplicates("table_lc", keep="last")
+    return dict(zip(frame["table_lc"], zip(frame["database"], frame["schema"])))
@@ -0,0 +1,133 @@
+import difflib
+import functools
+import io
+import json
+import os
+
+# ---------- YAML ----------
+@functools.lru_cache(maxsize=None)
+def yaml_handler():
+    """
+    The round-trip ruamel handler the schema.yml writers share (quotes kept,
+    mapping=2/sequence=4/offset=2), built on first use so importing a script
+    for --help does not pay for ruamel.
+    """
+    from ruamel.yaml import YAML
+    handler = YAML()
+    handler.preserve_quotes = True
+    handler.indent(mapping=2, sequence=4, offset=2)
+    return handler
+
+# ---------- Output helpers ----------
+def _create_temp(folder: str, name: str):
+    """
+    (fd, path) of a new `.tmp-<random>-<name>` file in `folder`. Created 0666 so
+    the kernel applies the umask, like open(path, "w") would for a new output.
+    """
+    while True:
+        tmp = os.path.join(folder, f".tmp-{os.urandom(6).hex()}-{name}")
+        try:
+            return os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0), 0o666), tmp
+        except FileExistsError:
+            continue
+
+def dump_yaml_text(yaml_handler, data) -> str:
+    """Serialize with the caller's ruamel handler into memory instead of a file."""
+    stream = io.StringIO()
+    yaml_handler.dump(data, stream)
+    return stream.getvalue()
+
+def write_if_changed(path: str, text: str) -> int:
+    """
+    Write `text` to `path` only when the bytes differ from what is on disk, via a
+    temp file in the same folder and os.replace so readers never see a partial file.
+    Returns the number of bytes written (0 when the file was already identical).
+    """
+    content = text.encode("utf-8")
+    try:
+        with open(path, "rb") as fh:
+            if fh.read() == content:
+                return 0
+        mode = os.stat(path).st_mode & 0o777  # an existing file keeps its mode
+    except FileNotFoundError:
+        mode = None
+
+    fd, tmp = _create_temp(os.path.dirname(os.path.abspath(path)), os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return len(content)
+
+# ---------- Dry run ----------
+def text_diff(path: str, old_text: str, new_text: str) -> str:
+    """
+    Unified diff of one file with a/ b/ paths relative to the working directory,
+    so the patch applies with `git apply` or `patch -p1` from there.
+    """
+    rel = os.path.relpath(path).replace(os.sep, "/")
+    out = []
+    for line in difflib.unified_diff(old_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                                     f"a/{rel}", f"b/{rel}"):
+        out.append(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n")
+    return "".join(out)
+
+def diff_counts(diff: str):
+    """(insertions, deletions) of a unified diff."""
+    added = removed = 0
+    for line in diff.splitlines():
+        if line.startswith("+") and not line.startswith("+++"):
+            added += 1
+        elif line.startswith("-") and not line.startswith("---"):
+            removed += 1
+    return added, removed
+
+class PatchSet:
+    """
+    Per-file diffs collected by a --dry-run, written out as one patch plus a JSON
+    summary ({"run", "files_changed", "insertions", "deletions", "files": [...]}).
+    """
+
+    def __init__(self, run_name: str):
+        self.run_name = run_name
+        self.files = []  # (path, diff, info)
+        self.positions = {}  # path -> index in files
+
+    def add(self, path: str, diff: str, **info):
+        """A later diff for the same path (taken against the same original) replaces the earlier one."""
+        if not diff:
+            return
+        if path in self.positions:
+            pos = self.positions[path]
+            self.files[pos] = (path, diff, {**self.files[pos][2], **info})
+        else:
+            self.positions[path] = len(self.files)
+            self.files.append((path, diff, info))
+
+    def write(self, patch_path: str):
+        summary_path = os.path.splitext(patch_path)[0] + ".json"
+        files = []
+        with open(patch_path, "w") as fh:
+            for path, diff, info in self.files:
+                fh.write(diff)
+                added, removed = diff_counts(diff)
+                files.append({"path": path, "insertions": added, "deletions": removed, **info})
+        summary = {
+            "run": self.run_name,
+            "files_changed": len(files),
+            "insertions": sum(f["insertions"] for f in files),
+            "deletions": sum(f["deletions"] for f in files),
+            "files": files,
+        }
+        with open(summary_path, "w") as fh:
+            json.dump(summary, fh, indent=2)
+        print(f"📝 Dry run: {summary['files_changed']} file(s) would change "
+              f"(+{summary['insertions']}/-{summary['deletions']}). "
+              f"Patch: {patch_path}, summary: {summary_path}")
+        return summary
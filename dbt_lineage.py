@@ -0,0 +1,232 @@
+import ast
+import re
+from collections import deque
+
+from dbt_config_block import config_arg, find_config_blocks
+
+# ---------- CONFIG ----------
+MAX_CLUSTER_COLUMNS = 4  # BigQuery clusters on at most four columns
+# -----------------------------------
+
+# ---------- ref()/source() parsing ----------
+# ref('model'), ref("package", "model") and ref('model', v=2) all point at `model`.
+REF_RE = re.compile(
+    r"""\bref\s*\(\s*(['"])([^'"]+)\1\s*(?:,\s*(['"])([^'"]+)\3\s*)?(?:,\s*v(?:ersion)?\s*=[^)]*)?\)"""
+)
+SOURCE_RE = re.compile(r"""\bsource\s*\(\s*(['"])([^'"]+)\1\s*,\s*(['"])([^'"]+)\3\s*\)""")
+_JINJA_COMMENT_RE = re.compile(r"\{#.*?#\}", re.DOTALL)
+# `select *`, `select t.*` or a `t.*` item further down a select list
+_STAR_RE = re.compile(r"\bselect\s+(?:distinct\s+)?(?:\w+\.)?\*|,\s*\w+\.\*", re.IGNORECASE)
+_WORD_RE = re.compile(r"\w+")
+
+def source_node(source_name: str, table_name: str) -> str:
+    return f"source:{source_name}.{table_name}".lower()
+
+def parse_refs(sql_text: str):
+    """Parent nodes of a model in first-reference order: model names and source:<src>.<table>."""
+    text = _JINJA_COMMENT_RE.sub("", sql_text)
+    found = []
+    for m in REF_RE.finditer(text):
+        found.append((m.start(), (m.group(4) or m.group(2)).lower()))
+    for m in SOURCE_RE.finditer(text):
+        found.append((m.start(), source_node(m.group(2), m.group(4))))
+    found.sort()
+    return list(dict.fromkeys(node for _, node in found))
+
+# ---------- Partition/cluster keys ----------
+class NodeKeys:
+    """
+    The partition/cluster keys a node ends up with. `*_from` names the node that
+    set the key in its own config (the node itself when it is not inherited) and
+    `*_depth` counts the ref() hops from there.
+    A partition set by a non-literal config value (a Jinja expression) keeps
+    partition_field None: it blocks inheritance but cannot be propagated.
+    """
+
+    __slots__ = ("partition_field", "partition_value", "partition_from", "partition_depth",
+                 "cluster", "cluster_from", "cluster_depth")
+
+    def __init__(self, partition_field=None, partition_value=None, partition_from=None, partition_depth=0,
+                 cluster=(), cluster_from=None, cluster_depth=0):
+        self.partition_field = partition_field
+        self.partition_value = partition_value
+        self.partition_from = partition_from
+        self.partition_depth = partition_depth
+        self.cluster = tuple(cluster)
+        self.cluster_from = cluster_from
+        self.cluster_depth = cluster_depth
+
+    def inherited(self, node: str) -> bool:
+        return (self.partition_field is not None and self.partition_from != node) or \
+               (bool(self.cluster) and self.cluster_from != node)
+
+def _literal(value_text: str):
+    try:
+        return ast.literal_eval(value_text.strip())
+    except (ValueError, SyntaxError):
+        return None
+
+def config_keys(sql_text: str, node: str):
+    """NodeKeys from the model's own config() blocks, or None when it sets neither key."""
+    blocks = find_config_blocks(sql_text)
+    partition = config_arg(blocks, "partition_by")
+    cluster = config_arg(blocks, "clustered_by")
+    if partition is None and cluster is None:
+        return None
+    keys = NodeKeys()
+    if partition is not None:
+        value = _literal(partition.value)
+        field = value.get("field") if isinstance(value, dict) else None
+        keys.partition_field = str(field) if field else None
+        keys.partition_value = partition.value.strip()
+        keys.partition_from = node
+    if cluster is not None:
+        value = _literal(cluster.value)
+        if isinstance(value, str):
+            value = [value]
+        keys.cluster = tuple(str(c) for c in value) if isinstance(value, (list, tuple)) else ()
+        keys.cluster_from = node
+    return keys
+
+# ---------- Graph ----------
+class LineageGraph:
+    """
+    Project DAG from the ref()/source() calls in model SQL. Model nodes are
+    lowercase model names; sources are source:<source>.<table> nodes without SQL.
+    """
+
+    def __init__(self):
+        self.parents = {}   # node -> [parent node, ...]
+        self.children = {}  # node -> [child node, ...]
+        self.paths = {}     # model node -> .sql path
+        self.ids = {}       # model node -> lowercase identifiers in its SQL
+        self.star = set()   # model nodes selecting * (every parent column survives)
+
+    def add_model(self, name: str, path: str, sql_text: str):
+        node = name.lower()
+        self.paths[node] = path
+        self.ids[node] = {tok.lower() for tok in _WORD_RE.findall(sql_text)}
+        if _STAR_RE.search(_JINJA_COMMENT_RE.sub("", sql_text)):
+            self.star.add(node)
+        parents = [p for p in parse_refs(sql_text) if p != node]
+        self.parents[node] = parents
+        self.children.setdefault(node, [])
+        for parent in parents:
+            self.parents.setdefault(parent, [])
+            self.children.setdefault(parent, []).append(node)
+
+    def survives(self, node: str, column: str) -> bool:
+        """Whether a parent's column plausibly reaches this model's output (named in its SQL, or select *)."""
+        return node in self.star or column.lower() in self.ids.get(node, ())
+
+    def topological_order(self):
+        """
+        (order, cyclic, blocked): the nodes that can be ordered, parents first;
+        the members of ref() cycles; and the nodes left unordered only because
+        they are downstream of a cycle.
+        """
+        pending = {node: len(parents) for node, parents in self.parents.items()}
+        queue = deque(node for node, n in pending.items() if n == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for child in self.children.get(node, ()):
+                pending[child] -= 1
+                if pending[child] == 0:
+                    queue.append(child)
+        stuck = {node for node, n in pending.items() if n > 0}
+        cyclic = self._cycle_members(stuck)
+        return order, sorted(cyclic), sorted(stuck - cyclic)
+
+    def _cycle_members(self, nodes):
+        """Nodes of `nodes` on a cycle among them: strongly connected components of 2+ nodes (Tarjan, iterative)."""
+        index, low, on_stack, stack, members = {}, {}, set(), [], set()
+        for root in sorted(nodes):
+            if root in index:
+                continue
+            work = [(root, iter(self.children.get(root, ())))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in nodes:
+                        continue
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.children.get(child, ()))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            top = stack.pop()
+                            on_stack.discard(top)
+                            component.append(top)
+                            if top == node:
+                                break
+                        if len(component) > 1:
+                            members.update(component)
+        return members
+
+def propagate(graph: LineageGraph, seeds):
+    """
+    seeds: {node: NodeKeys} set in a node's own config (or, for sources, in the
+    inventory). Returns ({node: NodeKeys} for every node that has keys, cycle
+    members, nodes blocked downstream of a cycle); see topological_order().
+
+    Nodes are resolved once each in topological order, so every parent is final
+    before its children read it; the walk is O(nodes + edges). A node keeps the
+    keys its own config sets and takes the missing ones from its parents in ref()
+    order: the partition of the first parent whose partition column survives,
+    and the surviving cluster columns of its parents, up to MAX_CLUSTER_COLUMNS.
+    """
+    order, cyclic, blocked = graph.topological_order()
+    resolved = {}
+    for node in order:
+        own = seeds.get(node)
+        keys = NodeKeys(
+            own.partition_field, own.partition_value, own.partition_from, 0,
+            own.cluster, own.cluster_from, 0,
+        ) if own is not None else NodeKeys()
+        has_partition = own is not None and own.partition_from is not None
+        has_cluster = own is not None and own.cluster_from is not None
+
+        for parent in graph.parents.get(node, ()):
+            pk = resolved.get(parent)
+            if pk is None:
+                continue
+            if not has_partition and pk.partition_field and graph.survives(node, pk.partition_field):
+                keys.partition_field = pk.partition_field
+                keys.partition_value = pk.partition_value
+                keys.partition_from = pk.partition_from
+                keys.partition_depth = pk.partition_depth + 1
+                has_partition = True
+            if not has_cluster and pk.cluster:
+                cluster = list(keys.cluster)
+                taken = {c.lower() for c in cluster}
+                for col in pk.cluster:
+                    if len(cluster) >= MAX_CLUSTER_COLUMNS:
+                        break
+                    if col.lower() not in taken and graph.survives(node, col):
+                        cluster.append(col)
+                        taken.add(col.lower())
+                if len(cluster) > len(keys.cluster):
+                    if not keys.cluster:
+                        keys.cluster_from = pk.cluster_from
+                        keys.cluster_depth = pk.cluster_depth + 1
+                    keys.cluster = tuple(cluster)
+
+        if has_partition or keys.cluster_from is not None:
+            resolved[node] = keys
+    return resolved, cyclic, blocked
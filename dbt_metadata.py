@@ -0,0 +1,587 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from dbt_metrics import METRICS
+
+# ---------- CONFIG ----------
+BULK_CHUNK_SIZE = 500        # tables per information_schema query
+FETCH_POOL_SIZE = 8          # concurrent warehouse connections
+QUERY_TIMEOUT_SECONDS = 300  # cursor.execute(timeout=...) where the connector takes it; None to disable
+FETCH_RETRIES = 2            # extra attempts per query after a failure
+FETCH_BACKOFF_SECONDS = 1.0  # doubled after every failed attempt
+TAG_REFERENCES_VIEW = "snowflake.account_usage.tag_references"  # bulk tag view (lags up to ~2h)
+# -----------------------------------
+
+# ---------- Policy tags ----------
+AMBER_TAG = (
+    "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/"
+    "taxonomies/3457114866031680/policyTags/1513664955126269388"
+)
+RED_TAG = (
+    "projects/tide-payment-prj-wip-iac-uk/locations/europe-west2/"
+    "taxonomies/1160578347745627110/policyTags/4489624887166714321"
+)
+
+def policy_meta(tag_values):
+    """Map Snowflake tag values to the dbt column meta used by parse_ddl_to_dbt()."""
+    values = [str(v).lower() for v in tag_values]
+    if "amber" in values:
+        return {"policy_tags": AMBER_TAG}
+    if "red" in values:
+        return {"policy_tags": RED_TAG}
+    return {}
+
+# ---------- Column model ----------
+# Fetched metadata stays in these slotted objects from the warehouse to the
+# merge; plain dicts (the shape schema.yml, the cache and the state digests
+# use) are built only at those boundaries with as_dict()/from_dict().
+class TagSet:
+    """
+    The dbt meta a column's tags map to: policy None for no meta, else the
+    policy tag. Only a few distinct ones exist, so columns share instances from
+    tag_set() instead of carrying a meta dict each.
+    """
+
+    __slots__ = ("policy",)
+
+    def __init__(self, policy=None):
+        self.policy = policy
+
+    def meta(self):
+        # a new dict per call: YAML documents must never share one
+        return {} if self.policy is None else {"policy_tags": self.policy}
+
+    def __eq__(self, other):
+        return isinstance(other, TagSet) and self.policy == other.policy
+
+    def __hash__(self):
+        return hash(self.policy)
+
+    def __repr__(self):
+        return f"TagSet({self.policy!r})"
+
+_TAG_SETS = {}
+
+def tag_set(policy=None) -> TagSet:
+    found = _TAG_SETS.get(policy)
+    if found is None:
+        found = _TAG_SETS[policy] = TagSet(policy)
+    return found
+
+def tags_from_meta(meta) -> TagSet:
+    if not meta or "policy_tags" not in meta:
+        return tag_set(None)
+    return tag_set(meta["policy_tags"])
+
+class Column:
+    """One warehouse column; the name is interned since the same names recur across tables."""
+
+    __slots__ = ("name", "description", "tags")
+
+    def __init__(self, name, description="", tags=None):
+        self.name = sys.intern(str(name))
+        self.description = description
+        self.tags = tags if tags is not None else tag_set(None)
+
+    @property
+    def meta(self):
+        return self.tags.meta()
+
+    def as_dict(self):
+        return {"name": self.name, "description": self.description, "meta": self.meta}
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """From a column mapping: a cache entry or a ruamel CommentedMap."""
+        return cls(mapping["name"], mapping.get("description"), tags_from_meta(mapping.get("meta")))
+
+    def __eq__(self, other):
+        return isinstance(other, Column) and (self.name, self.description, self.tags) == (
+            other.name, other.description, other.tags)
+
+    def __repr__(self):
+        return f"Column({self.name!r}, {self.description!r}, {self.tags!r})"
+
+class Table:
+    """A fetched table: where it lives plus its columns, in warehouse order."""
+
+    __slots__ = ("database", "schema", "name", "columns")
+
+    def __init__(self, database, schema, name, columns):
+        self.database = sys.intern(str(database))
+        self.schema = sys.intern(str(schema))
+        self.name = sys.intern(str(name))
+        self.columns = tuple(columns)
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def column_dicts(self):
+        return [col.as_dict() for col in self.columns]
+
+    def __repr__(self):
+        return f"Table({self.database!r}, {self.schema!r}, {self.name!r}, {len(self.columns)} columns)"
+
+def build_column(name, comment, tag_values):
+    return Column(name, comment or "", tag_set(policy_meta(tag_values).get("policy_tags")))
+
+# ---------- Inventory grouping ----------
+def is_blank(val) -> bool:
+    return val is None or str(val).strip() in ("", "nan")
+
+def table_key(database, schema, table) -> str:
+    return ".".join(str(part).strip() for part in (database, schema, table)).lower()
+
+def group_inventory(inventory):
+    """
+    inventory: iterable of (database, schema, table) rows from the Excel file.
+    Returns {(database, schema): [table_lc, ...]}, dropping rows without db/schema.
+    """
+    grouped = defaultdict(list)
+    for database, schema, table in inventory:
+        if is_blank(database) or is_blank(schema) or is_blank(table):
+            continue
+        grouped[(str(database).strip(), str(schema).strip())].append(str(table).strip().lower())
+    return grouped
+
+# ---------- Connections ----------
+def snowflake_connect():
+    import snowflake.connector  # imported here so offline helpers never need it
+    return snowflake.connector.connect(
+        user=os.getenv("SNOWFLAKE_USER"),
+        password=os.getenv("SNOWFLAKE_PASSWORD"),
+        account=os.getenv("SNOWFLAKE_ACCOUNT"),
+        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+        role=os.getenv("SNOWFLAKE_ROLE", "ACCOUNTADMIN")
+    )
+
+class ConnectionPool:
+    """
+    At most `size` DB-API connections from connect_fn, one per worker thread,
+    opened on first use. The `size` threads live as long as the pool, so later
+    map() calls reuse their connections. map() runs fn(conn, *job) for every
+    job, retries failures with exponential backoff on a fresh connection, and
+    returns results in job order; a job that keeps failing yields its last exception.
+    """
+
+    def __init__(self, connect_fn, size=FETCH_POOL_SIZE, retries=FETCH_RETRIES,
+                 backoff=FETCH_BACKOFF_SECONDS):
+        self.connect_fn = connect_fn
+        self.size = max(1, int(size))
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+        self._executor = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect_fn()
+            METRICS.count("warehouse_connections")
+            with self._lock:
+                self._conns.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is None:
+            return
+        with self._lock:
+            self._conns.remove(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _run(self, fn, job):
+        for attempt in range(self.retries + 1):
+            try:
+                return fn(self._conn(), *job)
+            except Exception as e:
+                # the connection may be unusable after a failure; reconnect next attempt
+                METRICS.count("warehouse_query_failures")
+                self._drop()
+                if attempt == self.retries:
+                    return e
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def map(self, fn, jobs):
+        jobs = list(jobs)
+        if not jobs:
+            return []
+        # even a single job goes to the workers: a connection opened on the
+        # calling thread would be one more than `size`
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="warehouse")
+            executor = self._executor
+        return list(executor.map(lambda job: self._run(fn, job), jobs))
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            conns, self._conns = self._conns, []
+        if executor is not None:
+            executor.shutdown()
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+@functools.lru_cache(maxsize=None)
+def _takes_timeout(cursor_type) -> bool:
+    """Whether cursor_type.execute() accepts timeout=: Snowflake's does, sqlite3/DuckDB stand-ins do not."""
+    try:
+        params = inspect.signature(cursor_type.execute).parameters
+    except (TypeError, ValueError):
+        return False
+    return "timeout" in params or any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+
+def _execute(cur, query, params=None, timeout=None):
+    METRICS.count("warehouse_queries")
+    args = (query,) if params is None else (query, params)
+    if timeout and _takes_timeout(type(cur)):
+        cur.execute(*args, timeout=timeout)
+    else:
+        cur.execute(*args)
+
+# ---------- Per-table GET_DDL ----------
+def fetch_ddl(conn, database, schema, table, timeout=None):
+    cur = conn.cursor()
+    try:
+        _execute(cur, f"SELECT GET_DDL('TABLE', '{database}.{schema}.{table}')", timeout=timeout)
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+def fetch_inventory_ddls(pool, inventory, timeout=QUERY_TIMEOUT_SECONDS, missing=None):
+    """
+    GET_DDL for every inventory table, spread over the pool.
+    Returns {table_key(db, schema, table): ddl}; failures are reported and left out.
+    missing: optional set that collects the keys of tables the warehouse says do not exist.
+    """
+    jobs = [
+        (database, schema, table)
+        for (database, schema), tables in group_inventory(inventory).items()
+        for table in dict.fromkeys(tables)
+    ]
+    results = {}
+    for (database, schema, table), ddl in zip(jobs, pool.map(
+            lambda conn, *job: fetch_ddl(conn, *job, timeout=timeout), jobs)):
+        if isinstance(ddl, Exception):
+            if missing is not None and "does not exist" in str(ddl):
+                missing.add(table_key(database, schema, table))
+                print(f"⚠️ {database}.{schema}.{table} does not exist.")
+                continue
+            print(f"❌ Failed to fetch DDL for {database}.{schema}.{table}: {ddl}")
+            continue
+        results[table_key(database, schema, table)] = ddl
+    print(f"📥 Fetched DDL for {len(results)}/{len(jobs)} table(s).")
+    return results
+
+# ---------- Bulk information_schema fetch ----------
+# Columns of a whole (database, schema) group at once. Tags come from the
+# account-wide TAG_REFERENCES view: information_schema.tag_references_all_columns
+# is a table function that takes one table per call, so it cannot be joined here.
+BULK_COLUMNS_QUERY = """
+select c.table_name, c.column_name, c.comment, t.tag_name, t.tag_value
+from {info}.columns c
+left join {tags} t
+    on t.domain = 'COLUMN'
+    and t.object_deleted is null
+    and c.table_catalog = t.object_database
+    and c.table_schema = t.object_schema
+    and c.table_name = t.object_name
+    and c.column_name = t.column_name
+where upper(c.table_schema) = {ph}
+  and upper(c.table_name) in ({in_list})
+order by c.table_name, c.ordinal_position
+"""
+
+def fetch_columns_chunk(conn, database, schema, tables, info_schema=None, placeholder="%s",
+                        timeout=None, tag_view=TAG_REFERENCES_VIEW):
+    """
+    Fetch columns, comments and tag references for up to BULK_CHUNK_SIZE tables
+    of one schema in a single query.
+    Returns {table_lc: [Column, ...]} built like parse_ddl_to_dbt() builds them;
+    tables that do not exist are simply absent.
+
+    info_schema/placeholder/tag_view let a local stand-in be used, e.g. SQLite with an
+    attached `information_schema` database: info_schema="information_schema", placeholder="?".
+    """
+    info = info_schema or f"{database}.information_schema"
+    tables = [str(t).upper() for t in tables]
+    query = BULK_COLUMNS_QUERY.format(
+        info=info, tags=tag_view, ph=placeholder, in_list=", ".join([placeholder] * len(tables))
+    )
+    cur = conn.cursor()
+    try:
+        _execute(cur, query, [str(schema).upper()] + tables, timeout=timeout)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    # rows arrive one per (column, tag); fold tags while keeping column order
+    by_table = {}
+    for table_name, col_name, comment, tag_name, tag_value in rows:
+        cols = by_table.setdefault(table_name.lower(), {})
+        if col_name not in cols:
+            cols[col_name] = (comment, [])
+        if tag_name and tag_value:
+            cols[col_name][1].append(tag_value)
+
+    return {
+        table: [build_column(name, comment, tags) for name, (comment, tags) in cols.items()]
+        for table, cols in by_table.items()
+    }
+
+def _chunk_jobs(grouped):
+    jobs = []
+    for (database, schema), tables in grouped.items():
+        tables = list(dict.fromkeys(tables))
+        for start in range(0, len(tables), BULK_CHUNK_SIZE):
+            jobs.append((database, schema, tables[start:start + BULK_CHUNK_SIZE]))
+    return jobs
+
+def fetch_inventory_columns(pool, inventory, info_schema=None, placeholder="%s",
+                            timeout=QUERY_TIMEOUT_SECONDS, missing=None, tag_view=TAG_REFERENCES_VIEW):
+    """
+    Bulk-fetch every inventory table: one query per (database, schema) chunk,
+    chunks spread over the pool and merged back in inventory order.
+    Returns {table_key(db, schema, table): [Column, ...]}.
+    missing: optional set that collects the keys of tables a successful chunk did
+    not return (they do not exist); tables of failed chunks are not added.
+    """
+    grouped = group_inventory(inventory)
+    jobs = _chunk_jobs(grouped)
+
+    def run(conn, database, schema, tables):
+        return fetch_columns_chunk(conn, database, schema, tables, info_schema=info_schema,
+                                   placeholder=placeholder, timeout=timeout, tag_view=tag_view)
+
+    results, found = {}, defaultdict(int)
+    for (database, schema, tables), fetched in zip(jobs, pool.map(run, jobs)):
+        if isinstance(fetched, Exception):
+            print(f"❌ Failed to fetch metadata for {database}.{schema}: {fetched}")
+            continue
+        for table, columns in fetched.items():
+            results[table_key(database, schema, table)] = columns
+        found[(database, schema)] += len(fetched)
+        if missing is not None:
+            missing.update(table_key(database, schema, t) for t in tables if t not in fetched)
+    for (database, schema), tables in grouped.items():
+        print(f"📥 {database}.{schema}: metadata for {found[(database, schema)]}/"
+              f"{len(set(tables))} table(s).")
+    return results
+
+# ---------- LAST_ALTERED (cache invalidation) ----------
+LAST_ALTERED_QUERY = """
+select table_name, last_altered
+from {info}.tables
+where upper(table_schema) = {ph}
+  and upper(table_name) in ({in_list})
+"""
+
+def fetch_last_altered_chunk(conn, database, schema, tables, info_schema=None, placeholder="%s",
+                             timeout=None):
+    info = info_schema or f"{database}.information_schema"
+    tables = [str(t).upper() for t in tables]
+    query = LAST_ALTERED_QUERY.format(
+        info=info, ph=placeholder, in_list=", ".join([placeholder] * len(tables))
+    )
+    cur = conn.cursor()
+    try:
+        _execute(cur, query, [str(schema).upper()] + tables, timeout=timeout)
+        return {name.lower(): str(altered) for name, altered in cur.fetchall()}
+    finally:
+        cur.close()
+
+def fetch_inventory_last_altered(pool, inventory, info_schema=None, placeholder="%s",
+                                 timeout=QUERY_TIMEOUT_SECONDS):
+    """Returns {table_key(db, schema, table): last_altered as text}."""
+    jobs = _chunk_jobs(group_inventory(inventory))
+
+    def run(conn, database, schema, tables):
+        return fetch_last_altered_chunk(conn, database, schema, tables, info_schema=info_schema,
+                                        placeholder=placeholder, timeout=timeout)
+
+    results = {}
+    for (database, schema, _), fetched in zip(jobs, pool.map(run, jobs)):
+        if isinstance(fetched, Exception):
+            print(f"❌ Failed to fetch LAST_ALTERED for {database}.{schema}: {fetched}")
+            continue
+        for table, altered in fetched.items():
+            results[table_key(database, schema, table)] = altered
+    return results
+
+# ---------- Partition column stats ----------
+# Type of each partition column plus its table's row count, one query per
+# (database, schema) chunk; the date span then needs one min/max per column.
+COLUMN_STATS_QUERY = """
+select c.table_name, c.column_name, c.data_type, t.row_count
+from {info}.columns c
+join {info}.tables t
+    on c.table_schema = t.table_schema
+    and c.table_name = t.table_name
+where upper(c.table_schema) = {ph}
+  and upper(c.table_name) in ({in_list})
+  and upper(c.column_name) in ({col_list})
+"""
+
+def fetch_column_stats_chunk(conn, database, schema, tables, columns, info_schema=None,
+                             placeholder="%s", timeout=None):
+    """
+    Returns {(table_lc, column_lc): (column_name, data_type, row_count)} for the
+    requested columns of up to BULK_CHUNK_SIZE tables of one schema.
+    """
+    info = info_schema or f"{database}.information_schema"
+    tables = [str(t).upper() for t in tables]
+    columns = sorted({str(c).upper() for c in columns})
+    query = COLUMN_STATS_QUERY.format(
+        info=info, ph=placeholder,
+        in_list=", ".join([placeholder] * len(tables)),
+        col_list=", ".join([placeholder] * len(columns)),
+    )
+    cur = conn.cursor()
+    try:
+        _execute(cur, query, [str(schema).upper()] + tables + columns, timeout=timeout)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    return {
+        (table.lower(), column.lower()): (column, data_type, row_count)
+        for table, column, data_type, row_count in rows
+    }
+
+def fetch_inventory_column_stats(pool, targets, info_schema=None, placeholder="%s",
+                                 timeout=QUERY_TIMEOUT_SECONDS):
+    """
+    targets: iterable of (database, schema, table, column).
+    Returns {(table_key(db, schema, table), column_lc): (column_name, data_type, row_count)};
+    columns the warehouse does not know are absent.
+    """
+    wanted = defaultdict(set)  # table_key -> column_lc
+    for database, schema, table, column in targets:
+        wanted[table_key(database, schema, table)].add(str(column).strip().lower())
+    grouped = group_inventory((database, schema, table) for database, schema, table, _ in targets)
+    jobs = _chunk_jobs(grouped)
+
+    def run(conn, database, schema, tables):
+        columns = set().union(*(wanted[table_key(database, schema, t)] for t in tables))
+        return fetch_column_stats_chunk(conn, database, schema, tables, columns, info_schema=info_schema,
+                                        placeholder=placeholder, timeout=timeout)
+
+    results = {}
+    for (database, schema, _), fetched in zip(jobs, pool.map(run, jobs)):
+        if isinstance(fetched, Exception):
+            print(f"❌ Failed to fetch column types for {database}.{schema}: {fetched}")
+            continue
+        for (table, column), stats in fetched.items():
+            key = table_key(database, schema, table)
+            if column in wanted[key]:  # the IN lists cross tables and columns
+                results[(key, column)] = stats
+    return results
+
+def fetch_column_span(conn, database, schema, table, column, timeout=None):
+    """(min, max) of one column; Snowflake answers this from micro-partition metadata."""
+    cur = conn.cursor()
+    try:
+        _execute(cur, f'SELECT MIN("{column}"), MAX("{column}") FROM {database}.{schema}.{table}',
+                 timeout=timeout)
+        return tuple(cur.fetchone())
+    finally:
+        cur.close()
+
+def fetch_column_spans(pool, targets, timeout=QUERY_TIMEOUT_SECONDS):
+    """
+    targets: list of (database, schema, table, column), the column spelled as
+    information_schema reports it (it is quoted). Returns {(table_key, column_lc): (min, max)}.
+    """
+    results = {}
+    for (database, schema, table, column), span in zip(targets, pool.map(
+            lambda conn, *job: fetch_column_span(conn, *job, timeout=timeout), targets)):
+        if isinstance(span, Exception):
+            print(f"❌ Failed to fetch the range of {database}.{schema}.{table}.{column}: {span}")
+            continue
+        results[(table_key(database, schema, table), column.lower())] = span
+    return results
+
+# ---------- Fetch stage with cache ----------
+def fetch_inventory_metadata(pool, inventory, source="information_schema", parse_ddl=None,
+                             cache=None, refresh=False, check_last_altered=False,
+                             tag_view=TAG_REFERENCES_VIEW, **kwargs):
+    """
+    Columns for every inventory table. Fresh entries in `cache` (a MetadataCache)
+    are used as-is, so a warm rerun opens no warehouse connection at all; only
+    misses are fetched and written back. Tables the warehouse does not have are
+    cached too, as negative entries, so they are not asked for again within the
+    TTL. refresh=True ignores the cache, and check_last_altered=True spends one
+    query per schema chunk to refetch tables whose LAST_ALTERED moved since they
+    were cached (or that appeared since they were cached as missing).
+    Returns {table_key(db, schema, table): Table}.
+    """
+    rows = {}
+    for (database, schema), tables in group_inventory(inventory).items():
+        for table in tables:
+            rows[table_key(database, schema, table)] = (database, schema, table)
+
+    cached = {}
+    if cache is not None and not refresh:
+        cached = cache.get_many(rows, source)
+
+    altered = {}
+    if check_last_altered:
+        altered = fetch_inventory_last_altered(pool, rows.values(), **kwargs)
+        cached = {
+            key: entry for key, entry in cached.items()
+            if (entry["columns"] is None and key not in altered)
+            or (entry["last_altered"] and entry["last_altered"] == altered.get(key))
+        }
+
+    misses = [row for key, row in rows.items() if key not in cached]
+    if cache is not None:
+        print(f"🗄️ Metadata cache: {len(cached)} hit(s), {len(misses)} miss(es).")
+        METRICS.count("metadata_cache_hits", len(cached))
+        METRICS.count("metadata_cache_misses", len(misses))
+
+    ddls, absent = {}, set()
+    if not misses:
+        fetched = {}
+    elif source == "information_schema":
+        fetched = fetch_inventory_columns(pool, misses, missing=absent, tag_view=tag_view, **kwargs)
+    else:
+        ddls = fetch_inventory_ddls(pool, misses, timeout=kwargs.get("timeout", QUERY_TIMEOUT_SECONDS),
+                                    missing=absent)
+        fetched = {key: parse_ddl(ddl) for key, ddl in ddls.items()}
+
+    if cache is not None and (fetched or absent):
+        cache.put_many(
+            [(key, ddls.get(key), [col.as_dict() for col in columns], altered.get(key))
+             for key, columns in fetched.items()]
+            + [(key, None, None, None) for key in absent - set(fetched)],
+            source,
+        )
+
+    results = {}
+    for key, (database, schema, table) in rows.items():
+        if key in fetched:
+            results[key] = Table(database, schema, table, fetched[key])
+        elif key in cached and cached[key]["columns"] is not None:
+            results[key] = Table(database, schema, table, map(Column.from_dict, cached[key]["columns"]))
+    METRICS.count("tables_fetched", len(fetched))
+    METRICS.count("columns_fetched", sum(len(cols) for cols in fetched.values()))
+    return results
@@ -0,0 +1,85 @@
+import json
+import os
+import sqlite3
+import time
+
+# ---------- CONFIG ----------
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".metadata_cache.sqlite")
+CACHE_TTL_SECONDS = 12 * 60 * 60  # entries older than this are refetched
+# -----------------------------------
+
+class MetadataCache:
+    """
+    Local SQLite cache of per-table warehouse metadata, keyed by
+    table_key(database, schema, table). Stores the raw DDL (when the GET_DDL
+    path was used), the parsed column dicts and the table's LAST_ALTERED.
+    A table the warehouse does not have is stored with columns None, under the
+    same TTL, so warm runs do not keep asking for it.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            create table if not exists table_metadata (
+                key          text not null,
+                source       text not null,
+                ddl          text,
+                columns_json text not null,
+                last_altered text,
+                fetched_at   real not null,
+                primary key (key, source)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get_many(self, keys, source):
+        """
+        Fresh entries only. Returns {key: {"columns", "ddl", "last_altered"}};
+        columns is None for a table cached as missing.
+        """
+        keys = list(keys)
+        oldest = time.time() - self.ttl
+        found = {}
+        # stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.conn.execute(
+                "select key, ddl, columns_json, last_altered from table_metadata "
+                f"where source = ? and fetched_at >= ? and key in ({', '.join('?' * len(chunk))})",
+                [source, oldest] + chunk,
+            ).fetchall()
+            for key, ddl, columns_json, last_altered in rows:
+                found[key] = {
+                    "columns": json.loads(columns_json),
+                    "ddl": ddl,
+                    "last_altered": last_altered,
+                }
+        return found
+
+    def put_many(self, entries, source):
+        """entries: iterable of (key, ddl, columns, last_altered); columns None marks a missing table."""
+        now = time.time()
+        self.conn.executemany(
+            "insert or replace into table_metadata "
+            "(key, source, ddl, columns_json, last_altered, fetched_at) values (?, ?, ?, ?, ?, ?)",
+            [
+                (key, source, ddl, json.dumps(columns), last_altered, now)
+                for key, ddl, columns, last_altered in entries
+            ],
+        )
+        self.conn.commit()
+
+    def invalidate(self, keys=None):
+        """Drop the given keys, or everything when keys is None."""
+        if keys is None:
+            self.conn.execute("delete from table_metadata")
+        else:
+            self.conn.executemany("delete from table_metadata where key = ?", [(k,) for k in keys])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,139 @@
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+
+# ---------- Run metrics ----------
+class RunMetrics:
+    """
+    Stage timers and counters for one converter run.
+        with METRICS.stage("yaml_parse"): ...
+        METRICS.count("models", len(models))
+    Stages accumulate seconds and calls, so a stage entered once per file adds up
+    over the run. Worker processes keep their own instance; ship
+    snapshot()/delta() back with each result and merge() it in the parent.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start a new run (callers that run several times in one process)."""
+        self.started = time.perf_counter()
+        self.stages = {}    # name -> {"seconds", "calls"}
+        self.counters = {}  # name -> int
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        with self.lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += calls
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def delta(self, before):
+        """What was recorded since `before` (an earlier snapshot())."""
+        now = self.snapshot()
+        old_stages, old_counters = before["stages"], before["counters"]
+        stages = {}
+        for name, entry in now["stages"].items():
+            old = old_stages.get(name, {"seconds": 0.0, "calls": 0})
+            if entry["calls"] != old["calls"]:
+                stages[name] = {"seconds": entry["seconds"] - old["seconds"],
+                                "calls": entry["calls"] - old["calls"]}
+        counters = {k: v - old_counters.get(k, 0) for k, v in now["counters"].items()
+                    if v != old_counters.get(k, 0)}
+        return {"stages": stages, "counters": counters}
+
+    def merge(self, recorded):
+        for name, entry in recorded["stages"].items():
+            self.add_time(name, entry["seconds"], entry["calls"])
+        for name, n in recorded["counters"].items():
+            self.count(name, n)
+
+    def report(self, run_name: str, extra=None):
+        snap = self.snapshot()
+        return {
+            "run": run_name,
+            "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "stages": {
+                name: {"seconds": round(e["seconds"], 6), "calls": e["calls"]}
+                for name, e in sorted(snap["stages"].items(), key=lambda kv: -kv[1]["seconds"])
+            },
+            "counters": dict(sorted(snap["counters"].items())),
+            **(extra or {}),
+        }
+
+    def write_report(self, path: str, run_name: str, extra=None):
+        report = self.report(run_name, extra)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(report, fh, indent=2)
+        os.replace(tmp, path)
+        slowest = ", ".join(f"{k} {v['seconds']:.2f}s" for k, v in list(report["stages"].items())[:3])
+        print(f"📊 Run report: {path} (slowest: {slowest or 'n/a'})")
+        return report
+
+METRICS = RunMetrics()  # per process
+
+def report_path(name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f".{name}_report.json")
+
+# ---------- Profiling hook ----------
+@contextlib.contextmanager
+def profiled(path=None):
+    """
+    Profile the block when `path` is set: pyinstrument (if installed) for an
+    .html path, cProfile stats loadable with pstats/snakeviz otherwise.
+    """
+    if not path:
+        yield
+        return
+    if path.endswith(".html"):
+        try:
+            from pyinstrument import Profiler  # optional
+        except ImportError:
+            print("⚠️ pyinstrument is not installed — writing cProfile stats instead.")
+            path = os.path.splitext(path)[0] + ".prof"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, "w") as fh:
+                    fh.write(profiler.output_html())
+                print(f"🔬 Profile written to {path}")
+            return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"🔬 Profile written to {path}")
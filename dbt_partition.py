@@ -0,0 +1,214 @@
+import csv
+import datetime
+import os
+
+from dbt_inventory import READERS, clean_cell
+from dbt_metadata import QUERY_TIMEOUT_SECONDS, fetch_column_spans, fetch_inventory_column_stats, table_key
+
+# ---------- CONFIG ----------
+MAX_PARTITIONS = 4000             # BigQuery allows 10,000 per table; leave room for the table to grow
+MIN_ROWS_PER_PARTITION = 100_000  # below this a finer granularity costs more metadata than it prunes
+# -----------------------------------
+
+# ---------- Column types ----------
+# Warehouse column type (Snowflake or BigQuery spelling) -> BigQuery partition data_type.
+# Snowflake's TIMESTAMP_NTZ has no time zone, which is BigQuery's DATETIME.
+PARTITION_TYPES = {
+    "DATE": "DATE",
+    "DATETIME": "DATETIME",
+    "TIMESTAMP_NTZ": "DATETIME",
+    "TIMESTAMP": "TIMESTAMP",
+    "TIMESTAMP_LTZ": "TIMESTAMP",
+    "TIMESTAMP_TZ": "TIMESTAMP",
+}
+
+def partition_type(data_type):
+    """BigQuery partition data_type for a warehouse type ('TIMESTAMP_NTZ(9)' -> DATETIME), else None."""
+    if not data_type:
+        return None
+    return PARTITION_TYPES.get(str(data_type).split("(")[0].strip().upper())
+
+def infer_partition_type(col: str) -> str:
+    """Name-only guess, used when no metadata covers the column."""
+    c = col.lower()
+    if "date" in c and not any(s in c for s in ["time", "ts", "stamp"]):
+        return "DATE"
+    return "TIMESTAMP"
+
+# ---------- Column stats ----------
+class ColumnStats:
+    """A partition column as the warehouse (or a snapshot of it) describes it."""
+
+    __slots__ = ("database", "schema", "table_name", "column_name", "data_type",
+                 "row_count", "min_value", "max_value")
+
+    def __init__(self, database, schema, table_name, column_name, data_type=None,
+                 row_count=None, min_value=None, max_value=None):
+        self.database = database
+        self.schema = schema
+        self.table_name = table_name
+        self.column_name = column_name
+        self.data_type = data_type
+        self.row_count = row_count
+        self.min_value = min_value
+        self.max_value = max_value
+
+    @property
+    def key(self):
+        return table_key(self.database, self.schema, self.table_name), self.column_name.lower()
+
+    def as_tuple(self):
+        return (self.database, self.schema, self.table_name, self.column_name, self.data_type,
+                self.row_count, self.min_value, self.max_value)
+
+    def __repr__(self):
+        return f"ColumnStats({'.'.join(self.key)}, {self.data_type!r}, rows={self.row_count!r})"
+
+# ---------- Granularity ----------
+GRANULARITIES = ("hour", "day", "month", "year")
+
+def as_datetime(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    try:
+        return datetime.datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def partition_count(granularity: str, low, high) -> int:
+    """Partitions a [low, high] range fills at this granularity."""
+    if granularity == "hour":
+        return int((high - low).total_seconds() // 3600) + 1
+    if granularity == "day":
+        return (high.date() - low.date()).days + 1
+    if granularity == "month":
+        return (high.year - low.year) * 12 + high.month - low.month + 1
+    return high.year - low.year + 1
+
+def choose_granularity(data_type: str, row_count, min_value, max_value):
+    """
+    The finest granularity that stays under MAX_PARTITIONS over the column's span
+    and keeps at least MIN_ROWS_PER_PARTITION rows per partition; the coarsest
+    one that fits when none does. hour only applies to TIMESTAMP/DATETIME, and
+    without a row count the finest candidate is day. None when the span is
+    unknown (dbt then uses day).
+    """
+    low, high = as_datetime(min_value), as_datetime(max_value)
+    if low is None or high is None:
+        return None
+    if high < low:
+        low, high = high, low
+    fitting = [g for g in GRANULARITIES
+               if not (g == "hour" and (data_type == "DATE" or row_count is None))
+               and partition_count(g, low, high) <= MAX_PARTITIONS]
+    if not fitting:
+        return "year"
+    for g in fitting:
+        if row_count is None or row_count / partition_count(g, low, high) >= MIN_ROWS_PER_PARTITION:
+            return g
+    return fitting[-1]
+
+# ---------- partition_by ----------
+class PartitionSpec:
+    """
+    partition_by for one column. data_type None means the metadata says the
+    column is not a date/time (source_type holds what it is): no time partition.
+    guessed is True when the type came from infer_partition_type().
+    """
+
+    __slots__ = ("field", "data_type", "granularity", "source_type", "guessed")
+
+    def __init__(self, field, data_type, granularity=None, source_type=None, guessed=False):
+        self.field = field
+        self.data_type = data_type
+        self.granularity = granularity
+        self.source_type = source_type
+        self.guessed = guessed
+
+    def config(self) -> str:
+        """The partition_by value as config() source text; day granularity is dbt's default and left out."""
+        text = f"{{'field': '{self.field}', 'data_type': '{self.data_type}'"
+        if self.granularity and self.granularity != "day":
+            text += f", 'granularity': '{self.granularity}'"
+        return text + "}"
+
+    def describe(self) -> str:
+        if self.guessed:
+            return f"{self.data_type}, guessed from the name"
+        return f"{self.data_type} by {self.granularity or 'day'}"
+
+def partition_spec(field: str, stats=None) -> PartitionSpec:
+    """partition_by for `field` from its ColumnStats, or from the name when there are none."""
+    if stats is None:
+        return PartitionSpec(field, infer_partition_type(field), guessed=True)
+    data_type = partition_type(stats.data_type)
+    if data_type is None:
+        return PartitionSpec(field, None, source_type=stats.data_type)
+    granularity = choose_granularity(data_type, stats.row_count, stats.min_value, stats.max_value)
+    return PartitionSpec(field, data_type, granularity, stats.data_type)
+
+# ---------- Snapshot file ----------
+# One row per partition column; written by --fetch-column-stats, read offline afterwards.
+SNAPSHOT_FIELDS = ["database", "schema", "table_name", "column_name", "data_type",
+                   "row_count", "min_value", "max_value"]
+
+def _row_count(val):
+    text = clean_cell(val)
+    try:
+        return int(float(text)) if text else None
+    except ValueError:
+        return None
+
+def load_column_stats(path: str):
+    """{(table_key, column_lc): ColumnStats} from a .csv/.xlsx/.parquet snapshot."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported column stats format '{ext}' for {path}")
+    stats = {}
+    for rec in READERS[ext](path):
+        item = ColumnStats(
+            clean_cell(rec.get("database")), clean_cell(rec.get("schema")),
+            clean_cell(rec.get("table_name")), clean_cell(rec.get("column_name")),
+            clean_cell(rec.get("data_type")) or None, _row_count(rec.get("row_count")),
+            clean_cell(rec.get("min_value")) or None, clean_cell(rec.get("max_value")) or None,
+        )
+        if item.table_name and item.column_name:
+            stats[item.key] = item
+    print(f"📏 Loaded column stats for {len(stats)} partition column(s) from {path}.")
+    return stats
+
+def write_column_stats(path: str, stats):
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(SNAPSHOT_FIELDS)
+        for item in sorted(stats.values(), key=lambda s: s.key):
+            writer.writerow(["" if v is None else v for v in item.as_tuple()])
+
+# ---------- Warehouse fetch ----------
+def fetch_partition_stats(pool, targets, info_schema=None, placeholder="%s", timeout=QUERY_TIMEOUT_SECONDS):
+    """
+    targets: (database, schema, table, column) per inventory partition column.
+    One information_schema query per schema chunk for types and row counts,
+    then a min/max per date/time column. Returns {(table_key, column_lc): ColumnStats}.
+    """
+    targets = list(dict.fromkeys(targets))
+    types = fetch_inventory_column_stats(pool, targets, info_schema=info_schema, placeholder=placeholder,
+                                         timeout=timeout)
+    stats, spans = {}, []
+    for database, schema, table, column in targets:
+        key = (table_key(database, schema, table), column.lower())
+        if key not in types:
+            continue
+        column_name, data_type, row_count = types[key]
+        stats[key] = ColumnStats(database, schema, table, column_name, data_type, row_count)
+        if partition_type(data_type):
+            spans.append((database, schema, table, column_name))
+    for key, (low, high) in fetch_column_spans(pool, spans, timeout=timeout).items():
+        stats[key].min_value = None if low is None else str(low)
+        stats[key].max_value = None if high is None else str(high)
+    print(f"📏 Fetched column stats for {len(stats)}/{len(targets)} partition column(s).")
+    return stats
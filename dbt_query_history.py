@@ -0,0 +1,295 @@
+import functools
+import os
+import re
+
+from dbt_inventory import READERS, clean_cell
+from dbt_lineage import MAX_CLUSTER_COLUMNS
+
+# ---------- CONFIG ----------
+MIN_QUERIES = 2  # filtering queries a column needs before it is proposed
+# How much clustering on a column can prune for each way a query uses it.
+OPERATOR_WEIGHTS = {
+    "eq": 1.0,      # col = x, col IN (...)
+    "range": 0.6,   # <, <=, >, >=, BETWEEN
+    "like": 0.3,    # LIKE 'prefix%'
+    "join": 0.4,    # a.col = b.col
+}
+# -----------------------------------
+
+# ---------- Log rows ----------
+# Headers of a BigQuery INFORMATION_SCHEMA.JOBS export and a Snowflake QUERY_HISTORY export.
+HISTORY_ALIASES = {
+    "query": "query",
+    "query_text": "query",
+    "total_bytes_processed": "bytes",
+    "bytes_scanned": "bytes",
+    "partitions_scanned": "partitions_scanned",
+    "partitions_total": "partitions_total",
+    "execution_status": "status",
+    "error_result": "error",
+}
+FAILED_STATUSES = {"fail", "failed_with_error", "failed_with_incident", "incident"}
+
+def _number(val):
+    text = clean_cell(val)
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+def iter_history(path: str):
+    """(query text, weight) per successful query of a .csv/.xlsx/.parquet query log."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported query log format '{ext}' for {path}")
+    for rec in READERS[ext](path):
+        fields = {}
+        for key, val in rec.items():
+            name = HISTORY_ALIASES.get(key)
+            if name and name not in fields:
+                fields[name] = val
+        query = clean_cell(fields.get("query"))
+        if not query or clean_cell(fields.get("error")):
+            continue
+        if clean_cell(fields.get("status")).lower() in FAILED_STATUSES:
+            continue
+        yield query, query_weight(fields)
+
+def query_weight(fields) -> float:
+    """
+    Bytes the query scanned (1 when the log has none), scaled by the share of
+    micro-partitions it could not prune when Snowflake reports them: the
+    queries that read the most data for nothing gain the most from clustering.
+    """
+    weight = _number(fields.get("bytes")) or 1.0
+    scanned, total = _number(fields.get("partitions_scanned")), _number(fields.get("partitions_total"))
+    if scanned is not None and total:
+        weight *= min(1.0, scanned / total)
+    return weight
+
+# ---------- Predicate extraction ----------
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_QUOTE_RE = re.compile(r"[`\"]")
+_CTE_RE = re.compile(r"\b([a-z_]\w*)\s+as\s*\(", re.IGNORECASE)
+# Words that can follow a table name but are never its alias; without this
+# `from a join b` would read `join` as a's alias and lose b.
+_NOT_ALIAS = (
+    "join", "left", "right", "inner", "outer", "full", "cross", "natural", "lateral", "on", "using",
+    "where", "group", "order", "limit", "having", "qualify", "window", "union", "except", "intersect",
+    "minus", "select", "from", "as", "pivot", "unpivot", "sample", "tablesample", "at", "before",
+    "match_recognize", "for", "and", "or", "when", "then", "else", "end",
+)
+_ALIAS = rf"(?:\s+(?:as\s+)?(?!(?:{'|'.join(_NOT_ALIAS)})\b)([a-z_]\w*))?"
+_TABLE_RE = re.compile(rf"\b(?:from|join)\s+([a-z_][\w.\-]*){_ALIAS}", re.IGNORECASE)
+_NEXT_TABLE_RE = re.compile(rf"\s*,\s*([a-z_][\w.\-]*){_ALIAS}", re.IGNORECASE)
+_SELECT_RE = re.compile(r"\bselect\b", re.IGNORECASE)
+_CLAUSE_RE = re.compile(
+    r"\b(where|on|having|qualify|select|from|join|using|group\s+by|order\s+by|limit|union|window)\b",
+    re.IGNORECASE,
+)
+_COLUMN = r"(?:([a-z_]\w*)\s*\.\s*)?([a-z_]\w*)"
+# an optional function around the column (DATE(ts) = ..., TIMESTAMP_TRUNC(ts, DAY) >= ...)
+_PREDICATE_RE = re.compile(
+    rf"(?:\b[a-z_]\w*\s*\(\s*)?(?<![\w.]){_COLUMN}(?:\s*,[^()]*)?\s*\)?\s*"
+    rf"(=|<>|!=|<=|>=|<|>|\bnot\s+in\b|\bin\b|\bbetween\b|\bnot\s+like\b|\blike\b)"
+    rf"(?:\s*{_COLUMN}(?![\w.]|\s*\())?",
+    re.IGNORECASE,
+)
+_KEYWORDS = {
+    "and", "or", "not", "on", "where", "select", "from", "join", "as", "left", "right", "inner",
+    "outer", "full", "cross", "using", "group", "order", "by", "limit", "having", "qualify",
+    "union", "all", "case", "when", "then", "else", "end", "is", "null", "true", "false",
+    "current_date", "current_timestamp", "interval", "with", "distinct", "window", "over",
+}
+_OPERATORS = {"=": "eq", "in": "eq", "like": "like", "between": "range",
+              "<": "range", "<=": "range", ">": "range", ">=": "range"}
+
+def _clean_query(query: str) -> str:
+    text = _COMMENT_RE.sub(" ", query)
+    text = _STRING_RE.sub("''", text)
+    return _QUOTE_RE.sub("", text)
+
+def _top_level(text: str, matches):
+    """The matches outside any parentheses of `text`, e.g. not the FROM of EXTRACT(year FROM ts)."""
+    depth, seen = 0, 0
+    for m in matches:
+        depth += text.count("(", seen, m.start()) - text.count(")", seen, m.start())
+        seen = m.start()
+        if depth <= 0:
+            yield m
+
+def _table_refs(text: str):
+    """
+    (table, alias) per FROM/JOIN item, including comma-separated FROM lists.
+    Only items at the top level of `text` count: a subquery is a scope of its own,
+    and FROM inside EXTRACT(), TRIM() or SUBSTRING() names no table.
+    """
+    for m in _top_level(text, _TABLE_RE.finditer(text)):
+        yield m.group(1), m.group(2)
+        pos = m.end()
+        while True:
+            more = _NEXT_TABLE_RE.match(text, pos)
+            if not more:
+                break
+            yield more.group(1), more.group(2)
+            pos = more.end()
+
+def _tables(text: str, ctes):
+    """(aliases {alias or table name: table}, tables) of a piece of SQL; CTE names are not tables."""
+    aliases, tables = {}, []
+    for full, alias in _table_refs(text):
+        full = full.lower()
+        name = full.rsplit(".", 1)[-1]
+        if name in ctes or name in _KEYWORDS:
+            continue
+        tables.append(name)
+        aliases[name] = name
+        aliases[full] = name
+        alias = (alias or "").lower()
+        if alias and alias not in _KEYWORDS:
+            aliases[alias] = name
+    return aliases, list(dict.fromkeys(tables))
+
+def _closing_paren(text: str, open_pos: int) -> int:
+    depth = 0
+    for i in range(open_pos, len(text)):
+        if text[i] == "(":
+            depth += 1
+        elif text[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(text)
+
+def _scopes(text: str):
+    """
+    One piece of SQL per SELECT, so a CTE or subquery has its own FROM list.
+    A parenthesized SELECT ends at its closing parenthesis and is blanked out
+    of the enclosing one; top-level SELECTs (UNION branches) run to the next.
+    """
+    scopes = []
+    for m in reversed(list(_SELECT_RE.finditer(text))):
+        before = text[:m.start()].rstrip()
+        if before.endswith("("):
+            open_pos = len(before) - 1
+            close = _closing_paren(text, open_pos)
+            scopes.append(text[m.start():close])
+            text = text[:open_pos + 1] + " " * (close - open_pos - 1) + text[close:]
+    starts = [m.start() for m in _SELECT_RE.finditer(text)] or [0]
+    starts[0] = 0
+    scopes.extend(text[a:b] for a, b in zip(starts, starts[1:] + [len(text)]))
+    return scopes
+
+def _predicate_zones(text: str):
+    """The WHERE/ON/HAVING/QUALIFY stretches of the query, up to the next clause keyword."""
+    # FROM inside a function call (EXTRACT(year FROM ts) = 2024) does not end the zone
+    marks = list(_CLAUSE_RE.finditer(text))
+    top = {m.start() for m in _top_level(text, marks)}
+    marks = [m for m in marks if m.start() in top or m.group(1).lower() != "from"]
+    for m, nxt in zip(marks, marks[1:] + [None]):
+        if m.group(1).lower() in ("where", "on", "having", "qualify"):
+            yield text[m.end():nxt.start() if nxt else len(text)]
+
+@functools.lru_cache(maxsize=65536)
+def query_predicates(query: str):
+    """
+    ((table, column, kind), ...) for the filter and join predicates of one query,
+    kind in OPERATOR_WEIGHTS. An unqualified column is credited to the only table
+    of its SELECT (CTE or subquery), and skipped when there are several. Logs
+    repeat the same statement a lot, so results are cached per query text.
+    """
+    text = _clean_query(query)
+    ctes = {m.group(1).lower() for m in _CTE_RE.finditer(text)}
+    scopes = [(scope, *_tables(scope, ctes)) for scope in _scopes(text)]
+    aliases = {}
+    for _scope, local_aliases, _local_tables in scopes:
+        aliases.update(local_aliases)
+    if not aliases:
+        return ()
+
+    found = []
+    for scope, local_aliases, local_tables in scopes:
+        found.extend(_scope_predicates(scope, {**aliases, **local_aliases}, local_tables))
+    return tuple(dict.fromkeys(found))
+
+def _scope_predicates(scope: str, aliases, tables):
+    def owner(qualifier):
+        if qualifier:
+            return aliases.get(qualifier.lower())
+        return tables[0] if len(tables) == 1 else None
+
+    found = []
+    for zone in _predicate_zones(scope):
+        for m in _PREDICATE_RE.finditer(zone):
+            q1, col, op, q2, other = m.groups()
+            if col.lower() in _KEYWORDS:
+                continue
+            op = " ".join(op.lower().split())
+            if op.startswith("not") or op in ("<>", "!="):
+                continue  # negations prune next to nothing
+            if other and other.lower() not in _KEYWORDS:
+                for q, c in ((q1, col), (q2, other)):
+                    table = owner(q)
+                    if table:
+                        found.append((table, c.lower(), "join"))
+                continue
+            table = owner(q1)
+            if table:
+                found.append((table, col.lower(), _OPERATORS[op]))
+    return found
+
+# ---------- Ranking ----------
+class ColumnUsage:
+    """How a table's column is filtered across the log."""
+
+    __slots__ = ("column", "queries", "score", "kinds")
+
+    def __init__(self, column):
+        self.column = column
+        self.queries = 0
+        self.score = 0.0
+        self.kinds = {}  # kind -> queries
+
+    def as_dict(self):
+        return {"column": self.column, "queries": self.queries, "score": round(self.score, 3),
+                "kinds": dict(sorted(self.kinds.items()))}
+
+def column_usage(history):
+    """
+    history: iterable of (query, weight). Returns {table_lc: {column_lc: ColumnUsage}};
+    a column counts once per query, with its best-pruning use.
+    """
+    usage = {}
+    for query, weight in history:
+        best = {}
+        for table, column, kind in query_predicates(query):
+            key = (table, column)
+            if OPERATOR_WEIGHTS[kind] > OPERATOR_WEIGHTS.get(best.get(key), 0.0):
+                best[key] = kind
+        for (table, column), kind in best.items():
+            entry = usage.setdefault(table, {}).get(column)
+            if entry is None:
+                entry = usage[table][column] = ColumnUsage(column)
+            entry.queries += 1
+            entry.score += weight * OPERATOR_WEIGHTS[kind]
+            entry.kinds[kind] = entry.kinds.get(kind, 0) + 1
+    return usage
+
+def rank_columns(columns):
+    """ColumnUsage values best first: pruning score, then how often, then name."""
+    return sorted(columns.values(), key=lambda u: (-u.score, -u.queries, u.column))
+
+def recommend_clusters(usage, exclude=None, limit=MAX_CLUSTER_COLUMNS, min_queries=MIN_QUERIES):
+    """
+    {table_lc: [column, ...]}: up to `limit` clustered_by columns per table, in
+    clustering order. exclude: {table_lc: columns to leave out}, e.g. the
+    partition column, which clustering cannot prune any further.
+    """
+    proposals = {}
+    for table, columns in usage.items():
+        skip = {c.lower() for c in (exclude or {}).get(table, ())}
+        picked = [u.column for u in rank_columns(columns) if u.queries >= min_queries and u.column not in skip]
+        if picked:
+            proposals[table] = picked[:limit]
+    return proposals
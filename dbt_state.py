@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+
+# ---------- Content hashes ----------
+def file_hash(path: str):
+    """sha256 of the file bytes, or None when the file does not exist."""
+    try:
+        with open(path, "rb") as fh:
+            return hashlib.sha256(fh.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def digest(obj) -> str:
+    """Stable sha256 of any JSON-able value (dict key order does not matter)."""
+    payload = json.dumps(obj, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def state_path(name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f".{name}_state.json")
+
+# ---------- Manifest ----------
+class StateManifest:
+    """
+    Per-file record of what the last run saw:
+        {path: {"file_hash": sha256 of the file as left by the run,
+                "inputs": {model_lc: digest of everything that drove its edit}}}
+    A file is unchanged when its bytes and every model's input digest still match.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as fh:
+                    self.entries = json.load(fh).get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable state manifest {path}: {e}")
+
+    def models(self, path: str):
+        entry = self.entries.get(path)
+        return list(entry["inputs"]) if entry else []
+
+    def unchanged(self, path: str, current_hash, current_inputs) -> bool:
+        entry = self.entries.get(path)
+        return (
+            entry is not None
+            and current_hash is not None
+            and entry["file_hash"] == current_hash
+            and entry["inputs"] == current_inputs
+        )
+
+    def record(self, path: str, current_hash, inputs):
+        self.entries[path] = {"file_hash": current_hash, "inputs": inputs}
+
+    def forget(self, path: str):
+        self.entries.pop(path, None)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"version": 1, "entries": self.entries}, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
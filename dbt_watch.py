@@ -0,0 +1,146 @@
+import os
+import queue
+import time
+
+# ---------- CONFIG ----------
+POLL_INTERVAL = 0.5      # seconds between tree scans when watchdog is not installed
+DEBOUNCE_SECONDS = 0.15  # let a burst of saves (editor swap files, git checkout) settle first
+# -----------------------------------
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None  # deleted
+    return st.st_mtime_ns, st.st_size
+
+class FileWatcher:
+    """
+    Watches the files under `root` whose lowercase name ends with one of
+    `suffixes`, plus `extra_files` (e.g. the inventory), and calls
+    on_change(paths) with every batch that really changed (new, edited or
+    deleted). Uses watchdog (inotify on Linux, FSEvents on macOS) when it is
+    installed and polls mtimes otherwise. on_change returns the files it wrote
+    itself, so the events of those writes do not trigger another round.
+    Paths are reported the way os.walk(root) spells them, and extra files as given.
+    """
+
+    def __init__(self, root: str, suffixes, extra_files=(), prune=None):
+        self.root = root
+        self.abs_root = os.path.abspath(root)
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.extra = {os.path.abspath(p): p for p in extra_files if p}  # abspath -> as given
+        self.prune = prune or (lambda path: False)
+        self.known = self._scan()  # abspath -> (mtime_ns, size)
+
+    def wanted(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        if path in self.extra:
+            return True
+        name = os.path.basename(path)
+        if name.startswith(".tmp-") or not name.lower().endswith(self.suffixes):
+            return False  # .tmp- files are write_if_changed() on its way to os.replace
+        return path.startswith(self.abs_root + os.sep) and not self.prune(self.spell(os.path.dirname(path)))
+
+    def spell(self, path: str) -> str:
+        if path in self.extra:
+            return self.extra[path]
+        return os.path.join(self.root, os.path.relpath(path, self.abs_root))
+
+    def _scan(self):
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not self.prune(os.path.join(dirpath, d))]
+            for f in filenames:
+                path = os.path.abspath(os.path.join(dirpath, f))
+                if self.wanted(path):
+                    found[path] = _stat(path)
+        for path in self.extra:
+            found[path] = _stat(path)
+        return found
+
+    def remember(self, paths):
+        """Take the current state of files we wrote as known."""
+        for path in paths:
+            path = os.path.abspath(path)
+            self.known[path] = _stat(path)
+
+    def _changed(self, paths):
+        changed = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if not self.wanted(path):
+                continue
+            now = _stat(path)
+            if now != self.known.get(path):
+                changed.add(path)
+                if now is None:
+                    self.known.pop(path, None)
+                else:
+                    self.known[path] = now
+        return changed
+
+    # ---------- Event sources ----------
+    def _watchdog_events(self):
+        """A queue fed by a watchdog observer, or None when watchdog is not installed."""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None, None
+        events = queue.Queue()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    events.put(event.src_path)
+                    if getattr(event, "dest_path", None):
+                        events.put(event.dest_path)
+
+        observer = Observer()
+        observer.schedule(Handler(), self.root, recursive=True)
+        for folder in {os.path.dirname(p) for p in self.extra}:
+            if not os.path.abspath(folder).startswith(os.path.abspath(self.root) + os.sep):
+                observer.schedule(Handler(), folder, recursive=False)
+        observer.start()
+        return events, observer
+
+    def _next_batch(self, events):
+        if events is None:
+            while True:
+                time.sleep(POLL_INTERVAL)
+                now = self._scan()
+                paths = {p for p in set(now) | set(self.known) if now.get(p) != self.known.get(p)}
+                if paths:
+                    return paths
+        paths = set()
+        while not paths:
+            try:
+                paths.add(events.get(timeout=1.0))  # wakes up regularly so Ctrl-C is seen
+            except queue.Empty:
+                continue
+        deadline = time.monotonic() + DEBOUNCE_SECONDS
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return paths
+            try:
+                paths.add(events.get(timeout=left))
+            except queue.Empty:
+                return paths
+
+    def run(self, on_change):
+        events, observer = self._watchdog_events()
+        mode = "watchdog events" if observer is not None else f"polling every {POLL_INTERVAL}s"
+        print(f"\n👀 Watching {self.root} ({mode}). Press Ctrl-C to stop.")
+        try:
+            while True:
+                changed = self._changed(self._next_batch(events))
+                if changed:
+                    self.remember(on_change(sorted(self.spell(p) for p in changed)) or ())
+        except KeyboardInterrupt:
+            print("\n👋 Stopped watching.")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
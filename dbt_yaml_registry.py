@@ -0,0 +1,91 @@
+import os
+
+from dbt_io import dump_yaml_text, write_if_changed
+
+# ---------- schema.yml registry ----------
+class SchemaRegistry:
+    """
+    Every schema.yml parsed exactly once, kept as ruamel round-trip documents,
+    with models indexed by lowercase name. Edits go to the same in-memory
+    objects and write_all() saves each touched file once at the end, so a file
+    is never re-read (and earlier edits never lost) mid-run.
+    """
+
+    def __init__(self, yaml_handler, schema_files):
+        self.yaml_handler = yaml_handler
+        self.docs = {}    # path -> parsed document
+        self.models = {}  # model name (lowercase) -> (path, model)
+        self.dirty = set()
+        for path in schema_files:
+            self.load(path)
+
+    def load(self, path):
+        if path in self.docs:
+            return self.docs[path]
+        data = None
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = self.yaml_handler.load(f)
+            except Exception as e:
+                print(f"❌ Failed to parse {path}: {e}")
+                return None
+        if data is None:
+            data = {}
+        self.docs[path] = data
+        for model in data.get("models") or []:
+            self._index(path, model)
+        return data
+
+    def _index(self, path, model):
+        key = str(model.get("name", "")).strip().lower()
+        if not key:
+            return
+        if key in self.models and self.models[key][0] != path:
+            print(f"⚠️ Model '{key}' is declared in {self.models[key][0]} and {path} — using the first.")
+            return
+        self.models.setdefault(key, (path, model))
+
+    def find(self, table_name):
+        """Same shape as the old find_table_in_yamls(): (path, data, model) or (None, None, None)."""
+        hit = self.models.get(str(table_name).strip().lower())
+        if not hit:
+            return None, None, None
+        path, model = hit
+        return path, self.docs[path], model
+
+    def add_model(self, path, model):
+        """
+        Append a model to `path` (loaded or created on first use) and index it.
+        Returns False, with a warning, when `path` exists but cannot be parsed.
+        """
+        data = self.load(path)
+        if data is None:
+            print(f"⚠️ Model '{model.get('name', '')}' was not added: {path} could not be parsed.")
+            return False
+        data.setdefault("version", 2)
+        if data.get("models") is None:
+            data["models"] = []
+        data["models"].append(model)
+        self._index(path, model)
+        self.dirty.add(path)
+        return True
+
+    def mark_dirty(self, path):
+        self.dirty.add(path)
+
+    def write_all(self):
+        """Write every touched document once. Returns (bytes_written, files_unchanged)."""
+        bytes_written, files_unchanged = 0, 0
+        for path in sorted(self.dirty):
+            data = self.docs[path]
+            data["version"] = 2
+            written = write_if_changed(path, dump_yaml_text(self.yaml_handler, data))
+            bytes_written += written
+            if written:
+                print(f"✅ Written: {path} ({written} bytes)")
+            else:
+                files_unchanged += 1
+                print(f"⏭️ Unchanged: {path}")
+        self.dirty.clear()
+        return bytes_written, files_unchanged
@@ -0,0 +1,74 @@
+from dbt_column_converter import is_view_materialization, update_existing_config
+from dbt_config_block import config_arg, find_config_blocks, literal_value, rewrite_config
+
+def test_inline_block():
+    sql = "{{ config(materialized='table', tags=['a', 'b']) }}\nselect 1"
+    (block,) = find_config_blocks(sql)
+    assert sql[block.start:block.end] == "{{ config(materialized='table', tags=['a', 'b']) }}"
+    assert [(a.key, a.value) for a in block.args] == [("materialized", "'table'"), ("tags", "['a', 'b']")]
+    out, changed = rewrite_config(sql, {"clustered_by": "['id']"})
+    assert changed == ["clustered_by"]
+    assert out.startswith("{{ config(materialized='table', tags=['a', 'b'], clustered_by = ['id']) }}")
+
+def test_multiline_block_keeps_layout():
+    sql = "{{\n    config(\n        materialized = 'incremental',\n        unique_key = 'id'\n    )\n}}\nselect 1"
+    (block,) = find_config_blocks(sql)
+    assert literal_value(block.get("unique_key").value) == "id"
+    out, _ = rewrite_config(sql, {"clustered_by": "['id']"})
+    assert "        unique_key = 'id',\n        clustered_by = ['id']\n    )" in out
+
+def test_trailing_comma_and_whitespace_control():
+    sql = "{{- config(\n    materialized='table',\n    tags=['daily'],\n) -}}\nselect 1"
+    (block,) = find_config_blocks(sql)
+    assert [a.key for a in block.args] == ["materialized", "tags"]
+    assert sql[block.end - 3:block.end] == "-}}"
+    out, _ = rewrite_config(sql, {"clustered_by": "['id']"})
+    assert "    tags=['daily'],\n    clustered_by = ['id'],\n) -}}" in out
+
+def test_nested_var_and_dict_arguments():
+    sql = ("{{ config(materialized=var('mat', 'table'), "
+           "partition_by={'field': 'dt', 'data_type': 'date'}, "
+           "post_hook=\"{{ grant('x') }}\") }}\nselect 1")
+    (block,) = find_config_blocks(sql)
+    assert [a.key for a in block.args] == ["materialized", "partition_by", "post_hook"]
+    assert block.get("materialized").value == "var('mat', 'table')"
+    assert block.get("partition_by").value == "{'field': 'dt', 'data_type': 'date'}"
+    assert literal_value(block.get("materialized").value) is None
+
+def test_commented_out_config_is_skipped():
+    sql = "{# {{ config(materialized='view') }} #}\n{{ config(materialized='table') }}\nselect 1"
+    (block,) = find_config_blocks(sql)
+    assert literal_value(block.get("materialized").value) == "table"
+    assert not is_view_materialization([block])
+
+def test_multiple_blocks_last_one_wins():
+    sql = ("{{ config(materialized='table', unique_key='id') }}\n"
+           "{% if target.name == 'prod' %}{{ config(materialized='view') }}{% endif %}\nselect 1")
+    blocks = find_config_blocks(sql)
+    assert len(blocks) == 2
+    assert literal_value(config_arg(blocks, "materialized").value) == "view"
+    assert is_view_materialization(blocks)
+    assert update_existing_config(sql, "dt", ["id"]) == (sql, "is-view")
+    # missing keys go to the first block; nothing is added when the key is set anywhere
+    out, changed = rewrite_config(sql, {"unique_key": "'other'", "clustered_by": "['id']"})
+    assert changed == ["clustered_by"]
+    assert out.startswith("{{ config(materialized='table', unique_key='id', clustered_by = ['id']) }}")
+
+def test_view_detection():
+    assert is_view_materialization(find_config_blocks("{{ config(materialized = \"VIEW\") }}"))
+    assert not is_view_materialization(find_config_blocks("{{ config(materialized='table') }}"))
+    assert not is_view_materialization(find_config_blocks("{{ config(materialized=var('m', 'view')) }}"))
+    assert update_existing_config("select 1", "dt", ["id"]) == ("select 1", "no-config")
+
+def test_overwrite_vs_preserve_existing_keys():
+    sql = "{{ config(materialized='table', clustered_by=['a']) }}\nselect 1"
+    assert rewrite_config(sql, {"clustered_by": "['b']"}) == (sql, [])
+    out, changed = rewrite_config(sql, {"clustered_by": "['b']"}, overwrite=True)
+    assert changed == ["clustered_by"] and "clustered_by=['b']" in out
+    out, changed = rewrite_config(sql, {"clustered_by": "['b']", "materialized": "'view'"},
+                                  overwrite={"clustered_by"})
+    assert changed == ["clustered_by"] and "materialized='table'" in out
+    # same value: nothing to overwrite
+    assert rewrite_config(sql, {"clustered_by": " ['a'] "}, overwrite=True) == (sql, [])
+    assert update_existing_config(sql, None, ["b"]) == (sql, "no-op")
+    assert update_existing_config(sql, None, ["b"], replace_cluster=True)[0] == sql.replace("['a']", "['b']")
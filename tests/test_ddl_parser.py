@@ -0,0 +1,31 @@
+from dbt_ddl_parser import parse_create_table
+
+def _names(ddl):
+    return [(c["name"], c["type"]) for c in parse_create_table(ddl)]
+
+def test_plain_table():
+    ddl = """create or replace TABLE DB.SCH.T (
+    ID NUMBER(38,0) NOT NULL COMMENT 'the id',
+    "Mixed Case" VARCHAR(16777216) WITH TAG (CORE.TAGS.PII='AMBER'),
+    primary key (ID)
+);"""
+    cols = parse_create_table(ddl)
+    assert _names(ddl) == [("ID", "NUMBER(38, 0)"), ("Mixed Case", "VARCHAR(16777216)")]
+    assert cols[0]["nullable"] is False and cols[0]["comment"] == "the id"
+    assert cols[1]["tags"] == [("CORE.TAGS.PII", "AMBER")]
+
+def test_cluster_by_before_column_list():
+    ddl = """create or replace TABLE T cluster by (A, to_date(B))(
+    A NUMBER(38,0),
+    B TIMESTAMP_NTZ(9)
+);"""
+    assert _names(ddl) == [("A", "NUMBER(38, 0)"), ("B", "TIMESTAMP_NTZ(9)")]
+
+def test_table_options_after_column_list_are_ignored():
+    ddl = """create or replace TABLE T (
+    A NUMBER
+) with row access policy P on (A) with tag (CORE.TAGS.OWNER='x');"""
+    assert _names(ddl) == [("A", "NUMBER")]
+
+def test_no_column_list():
+    assert parse_create_table("create or replace view V as select 1 as a") == []
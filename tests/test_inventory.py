@@ -0,0 +1,40 @@
+import csv
+
+import pytest
+from openpyxl import Workbook
+
+from dbt_inventory import load_inventory_rows, load_table_map
+
+HEADER = ["Database_Name", "schema", "table_name", "clustered_by_column", "partition_by_column", "table_name"]
+ROWS = [
+    ["DB", " SCH ", "ignored", "a, b,,", "dt", "Orders"],
+    [None, None, None, None, None, None],
+    ["DB", "SCH", "x", "nan", "", "items"],
+    ["DB2", "SCH", "y", " c ", " ,ts, ", "ORDERS"],
+    ["", "", "", "", "", ""],
+]
+
+def _write(path, header, rows):
+    if path.suffix == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            csv.writer(fh).writerows([header] + [["" if v is None else v for v in r] for r in rows])
+        return
+    wb = Workbook()
+    for r in [header] + rows:
+        wb.active.append(r)
+    wb.save(path)
+
+@pytest.mark.parametrize("ext", [".csv", ".xlsx"])
+def test_backends_agree_including_duplicate_headers(tmp_path, ext):
+    path = tmp_path / f"inventory{ext}"
+    _write(path, HEADER, ROWS)
+    stream = [r.as_tuple() for r in load_inventory_rows(str(path), backend="stream")]
+    columnar = [r.as_tuple() for r in load_inventory_rows(str(path), backend="pandas")]
+    assert stream == columnar == [
+        ("DB", "SCH", "Orders", ("a", "b"), ("dt",)),
+        ("DB", "SCH", "items", (), ()),
+        ("DB2", "SCH", "ORDERS", ("c",), ("ts",)),
+    ]
+    # the later duplicate `table_name` header wins in both backends
+    assert load_table_map(str(path), backend="stream") == load_table_map(str(path), backend="pandas") == {
+        "orders": ("DB2", "SCH"), "items": ("DB", "SCH")}
@@ -0,0 +1,22 @@
+from dbt_lineage import LineageGraph, NodeKeys, propagate
+
+def _graph(models):
+    graph = LineageGraph()
+    for name, parents in models.items():
+        graph.add_model(name, f"{name}.sql", " ".join(f"{{{{ ref('{p}') }}}}" for p in parents) + " select *")
+    return graph
+
+def test_cycle_members_and_blocked_nodes_are_reported_apart():
+    graph = _graph({"a": ["c", "base"], "b": ["a"], "c": ["b"], "d": ["c"], "e": ["d", "f"], "f": ["e"],
+                    "base": [], "ok": ["base"]})
+    order, cyclic, blocked = graph.topological_order()
+    assert order == ["base", "ok"]
+    assert cyclic == ["a", "b", "c", "e", "f"]
+    assert blocked == ["d"]
+
+def test_propagate_skips_cycles():
+    graph = _graph({"base": [], "ok": ["base"], "a": ["base", "b"], "b": ["a"]})
+    seeds = {"base": NodeKeys("ts", "{'field': 'ts'}", "base", 0)}
+    resolved, cyclic, blocked = propagate(graph, seeds)
+    assert resolved["ok"].partition_from == "base" and resolved["ok"].partition_depth == 1
+    assert "a" not in resolved and cyclic == ["a", "b"] and blocked == []
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from dbt_metadata import ConnectionPool, fetch_columns_chunk, fetch_inventory_metadata
+from dbt_metadata_cache import MetadataCache
+
+COLUMNS = [
+    ("DB", "SCH", "T1", "B", 2, None),
+    ("DB", "SCH", "T1", "A", 1, "the a"),
+    ("DB", "SCH", "T2", "X", 1, ""),
+    ("DB", "OTHER", "T1", "Z", 1, None),
+]
+TAGS = [
+    ("COLUMN", None, "DB", "SCH", "T1", "A", "CORE.TAGS.AMBER", "AMBER"),
+    ("COLUMN", None, "DB", "SCH", "T2", "X", "T", "Red"),
+    ("COLUMN", "2024-01-01", "DB", "SCH", "T1", "B", "T", "Red"),  # tag on a dropped object
+    ("TABLE", None, "DB", "SCH", "T1", "B", "T", "Red"),
+]
+
+@pytest.fixture
+def connect(tmp_path):
+    """
+    A SQLite stand-in for Snowflake: the catalog lives in an attached `information_schema`,
+    next to a `tag_references` table shaped like the account_usage view.
+    """
+    info_path = str(tmp_path / "information_schema.sqlite")
+    conn = sqlite3.connect(info_path)
+    conn.execute("create table columns(table_catalog, table_schema, table_name, column_name, "
+                 "ordinal_position, comment)")
+    conn.execute("create table tag_references(domain, object_deleted, object_database, object_schema, "
+                 "object_name, column_name, tag_name, tag_value)")
+    conn.executemany("insert into columns values (?, ?, ?, ?, ?, ?)", COLUMNS)
+    conn.executemany("insert into tag_references values (?, ?, ?, ?, ?, ?, ?, ?)", TAGS)
+    conn.commit()
+    conn.close()
+
+    def connect():
+        conn = sqlite3.connect(":memory:")
+        conn.execute("attach ? as information_schema", (info_path,))
+        return conn
+    return connect
+
+STAND_IN = {"info_schema": "information_schema", "placeholder": "?",
+            "tag_view": "information_schema.tag_references"}
+
+def test_fetch_columns_chunk_on_sqlite(connect):
+    fetched = fetch_columns_chunk(connect(), "DB", "sch", ["t1", "T2", "nope"], **STAND_IN, timeout=30)
+    assert sorted(fetched) == ["t1", "t2"]
+    assert [c.name for c in fetched["t1"]] == ["A", "B"]
+    assert fetched["t1"][0].description == "the a"
+    assert "policy_tags" in fetched["t1"][0].meta
+    assert fetched["t1"][1].meta == {}
+
+def test_fetch_inventory_metadata_on_sqlite(connect, tmp_path):
+    pool = ConnectionPool(connect, size=2, retries=0)
+    cache = MetadataCache(str(tmp_path / "cache.sqlite"))
+    inventory = [("DB", "SCH", "T1"), ("DB", "SCH", "T2"), ("DB", "OTHER", "T1"), ("DB", "SCH", "GONE")]
+    try:
+        tables = fetch_inventory_metadata(pool, inventory, cache=cache, **STAND_IN)
+    finally:
+        pool.close()
+    assert sorted(tables) == ["db.other.t1", "db.sch.t1", "db.sch.t2"]
+    assert [c.name for c in tables["db.other.t1"]] == ["Z"]
+
+    # warm rerun: served from the cache without connecting, GONE included (cached as missing)
+    attempts = []
+
+    def refuse():
+        attempts.append(1)
+        raise ConnectionError("warm run connected to the warehouse")
+    warm = fetch_inventory_metadata(ConnectionPool(refuse, retries=0), inventory, cache=cache, **STAND_IN)
+    cache.close()
+    assert not attempts
+    assert {k: [c.name for c in t] for k, t in warm.items()} == {k: [c.name for c in t] for k, t in tables.items()}
+
+def test_pool_reuses_connections_across_map_calls():
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    def echo(conn, n):
+        return conn.execute("select ?", (n,)).fetchone()[0]
+
+    pool = ConnectionPool(connect, size=4)
+    try:
+        for _ in range(3):
+            assert pool.map(echo, [(n,) for n in range(20)]) == list(range(20))
+        assert pool.map(echo, [(1,)]) == [1]
+    finally:
+        pool.close()
+    assert len(opened) <= 4
@@ -0,0 +1,42 @@
+from dbt_query_history import column_usage, query_predicates, recommend_clusters
+
+def test_join_after_unaliased_table():
+    assert query_predicates("select * from orders join items i on orders.id = i.order_id where i.sku = 1") == (
+        ("orders", "id", "join"), ("items", "order_id", "join"), ("items", "sku", "eq"))
+
+def test_aliases_and_join_kinds():
+    found = query_predicates(
+        "select * from db.sch.orders as o left join items on o.id = items.order_id "
+        "inner join shops s on s.id = o.shop_id where o.created_at >= '2024-01-01' and s.region in ('uk')")
+    assert ("orders", "created_at", "range") in found
+    assert ("shops", "region", "eq") in found
+    assert ("items", "order_id", "join") in found and ("shops", "id", "join") in found
+
+def test_join_after_cte_name():
+    found = query_predicates(
+        "with recent as (select * from orders where region = 'uk') "
+        "select * from recent join items i on recent.id = i.order_id where i.sku = 1")
+    assert found == (("orders", "region", "eq"), ("items", "order_id", "join"), ("items", "sku", "eq"))
+
+def test_comma_from_list_and_unqualified_columns():
+    assert query_predicates("select * from orders o, items where o.id = items.order_id and o.dt >= 1") == (
+        ("orders", "id", "join"), ("items", "order_id", "join"), ("orders", "dt", "range"))
+    # unqualified column with a single table in scope
+    assert query_predicates("select * from orders where status = 'x' and amount <> 3") == (
+        ("orders", "status", "eq"),)
+
+def test_recommend_clusters_ranks_by_weighted_use():
+    history = [("select * from orders where region = 1", 10.0)] * 2 + [
+        ("select * from orders where created_at > 1", 10.0)] * 3
+    usage = column_usage(history)
+    # 2 x eq (1.0) outweighs 3 x range (0.6)
+    assert recommend_clusters(usage) == {"orders": ["region", "created_at"]}
+    assert recommend_clusters(usage, exclude={"orders": ["created_at"]}) == {"orders": ["region"]}
+
+def test_from_inside_function_calls_is_not_a_table():
+    assert query_predicates(
+        "select * from orders where extract(year from created_at) = 2024 and region = 'uk'") == (
+        ("orders", "created_at", "eq"), ("orders", "region", "eq"))
+    assert query_predicates(
+        "select trim(both ' ' from name), substring(code from 2) from shops s where s.id = 1") == (
+        ("shops", "id", "eq"),)